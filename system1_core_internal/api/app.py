@@ -13,6 +13,8 @@ from config.settings import settings
 
 from api import routes as http_routes
 from api import websocket as websocket_routes
+from services.artifact_index import artifact_index
+from services.retention_service import retention_service
 
 # --- 應用程式初始化 ---
 
@@ -39,6 +41,20 @@ app.include_router(http_routes.router)
 app.include_router(websocket_routes.router)
 
 
+# --- 生命週期事件 ---
+@app.on_event("startup")
+async def start_retention_job():
+    """啟動定期的資料保留清理。"""
+    retention_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_retention_job():
+    """停止資料保留排程並關閉檔案索引。"""
+    await retention_service.stop()
+    artifact_index.close()
+
+
 # --- 靜態檔案 (Static Files) 服務設定 ---
 
 try:
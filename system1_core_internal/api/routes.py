@@ -5,6 +5,7 @@ AudioAssuranceSystem - HTTP API 端點
 from typing import List, Any
 from fastapi import APIRouter
 from services.storage_service import storage_service
+from services.retention_service import retention_service
 
 # 建立一個專門用於 HTTP API 的路由器
 router = APIRouter(prefix="/api", tags=["System 1"])
@@ -28,4 +29,22 @@ async def get_all_recordings() -> List[dict]:
     
     recordings_list.sort(key=lambda r: r.get("archived_at"), reverse=True)
     
-    return recordings_list
\ No newline at end of file
+    return recordings_list
+
+
+@router.post("/retention/run")
+async def run_retention():
+    """立即依保留政策清理過期的錄音檔與錄音分段，回傳各類資料釋放的空間。"""
+    return await retention_service.run_once()
+
+
+@router.get("/retention/status")
+async def get_retention_status():
+    """取得保留政策與最近一次清理的結果。"""
+    return {
+        "policies": [
+            {"kind": policy.kind, "retention_days": policy.retention_days}
+            for policy in retention_service.policies
+        ],
+        "last_run": retention_service.last_run,
+    }
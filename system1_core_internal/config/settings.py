@@ -47,6 +47,16 @@ class Settings:
     )
     # --- *** 修改結束 *** ---
 
+    # === 錄音分段歸檔：通話中每累積此秒數就歸檔一段並通知系統二，設為 0 停用 ===
+    RECORDING_SEGMENT_SECONDS: float = float(os.getenv("RECORDING_SEGMENT_SECONDS", "60"))
+
+    # === 資料保留：各類資料的保留天數 (0 表示永久保留)，以及排程清理間隔 (0 表示停用排程) ===
+    # 預設全部永久保留，升級後不會刪除既有錄音；需要清理時再逐項設定天數
+    RETENTION_RECORDING_DAYS: float = float(os.getenv("RETENTION_RECORDING_DAYS", "0"))
+    RETENTION_SEGMENT_DAYS: float = float(os.getenv("RETENTION_SEGMENT_DAYS", "0"))
+    RETENTION_INTERVAL_HOURS: float = float(os.getenv("RETENTION_INTERVAL_HOURS", "6"))
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+
     # === 系統設定 ===
     DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
 
@@ -54,6 +64,7 @@ class Settings:
     BASE_DIR: Path = BASE_DIR
     STORAGE_PATH: Path = (BASE_DIR / os.getenv("STORAGE_PATH", "storage")).resolve()
     AUDIO_PATH: Path = STORAGE_PATH / "audio"
+    SEGMENT_PATH: Path = AUDIO_PATH / "segments"
 
     @classmethod
     def initialize_storage(cls):
@@ -63,6 +74,7 @@ class Settings:
         try:
             cls.STORAGE_PATH.mkdir(parents=True, exist_ok=True)
             cls.AUDIO_PATH.mkdir(parents=True, exist_ok=True)
+            cls.SEGMENT_PATH.mkdir(parents=True, exist_ok=True)
         except OSError as e:
             print(f"警告：無法建立儲存目錄 {cls.STORAGE_PATH}。錯誤: {e}")
 
@@ -0,0 +1,141 @@
+"""
+檔案索引模組 - 依建立時間索引系統產生的檔案，供保留期限清理使用
+
+歸檔的正式錄音檔與通話中的錄音分段目錄在建立時登錄 (路徑、類型、建立時間、大小)，
+清理時依 (類型, 建立時間) 索引取出最舊的一批，不必掃描整個儲存目錄。
+首次啟用時會掃描一次既有目錄，以檔案修改時間補登錄舊檔案。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 檔案類型
+KIND_RECORDING = "recording"
+KIND_RECORDING_SEGMENTS = "recording_segments"
+
+
+def _path_size(path: Path) -> int:
+    try:
+        if path.is_dir():
+            return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+class ArtifactIndex:
+    """SQLite 實作的檔案時間索引 (登錄為同步呼叫，單筆寫入成本極低)"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    size_bytes INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_artifacts_kind_created_at "
+                "ON artifacts (kind, created_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS adopted_dirs (kind TEXT PRIMARY KEY, adopted_at REAL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def register(self, path: Path, kind: str, created_at: Optional[float] = None):
+        """
+        登錄一個新檔案 (或目錄)；登錄失敗只記錄警告。
+
+        同一路徑會被重複使用 (例如同一房間 ID 的下一通電話)，重複登錄時同時更新建立時間與大小，
+        保留期限以最近一次使用起算。
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT INTO artifacts (path, kind, created_at, size_bytes) "
+                        "VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(path) DO UPDATE SET "
+                        "created_at = excluded.created_at, size_bytes = excluded.size_bytes",
+                        (str(path), kind, created_at or time.time(), _path_size(path)),
+                    )
+        except sqlite3.Error as e:
+            logger.warning("檔案索引: 登錄 %s 失敗: %s", path, e)
+
+    def adopt(self, kind: str, paths: Iterable[Path]) -> int:
+        """
+        每種類型只執行一次：以修改時間登錄既有檔案，回傳登錄數量。
+        """
+        with self._lock:
+            conn = self._connect()
+            if conn.execute("SELECT 1 FROM adopted_dirs WHERE kind = ?", (kind,)).fetchone():
+                return 0
+            rows = []
+            for path in paths:
+                try:
+                    rows.append((str(path), kind, path.stat().st_mtime, _path_size(path)))
+                except OSError:
+                    continue
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO artifacts (path, kind, created_at, size_bytes) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute(
+                    "INSERT INTO adopted_dirs (kind, adopted_at) VALUES (?, ?)",
+                    (kind, time.time()),
+                )
+        return len(rows)
+
+    def oldest_before(
+        self, kind: str, cutoff: float, limit: int
+    ) -> List[Tuple[str, int]]:
+        """取出建立時間早於 cutoff 的最舊一批檔案 (路徑, 大小)。"""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT path, size_bytes FROM artifacts "
+                "WHERE kind = ? AND created_at < ? ORDER BY created_at LIMIT ?",
+                (kind, cutoff, limit),
+            ).fetchall()
+
+    def remove(self, paths: List[str]):
+        """移除已刪除檔案的索引。"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("DELETE FROM artifacts WHERE path = ?", [(p,) for p in paths])
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+artifact_index = ArtifactIndex(settings.STORAGE_PATH / "retention.sqlite3")
@@ -18,6 +18,7 @@ from config.settings import settings
 from utils.audio_utils import save_audio_file
 from services.storage_service import storage_service
 from services.session_manager import call_session_manager
+from services.segment_archiver import segment_archive_service
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +66,7 @@ class RecordingService:
             while True:
                 audio_chunk = await websocket.receive_bytes()
                 handler.add_chunk(audio_chunk)
+                await segment_archive_service.feed(room_id, client_id, audio_chunk)
         except Exception as e:
             logger.info(
                 "錄音服務: 客戶端 %s 在房間 %s 的連線中斷: %s", client_id, room_id, e
@@ -93,6 +95,8 @@ class RecordingService:
                     not h.is_active for h in self.rooms[room_id].values()
                 )
                 if is_still_empty:
+                    # 先送出最後一段分段與清單，系統二即可在正式錄音檔處理期間開始轉錄
+                    await segment_archive_service.finish(room_id)
                     await self._process_and_save_audio(room_id)
                     if room_id in self.rooms:
                         del self.rooms[room_id]
@@ -0,0 +1,156 @@
+"""
+AudioAssuranceSystem - 資料保留服務
+定期依保留期限清理正式錄音檔 (含後設資料) 與通話中的錄音分段目錄。
+每種資料有各自的保留天數 (設為 0 表示永久保留)；清理時依建立時間索引分批取出過期檔案，
+每批刪除後讓出事件迴圈，並統計每種資料刪除的數量與釋放的位元組數。
+"""
+
+import asyncio
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from services.artifact_index import KIND_RECORDING, KIND_RECORDING_SEGMENTS, artifact_index
+from services.storage_service import storage_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    """單一資料類型的保留期限"""
+
+    kind: str
+    retention_days: float
+
+
+def _unlink(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _delete_files(paths: List[str]) -> List[str]:
+    """刪除檔案並回傳已不存在的路徑 (刪除失敗的保留在索引中，下次再試)。"""
+    removed = []
+    for path_str in paths:
+        path = Path(path_str)
+        try:
+            if path.exists():
+                _unlink(path)
+            removed.append(path_str)
+        except OSError as e:
+            logger.warning("資料保留: 刪除 %s 失敗: %s", path, e)
+    return removed
+
+
+class RetentionService:
+    """依保留政策定期清理過期的錄音檔與錄音分段"""
+
+    def __init__(self):
+        self.policies = [
+            RetentionPolicy(KIND_RECORDING, settings.RETENTION_RECORDING_DAYS),
+            RetentionPolicy(KIND_RECORDING_SEGMENTS, settings.RETENTION_SEGMENT_DAYS),
+        ]
+        self.batch_size = settings.RETENTION_BATCH_SIZE
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+
+    def adopt_existing_files(self):
+        """首次啟用時登錄既有的錄音檔與分段目錄 (以修改時間作為建立時間)。"""
+        recordings = (p for p in settings.AUDIO_PATH.glob("*") if p.is_file())
+        segment_dirs = (p for p in settings.SEGMENT_PATH.glob("*") if p.is_dir())
+        for kind, paths in (
+            (KIND_RECORDING, recordings),
+            (KIND_RECORDING_SEGMENTS, segment_dirs),
+        ):
+            adopted = artifact_index.adopt(kind, paths)
+            if adopted:
+                logger.info("資料保留: 已登錄 %d 個既有檔案 (%s)", adopted, kind)
+
+    async def _purge(self, kind: str, cutoff: datetime) -> Dict[str, int]:
+        deleted = reclaimed = 0
+        while True:
+            batch = await asyncio.to_thread(
+                artifact_index.oldest_before, kind, cutoff.timestamp(), self.batch_size
+            )
+            if not batch:
+                break
+            sizes = dict(batch)
+            removed = await asyncio.to_thread(_delete_files, list(sizes))
+            await asyncio.to_thread(artifact_index.remove, removed)
+            if kind == KIND_RECORDING:
+                # 錄音檔以檔案 ID 命名，一併移除後設資料
+                for path in removed:
+                    storage_service.audio_metadata.pop(Path(path).stem, None)
+            deleted += len(removed)
+            reclaimed += sum(sizes[path] for path in removed)
+            if len(removed) < len(batch) or len(batch) < self.batch_size:
+                # 有檔案刪除失敗時停止本輪，避免重複取到同一批
+                break
+            await asyncio.sleep(0)
+        return {"deleted": deleted, "reclaimed_bytes": reclaimed}
+
+    async def run_once(self) -> Dict[str, Any]:
+        """執行一輪清理，回傳每種資料刪除的數量與釋放的位元組數。"""
+        async with self._run_lock:
+            started = time.monotonic()
+            now = datetime.now()
+            results: Dict[str, Dict[str, int]] = {}
+            for policy in self.policies:
+                if policy.retention_days <= 0:
+                    continue
+                cutoff = now - timedelta(days=policy.retention_days)
+                try:
+                    results[policy.kind] = await self._purge(policy.kind, cutoff)
+                except Exception as e:
+                    logger.error("資料保留: 清理 %s 失敗: %s", policy.kind, e, exc_info=True)
+            self.last_run = {
+                "finished_at": datetime.now().isoformat(),
+                "duration_seconds": round(time.monotonic() - started, 3),
+                "results": results,
+                "reclaimed_bytes": sum(r["reclaimed_bytes"] for r in results.values()),
+            }
+            logger.info(
+                "資料保留: 清理完成，共釋放 %d bytes (%s)",
+                self.last_run["reclaimed_bytes"],
+                results,
+            )
+            return self.last_run
+
+    async def _loop(self, interval_seconds: float):
+        try:
+            await asyncio.to_thread(self.adopt_existing_files)
+        except Exception as e:
+            logger.error("資料保留: 登錄既有檔案失敗: %s", e)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("資料保留: 排程清理失敗: %s", e, exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+    def start(self):
+        """啟動定期清理 (RETENTION_INTERVAL_HOURS 設為 0 時停用)。"""
+        if settings.RETENTION_INTERVAL_HOURS <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop(settings.RETENTION_INTERVAL_HOURS * 3600))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+retention_service = RetentionService()
@@ -0,0 +1,197 @@
+"""
+AudioAssuranceSystem - 錄音分段歸檔服務
+在通話進行中以常駐的 FFmpeg 子行程持續解碼錄音串流，每累積固定長度就切出一段 WAV 歸檔，
+並逐段通知品質保障系統 (系統二)；掛斷時送出最後一段與分段清單 (manifest)，
+讓系統二可以在通話期間就先下載並轉錄已完成的段落。
+"""
+
+import asyncio
+import logging
+import uuid
+import wave
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from services.artifact_index import KIND_RECORDING_SEGMENTS, artifact_index
+from services.session_manager import call_session_manager
+
+logger = logging.getLogger(__name__)
+
+# 分段音檔格式：16 kHz、單聲道、16-bit PCM
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+
+class RoomSegmentArchiver:
+    """單一房間的串流解碼與分段歸檔"""
+
+    def __init__(self, room_id: str, client_id: str, segment_seconds: float):
+        self.room_id = room_id
+        # 只處理第一個送出音訊的參與者串流 (與正式錄音檔使用同一條混音串流)
+        self.client_id = client_id
+        self.segment_bytes = int(segment_seconds * SAMPLE_RATE) * SAMPLE_WIDTH
+        # 房間 ID 會被重複使用，每通電話各自一個分段目錄，避免覆寫或混入上一通的分段
+        self.call_instance = uuid.uuid4().hex[:12]
+        self.output_dir = settings.SEGMENT_PATH / f"{room_id}-{self.call_instance}"
+        self.segments: List[Dict[str, Any]] = []
+        self._pcm = bytearray()
+        self._emitted_bytes = 0
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._notify_tasks: List[asyncio.Task] = []
+        self.failed = False
+
+    async def start(self) -> bool:
+        """啟動 FFmpeg 解碼子行程，失敗時回傳 False (該房間不做分段)。"""
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                "ffmpeg",
+                "-i", "pipe:0",
+                "-ac", "1",
+                "-ar", str(SAMPLE_RATE),
+                "-f", "s16le",
+                "-hide_banner",
+                "-loglevel", "error",
+                "pipe:1",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+        except (FileNotFoundError, OSError) as e:
+            logger.warning("分段歸檔: 無法啟動 FFmpeg，房間 %s 不做分段: %s", self.room_id, e)
+            self.failed = True
+            return False
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        artifact_index.register(self.output_dir, KIND_RECORDING_SEGMENTS)
+        self._reader_task = asyncio.create_task(self._read_pcm())
+        return True
+
+    async def feed(self, chunk: bytes):
+        """送入一個串流音訊塊，等待寫入以形成背壓。"""
+        if self.failed or self._process is None or self._process.stdin is None:
+            return
+        try:
+            self._process.stdin.write(chunk)
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            logger.warning("分段歸檔: 房間 %s 的 FFmpeg 已中止: %s", self.room_id, e)
+            self.failed = True
+
+    async def _read_pcm(self):
+        assert self._process is not None and self._process.stdout is not None
+        while True:
+            data = await self._process.stdout.read(65536)
+            if not data:
+                break
+            self._pcm.extend(data)
+            while len(self._pcm) >= self.segment_bytes:
+                self._emit_segment(bytes(self._pcm[: self.segment_bytes]))
+                del self._pcm[: self.segment_bytes]
+
+    def _emit_segment(self, pcm: bytes, is_last: bool = False):
+        index = len(self.segments)
+        path = self.output_dir / f"{index:04d}.wav"
+        with wave.open(str(path), "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(SAMPLE_WIDTH)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(pcm)
+
+        segment = {
+            "index": index,
+            "start_seconds": self._emitted_bytes / SAMPLE_WIDTH / SAMPLE_RATE,
+            "duration_seconds": len(pcm) / SAMPLE_WIDTH / SAMPLE_RATE,
+            "file_path": str(path),
+            "is_last": is_last,
+            "call_instance": self.call_instance,
+        }
+        self._emitted_bytes += len(pcm)
+        self.segments.append(segment)
+        logger.info(
+            "分段歸檔: 房間 %s 第 %d 段 (%.1f 秒) 已歸檔",
+            self.room_id,
+            index,
+            segment["duration_seconds"],
+        )
+        self._notify_tasks.append(
+            asyncio.create_task(
+                call_session_manager.notify_recording_segment(self.room_id, segment)
+            )
+        )
+
+    async def finish(self) -> Optional[Dict[str, Any]]:
+        """
+        通話結束：關閉解碼器、切出最後一段並送出分段清單。
+
+        Returns:
+            分段清單 (manifest)，分段失敗時回傳 None。
+        """
+        if self._process is None:
+            return None
+        if self._process.stdin is not None and not self._process.stdin.is_closing():
+            self._process.stdin.close()
+        if self._reader_task is not None:
+            await self._reader_task
+        return_code = await self._process.wait()
+        if return_code != 0:
+            logger.warning(
+                "分段歸檔: 房間 %s 的 FFmpeg 結束碼 %d，分段可能不完整", self.room_id, return_code
+            )
+            self.failed = True
+
+        if self._pcm:
+            self._emit_segment(bytes(self._pcm), is_last=True)
+            self._pcm.clear()
+        elif self.segments:
+            self.segments[-1]["is_last"] = True
+        if self._notify_tasks:
+            await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+
+        if self.segments:
+            artifact_index.register(self.output_dir, KIND_RECORDING_SEGMENTS)
+
+        manifest = {
+            "call_instance": self.call_instance,
+            "segment_count": len(self.segments),
+            "total_duration_seconds": self._emitted_bytes / SAMPLE_WIDTH / SAMPLE_RATE,
+            "complete": not self.failed,
+        }
+        await call_session_manager.notify_recording_manifest(self.room_id, manifest)
+        return manifest
+
+
+class SegmentArchiveService:
+    """管理各房間的分段歸檔器"""
+
+    def __init__(self):
+        self.archivers: Dict[str, RoomSegmentArchiver] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RECORDING_SEGMENT_SECONDS > 0
+
+    async def feed(self, room_id: str, client_id: str, chunk: bytes):
+        """將音訊塊交給房間的歸檔器，房間第一次收到音訊時建立歸檔器。"""
+        if not self.enabled:
+            return
+        archiver = self.archivers.get(room_id)
+        if archiver is None:
+            archiver = RoomSegmentArchiver(
+                room_id, client_id, settings.RECORDING_SEGMENT_SECONDS
+            )
+            self.archivers[room_id] = archiver
+            await archiver.start()
+        if archiver.client_id == client_id:
+            await archiver.feed(chunk)
+
+    async def finish(self, room_id: str):
+        """房間所有連線結束時呼叫，送出最後一段與分段清單。"""
+        archiver = self.archivers.pop(room_id, None)
+        if archiver is None:
+            return
+        try:
+            await archiver.finish()
+        except Exception as e:
+            logger.error("分段歸檔: 房間 %s 收尾失敗: %s", room_id, e, exc_info=True)
+
+
+segment_archive_service = SegmentArchiveService()
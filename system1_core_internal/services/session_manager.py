@@ -59,8 +59,7 @@ class CallSessionManager:
 
             # 將音檔的相對路徑轉換為一個完整的、可公開訪問的 URL
             # 例如：/storage/audio/some-uuid.wav -> http://localhost:8004/storage/audio/some-uuid.wav
-            relative_path = Path(audio_file.file_path).relative_to(settings.BASE_DIR)
-            download_url = f"{settings.CORE_SYSTEM_BASE_URL}/{relative_path.as_posix()}"
+            download_url = self._build_download_url(audio_file.file_path)
 
             payload = {
                 "call_session_id": session_id,
@@ -97,6 +96,60 @@ class CallSessionManager:
             # 無論通知成功與否，都清理會話
             self._cleanup_session(session_id)
 
+    def _build_download_url(self, file_path: str) -> str:
+        """將本機檔案路徑轉換為系統二可下載的完整 URL。"""
+        relative_path = Path(file_path).relative_to(settings.BASE_DIR)
+        return f"{settings.CORE_SYSTEM_BASE_URL}/{relative_path.as_posix()}"
+
+    async def _post_to_assurance_system(self, path: str, payload: dict) -> bool:
+        """呼叫系統二的內部 API，失敗只記錄錯誤，不中斷錄音流程。"""
+        try:
+            response = await self.http_client.post(
+                f"{settings.ASSURANCE_SYSTEM_API_URL}{path}", json=payload, timeout=10.0
+            )
+            response.raise_for_status()
+            return True
+        except httpx.RequestError as e:
+            logger.error("❌ 無法連接到品質保障系統 (%s): %s", path, e)
+        except httpx.HTTPStatusError as e:
+            logger.error(
+                "❌ 品質保障系統回應錯誤 (%s): 狀態碼 %d, 內容: %s",
+                path,
+                e.response.status_code,
+                e.response.text,
+            )
+        return False
+
+    async def notify_recording_segment(self, session_id: str, segment: dict):
+        """
+        由分段歸檔服務呼叫，通知系統二有一段新的正式錄音分段可供下載。
+        """
+        payload = {
+            "call_session_id": session_id,
+            "index": segment["index"],
+            "start_seconds": segment["start_seconds"],
+            "duration_seconds": segment["duration_seconds"],
+            "segment_url": self._build_download_url(segment["file_path"]),
+            "is_last": segment["is_last"],
+            "call_instance": segment["call_instance"],
+        }
+        if await self._post_to_assurance_system(
+            "/api/internal/recording-segment", payload
+        ):
+            logger.info("會話 %s：已通知第 %d 段錄音分段", session_id, segment["index"])
+
+    async def notify_recording_manifest(self, session_id: str, manifest: dict):
+        """
+        通話結束時通知系統二分段清單，讓系統二確認是否已收齊所有分段。
+        """
+        payload = {"call_session_id": session_id, **manifest}
+        if await self._post_to_assurance_system(
+            "/api/internal/recording-manifest", payload
+        ):
+            logger.info(
+                "會話 %s：已送出分段清單 (共 %d 段)", session_id, manifest["segment_count"]
+            )
+
     def _cleanup_session(self, session_id: str):
         """清理已處理完畢的會話，釋放記憶體資源。"""
         if session_id in self.sessions:
@@ -2,6 +2,7 @@
 AudioAssuranceSystem - 主 FastAPI 應用程式檔案 (系統二版本)
 """
 
+import asyncio
 import logging
 from datetime import datetime
 from fastapi import FastAPI
@@ -12,6 +13,15 @@ from config.settings import settings
 
 from api import routes as http_routes
 from api import websocket as websocket_routes
+from services.analysis_service import analysis_service
+from services.artifact_index import artifact_index
+from services.llm_cache import llm_result_cache
+from services.openai_gateway import close_openai_gateway
+from services.quality_rollups import quality_rollup_store
+from services.report_store import report_store
+from services.retention_service import retention_service
+from services.stt_backends import get_stt_backend
+from services.transcript_search import transcript_search_index
 
 # --- 應用程式初始化 ---
 app = FastAPI(
@@ -35,6 +45,38 @@ app.include_router(http_routes.router)
 app.include_router(websocket_routes.router)
 
 
+# --- 生命週期事件 ---
+@app.on_event("startup")
+async def warm_up_stt_backend():
+    """預先載入 STT 後端 (本地模型會在此時於 worker 行程中載入)。"""
+    get_stt_backend().warm_up()
+
+
+@app.on_event("startup")
+async def start_search_index_backfill():
+    """在背景為尚未建立檢索索引的既有報告補建索引。"""
+    asyncio.create_task(analysis_service.backfill_search_index())
+
+
+@app.on_event("startup")
+async def start_retention_job():
+    """啟動定期的資料保留清理。"""
+    retention_service.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_stt_backend():
+    """停止資料保留排程，釋放 STT 後端、OpenAI 共用連線池與各 SQLite 資料庫。"""
+    await retention_service.stop()
+    get_stt_backend().shutdown()
+    await close_openai_gateway()
+    llm_result_cache.close()
+    report_store.close()
+    quality_rollup_store.close()
+    transcript_search_index.close()
+    artifact_index.close()
+
+
 # --- 靜態檔案 (Static Files) 服務設定 ---
 try:
     # 系統二的音檔也需要能被訪問（例如在儀表板中播放）
@@ -2,13 +2,19 @@
 AudioAssuranceSystem - HTTP API 端點 (系統二版本)
 """
 
-from typing import List
-from fastapi import APIRouter, HTTPException, Query
+import hashlib
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel, HttpUrl
 
 from services.analysis_service import analysis_service
 from services.analysis_coordinator import analysis_coordinator  # 引入新的協調器
-from models.call_models import AnalysisReport
+from services.realtime_transcription_service import realtime_transcription_service
+from services.recording_segment_service import recording_segment_service
+from services.retention_service import retention_service
+from services.transcript_search import FIELDS as SEARCH_FIELDS
+from models.call_models import AnalysisReport, AnalysisStatus, ReportSummaryPage
 
 router = APIRouter(prefix="/api", tags=["Dashboard & Internal"])
 
@@ -34,23 +40,168 @@ async def trigger_analysis(payload: AnalysisTriggerPayload):
     }
 
 
+class RecordingSegmentPayload(BaseModel):
+    call_session_id: str
+    index: int
+    start_seconds: float
+    duration_seconds: float
+    segment_url: HttpUrl
+    is_last: bool = False
+    # 系統一為每通電話產生的識別碼 (房間 ID 會被重複使用)，舊版系統一不會送出
+    call_instance: Optional[str] = None
+
+
+class RecordingManifestPayload(BaseModel):
+    call_session_id: str
+    segment_count: int
+    total_duration_seconds: float
+    complete: bool = True
+    call_instance: Optional[str] = None
+
+
+@router.post("/internal/recording-segment", status_code=202)
+async def receive_recording_segment(payload: RecordingSegmentPayload):
+    """
+    接收系統一在通話中歸檔的正式錄音分段，並在背景開始轉錄。
+    """
+    recording_segment_service.add_segment(
+        session_id=payload.call_session_id,
+        index=payload.index,
+        start_seconds=payload.start_seconds,
+        duration_seconds=payload.duration_seconds,
+        url=str(payload.segment_url),
+        call_instance=payload.call_instance,
+    )
+    return {"message": "Segment accepted.", "index": payload.index}
+
+
+@router.post("/internal/recording-manifest", status_code=202)
+async def receive_recording_manifest(payload: RecordingManifestPayload):
+    """
+    接收系統一在通話結束時送出的分段清單。
+    """
+    recording_segment_service.set_manifest(
+        session_id=payload.call_session_id,
+        segment_count=payload.segment_count,
+        complete=payload.complete,
+        call_instance=payload.call_instance,
+    )
+    return {"message": "Manifest accepted.", "segment_count": payload.segment_count}
+
+
+# --- 報告摘要 API (儀表板列表使用，不含轉錄稿與 LLM 說明) ---
+@router.get("/reports/summary", response_model=ReportSummaryPage)
+async def get_report_summaries(
+    request: Request,
+    status: Optional[AnalysisStatus] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    max_score: Optional[float] = Query(None, ge=0, le=100),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    since: Optional[float] = Query(None, description="上次回應的 sync_token，指定時改為增量同步"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    分頁取得報告摘要，或以 since 取得上次同步後的變動。
+
+    增量同步帶篩選條件時，變動後不再符合條件的報告會列在 deleted 中；
+    回應 resync_required 為 true 時，需不帶 since 重新分頁載入全部摘要。
+
+    回應帶有 ETag；資料未變動時，帶 If-None-Match 的請求會收到 304。
+    """
+    # ETag = 資料版本 + 查詢參數，資料未變動時不必查詢與序列化
+    revision = await analysis_service.report_revision()
+    digest = hashlib.sha1(f"{revision}?{request.url.query}".encode()).hexdigest()
+    etag = f'W/"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        page = await analysis_service.query_report_summaries(
+            status=status,
+            min_score=min_score,
+            max_score=max_score,
+            created_from=created_from,
+            created_to=created_to,
+            cursor=cursor,
+            since=since,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # 直接以 pydantic-core 序列化，略過 FastAPI 的 jsonable_encoder
+    return Response(
+        content=page.model_dump_json(), media_type="application/json", headers=headers
+    )
+
+
 # --- 原有的報告查詢 API 維持不變 ---
 @router.get("/reports", response_model=List[AnalysisReport])
 async def get_analysis_reports():
     """獲取所有分析報告的列表。"""
-    reports = list(analysis_service.reports.values())
-    return reports
+    return await analysis_service.list_reports()
 
 
 @router.get("/reports/{report_id}", response_model=AnalysisReport)
 async def get_report_details(report_id: str):
     """根據 ID 獲取單一分析報告的詳細資訊。"""
-    report = analysis_service.get_report(report_id)
+    report = await analysis_service.get_report(report_id)
     if not report:
         raise HTTPException(status_code=404, detail=f"找不到報告 ID: {report_id}")
     return report
 
 
+@router.get("/analytics")
+async def get_quality_analytics(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    participant_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """
+    取得品質指標趨勢：每個時間桶的平均分數、失敗率與分數分布，以及整段期間的合計。
+
+    資料來自報告完成時增量維護的彙總表，查詢成本只與時間範圍內的時間桶數有關。
+    """
+    return await analysis_service.query_quality_analytics(
+        granularity=granularity, participant_id=participant_id, start=start, end=end
+    )
+
+
+@router.get("/search")
+async def search_transcripts(
+    q: str = Query(..., min_length=1, description="搜尋字串，多個詞以空白分隔 (需全部命中)"),
+    field: Optional[List[str]] = Query(
+        None, description="限定搜尋欄位: recording、monitoring、key_differences"
+    ),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    全文檢索通話轉錄稿與 LLM 差異說明，依相關度排序並回傳標示命中位置的片段。
+    """
+    if field and not set(field) <= set(SEARCH_FIELDS):
+        raise HTTPException(status_code=400, detail=f"不支援的搜尋欄位: {field}")
+    try:
+        results = await analysis_service.search_transcripts(query=q, fields=field, limit=limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"query": q, "results": results}
+
+
+@router.get("/metrics/stt")
+async def get_stt_queue_metrics():
+    """取得 STT 排程狀態：即時 (interactive) 與批次 (batch) 請求的排隊等待時間。"""
+    return analysis_service.stt_service.get_queue_stats()
+
+
+@router.get("/metrics/realtime")
+async def get_realtime_metrics():
+    """取得各房間即時轉錄的吞吐量：接收的音訊量、轉錄片段數與 STT 延遲。"""
+    return realtime_transcription_service.get_room_metrics()
+
+
 @router.post("/reset-progress", status_code=200)
 async def reset_progress():
     """手動重置進度條狀態。"""
@@ -68,24 +219,31 @@ async def reset_progress():
 @router.delete("/reports/cleanup", status_code=200)
 async def cleanup_old_reports(days: int = 30):
     """清理超過指定天數的舊報告。"""
-    from datetime import datetime, timedelta
-    
     cutoff_date = datetime.now() - timedelta(days=days)
-    removed_count = 0
-    
-    reports_to_remove = []
-    for report_id, report in analysis_service.reports.items():
-        if report.created_at < cutoff_date:
-            reports_to_remove.append(report_id)
-    
-    for report_id in reports_to_remove:
-        del analysis_service.reports[report_id]
-        removed_count += 1
-    
-    if removed_count > 0:
-        analysis_service._save_reports()
-    
+    removed_count, reclaimed_bytes = await analysis_service.delete_reports_older_than(
+        cutoff_date
+    )
+
     return {
         "message": f"已清理 {removed_count} 個超過 {days} 天的舊報告",
-        "removed_count": removed_count
+        "removed_count": removed_count,
+        "reclaimed_bytes": reclaimed_bytes,
+    }
+
+
+@router.post("/retention/run", status_code=200)
+async def run_retention():
+    """立即依保留政策清理過期的報告與歸檔檔案，回傳各類資料釋放的空間。"""
+    return await retention_service.run_once()
+
+
+@router.get("/retention/status")
+async def get_retention_status():
+    """取得保留政策與最近一次清理的結果。"""
+    return {
+        "policies": [
+            {"kind": policy.kind, "retention_days": policy.retention_days}
+            for policy in retention_service.policies
+        ],
+        "last_run": retention_service.last_run,
     }
@@ -1,8 +1,11 @@
 import logging
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
 from services.monitoring_service import monitoring_service
 from services.realtime_transcription_service import realtime_transcription_service
+from services.report_events import report_event_hub
 
 
 logger = logging.getLogger(__name__)
@@ -33,11 +36,30 @@ async def realtime_transcription_endpoint(websocket: WebSocket, room_id: str, cl
 
 
 @router.websocket("/current-transcription")
-async def transcription_results_endpoint(websocket: WebSocket):
+async def transcription_results_endpoint(
+    websocket: WebSocket,
+    room_id: Optional[List[str]] = Query(None),
+    since_seq: Optional[int] = Query(None),
+):
+    """
+    將進行中通話的轉錄結果，即時推送到監控儀表板。
+    可用 room_id 查詢參數 (可重複) 只訂閱特定房間，未指定時訂閱全部房間；
+    連線後先補送 since_seq 之後 (未指定時為全部) 的字幕。
+    """
+    try:
+        await realtime_transcription_service.handle_results_consumer(
+            websocket, rooms=room_id, since_seq=since_seq
+        )
+    except Exception as e:
+        logger.error("在即時轉錄結果推送連線中發生錯誤: %s", e)
+
+
+@router.websocket("/reports")
+async def report_events_endpoint(websocket: WebSocket):
     """
-    將當前活躍通話的轉錄結果，即時推送到監控儀表板。
+    推送分析報告的生命週期事件 (建立、狀態變更、完成、刪除) 到監控儀表板。
     """
     try:
-        await realtime_transcription_service.handle_results_consumer(websocket)
+        await report_event_hub.handle_subscriber(websocket)
     except Exception as e:
-        logger.error("在即時轉錄結果推送連線中發生錯誤: %s", e)
\ No newline at end of file
+        logger.error("在報告事件推送連線中發生錯誤: %s", e)
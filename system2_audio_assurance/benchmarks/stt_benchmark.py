@@ -0,0 +1,115 @@
+"""
+STT 後端效能基準測試 - 比較 OpenAI API 與本地離線引擎的延遲與吞吐量
+
+使用方式 (於 system2_audio_assurance 目錄下執行)：
+    python -m benchmarks.stt_benchmark --files a.wav b.wav \\
+        --backends whisper-1 local:small --concurrency 4 --repeat 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+from config.settings import settings
+from services.stt_backends import STTBackend, create_stt_backend
+from utils.audio_utils import get_audio_duration
+
+
+@dataclass
+class BenchmarkResult:
+    """單一後端的量測結果"""
+
+    backend: str
+    latencies: List[float] = field(default_factory=list)
+    audio_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    errors: int = 0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def row(self) -> str:
+        requests = len(self.latencies)
+        mean = statistics.mean(self.latencies) if self.latencies else 0.0
+        throughput = requests / self.wall_seconds if self.wall_seconds else 0.0
+        speed = self.audio_seconds / self.wall_seconds if self.wall_seconds else 0.0
+        return (
+            f"{self.backend:<20} {requests:>5} {self.errors:>4} "
+            f"{mean:>8.2f} {self.percentile(50):>8.2f} {self.percentile(95):>8.2f} "
+            f"{throughput:>8.2f} {speed:>9.1f}x"
+        )
+
+
+async def _run_backend(
+    model: str, files: List[Path], concurrency: int, repeat: int
+) -> BenchmarkResult:
+    backend: STTBackend = create_stt_backend(model)
+    result = BenchmarkResult(backend=model)
+    durations = {path: get_audio_duration(path) for path in files}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # 暖機請求不列入統計 (本地模型在此時完成載入)
+    backend.warm_up()
+    await backend.transcribe(files[0], settings.STT_PROMPT)
+
+    async def _one(path: Path):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await backend.transcribe(path, settings.STT_PROMPT)
+            except Exception as e:
+                result.errors += 1
+                print(f"[{model}] {path.name} 轉錄失敗: {e}")
+                return
+            result.latencies.append(time.perf_counter() - started)
+            result.audio_seconds += durations[path]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one(path) for _ in range(repeat) for path in files))
+    result.wall_seconds = time.perf_counter() - started
+    backend.shutdown()
+    return result
+
+
+async def main(args: argparse.Namespace):
+    files = [Path(f) for f in args.files]
+    missing = [str(f) for f in files if not f.exists()]
+    if missing:
+        raise SystemExit(f"找不到音檔: {', '.join(missing)}")
+
+    results = []
+    for model in args.backends:
+        print(f"量測後端 {model} ...")
+        results.append(
+            await _run_backend(model, files, args.concurrency, args.repeat)
+        )
+
+    print()
+    print(
+        f"{'backend':<20} {'reqs':>5} {'err':>4} {'mean(s)':>8} {'p50(s)':>8} "
+        f"{'p95(s)':>8} {'req/s':>8} {'音訊速率':>9}"
+    )
+    for result in results:
+        print(result.row())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="STT 後端延遲與吞吐量基準測試")
+    parser.add_argument("--files", nargs="+", required=True, help="測試用音檔")
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=[settings.STT_MODEL, "local:small"],
+        help="要比較的 STT_MODEL 值，例如 whisper-1 local:small",
+    )
+    parser.add_argument("--concurrency", type=int, default=4, help="同時進行的請求數")
+    parser.add_argument("--repeat", type=int, default=3, help="每個音檔重複次數")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+STT 上傳格式基準測試 - 量測不同上傳格式下的檔案大小與端到端轉錄延遲
+
+端到端延遲 = 前處理編碼時間 + STT 請求時間 (含上傳)。
+
+使用方式 (於 system2_audio_assurance 目錄下執行)：
+    python -m benchmarks.stt_upload_benchmark --files a.wav b.wav \\
+        --formats wav flac opus --repeat 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+from config.settings import settings
+from services.audio_preprocessor import UPLOAD_FORMATS, encode_pcm, load_pcm
+from services.stt_backends import create_stt_backend
+from utils.vad import compact_silence
+
+
+@dataclass
+class UploadSample:
+    """單一音檔在單一格式下的量測結果"""
+
+    file_name: str
+    upload_format: str
+    audio_seconds: float
+    upload_bytes: int
+    encode_seconds: float
+    stt_seconds: List[float] = field(default_factory=list)
+
+    def row(self) -> str:
+        stt = statistics.median(self.stt_seconds) if self.stt_seconds else 0.0
+        total = self.encode_seconds + stt
+        return (
+            f"{self.file_name:<24} {self.upload_format:<6} {self.audio_seconds:>8.1f} "
+            f"{self.upload_bytes / 1024:>10.1f} {self.encode_seconds:>8.2f} "
+            f"{stt:>8.2f} {total:>8.2f}"
+        )
+
+
+async def main(args: argparse.Namespace):
+    backend = create_stt_backend(args.backend)
+    backend.warm_up()
+    samples_out: List[UploadSample] = []
+
+    for path in (Path(f) for f in args.files):
+        pcm, sample_rate = load_pcm(path)
+        if args.trim:
+            pcm, _ = compact_silence(
+                pcm,
+                sample_rate,
+                threshold_dbfs=settings.STT_SILENCE_THRESHOLD_DBFS,
+                min_silence_seconds=settings.STT_SILENCE_MIN_SECONDS,
+                keep_silence_seconds=settings.STT_SILENCE_KEEP_SECONDS,
+            )
+        for upload_format in args.formats:
+            started = time.perf_counter()
+            upload = encode_pcm(pcm, sample_rate, upload_format, path.stem)
+            sample = UploadSample(
+                file_name=path.name,
+                upload_format=upload_format,
+                audio_seconds=len(pcm) / sample_rate,
+                upload_bytes=len(upload[1]),
+                encode_seconds=time.perf_counter() - started,
+            )
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await backend.transcribe(upload, settings.STT_PROMPT)
+                sample.stt_seconds.append(time.perf_counter() - started)
+            samples_out.append(sample)
+            print(f"完成 {path.name} ({upload_format})")
+
+    backend.shutdown()
+    print()
+    print(
+        f"{'file':<24} {'format':<6} {'audio(s)':>8} {'size(KB)':>10} "
+        f"{'encode':>8} {'stt(p50)':>8} {'total':>8}"
+    )
+    for sample in sorted(samples_out, key=lambda s: s.upload_bytes):
+        print(sample.row())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="STT 上傳格式與端到端延遲基準測試")
+    parser.add_argument("--files", nargs="+", required=True, help="測試用音檔")
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=list(UPLOAD_FORMATS),
+        choices=list(UPLOAD_FORMATS),
+        help="要比較的上傳格式",
+    )
+    parser.add_argument("--backend", default=settings.STT_MODEL, help="STT_MODEL 值")
+    parser.add_argument("--repeat", type=int, default=3, help="每種格式重複次數")
+    parser.add_argument("--trim", action="store_true", help="編碼前先壓縮靜音")
+    asyncio.run(main(parser.parse_args()))
@@ -28,6 +28,176 @@ class Settings:
     STT_MODEL: str = os.getenv("STT_MODEL", "whisper-1")
     STT_PROMPT: str = os.getenv("STT_PROMPT", "繁體中文")
 
+    # === LLM 快速判定：兩份轉錄稿相似度達門檻時直接給 100 分，不呼叫 GPT ===
+    LLM_FAST_PATH_ENABLED: bool = (
+        os.getenv("LLM_FAST_PATH_ENABLED", "true").lower() == "true"
+    )
+    LLM_FAST_PATH_THRESHOLD: float = float(os.getenv("LLM_FAST_PATH_THRESHOLD", "0.99"))
+    # 相似度達門檻仍需通過的檢查：長度比例下限、最長連續差異字數 (數字與否定詞的改變一律不快速判定)
+    LLM_FAST_PATH_MIN_LENGTH_RATIO: float = float(
+        os.getenv("LLM_FAST_PATH_MIN_LENGTH_RATIO", "0.98")
+    )
+    LLM_FAST_PATH_MAX_DIFF_CHARS: int = int(os.getenv("LLM_FAST_PATH_MAX_DIFF_CHARS", "4"))
+
+    # === LLM 分段比對：基準轉錄稿超過 LLM_SEGMENT_MAX_CHARS 字時切窗並行比對 ===
+    LLM_SEGMENT_MAX_CHARS: int = int(os.getenv("LLM_SEGMENT_MAX_CHARS", "3000"))
+    LLM_SEGMENT_WINDOW_CHARS: int = int(os.getenv("LLM_SEGMENT_WINDOW_CHARS", "1500"))
+    # 監控轉錄稿窗口兩側多取的字數，吸收對齊誤差
+    LLM_SEGMENT_MARGIN_CHARS: int = int(os.getenv("LLM_SEGMENT_MARGIN_CHARS", "40"))
+
+    # === LLM 提示詞模式：full (送出完整轉錄稿) 或 diff (只送出逐字對齊後的差異區段) ===
+    LLM_PROMPT_MODE: str = os.getenv("LLM_PROMPT_MODE", "diff").lower()
+    LLM_DIFF_CONTEXT_CHARS: int = int(os.getenv("LLM_DIFF_CONTEXT_CHARS", "20"))
+    # 差異提示詞長度超過完整提示詞的此比例時，改送完整內容
+    LLM_DIFF_MAX_RATIO: float = float(os.getenv("LLM_DIFF_MAX_RATIO", "0.6"))
+
+    # === LLM 分析結果快取 (SQLite，存放於 STORAGE_PATH) ===
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL_HOURS: float = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+    # === STT 前處理：上傳前移除長段靜音 ===
+    STT_SILENCE_TRIM_ENABLED: bool = (
+        os.getenv("STT_SILENCE_TRIM_ENABLED", "true").lower() == "true"
+    )
+    STT_SILENCE_THRESHOLD_DBFS: float = float(
+        os.getenv("STT_SILENCE_THRESHOLD_DBFS", "-45")
+    )
+    # 超過此長度 (秒) 的靜音才會被移除，兩側各保留 STT_SILENCE_KEEP_SECONDS
+    STT_SILENCE_MIN_SECONDS: float = float(os.getenv("STT_SILENCE_MIN_SECONDS", "1.0"))
+    STT_SILENCE_KEEP_SECONDS: float = float(os.getenv("STT_SILENCE_KEEP_SECONDS", "0.2"))
+
+    # === STT 前處理：上傳前重新編碼 (opus / flac / wav) ===
+    STT_UPLOAD_FORMAT: str = os.getenv("STT_UPLOAD_FORMAT", "opus")
+    STT_UPLOAD_BITRATE: str = os.getenv("STT_UPLOAD_BITRATE", "24k")
+    STT_UPLOAD_SAMPLE_RATE: int = int(os.getenv("STT_UPLOAD_SAMPLE_RATE", "16000"))
+    STT_PREPROCESS_WORKERS: int = int(os.getenv("STT_PREPROCESS_WORKERS", "2"))
+
+    # === 多房間即時轉錄 ===
+    # 同時進行即時轉錄的房間上限 (0 表示不限制)，超過時拒絕新房間的音訊來源
+    REALTIME_MAX_ROOMS: int = int(os.getenv("REALTIME_MAX_ROOMS", "10"))
+    # 單一房間同時進行的 STT 請求上限，避免單一房間佔滿即時轉錄的名額
+    REALTIME_ROOM_STT_CONCURRENCY: int = int(os.getenv("REALTIME_ROOM_STT_CONCURRENCY", "2"))
+
+    # 每個監控端連線的送出佇列長度與單次送出時限 (秒)，超過時視為跟不上並中斷該連線
+    REALTIME_CONSUMER_QUEUE_SIZE: int = int(os.getenv("REALTIME_CONSUMER_QUEUE_SIZE", "100"))
+    REALTIME_CONSUMER_SEND_TIMEOUT_SECONDS: float = float(
+        os.getenv("REALTIME_CONSUMER_SEND_TIMEOUT_SECONDS", "5")
+    )
+
+    # 每通電話保留在記憶體供中途加入的監控端補送的字幕數；
+    # 啟用 REALTIME_HISTORY_DISK_REPLAY 時，更早的字幕從即時片段檔補讀
+    REALTIME_HISTORY_SIZE: int = int(os.getenv("REALTIME_HISTORY_SIZE", "200"))
+    REALTIME_HISTORY_DISK_REPLAY: bool = (
+        os.getenv("REALTIME_HISTORY_DISK_REPLAY", "true").lower() == "true"
+    )
+
+    # === 即時轉錄語音活動偵測：串流解碼為 PCM 後，在語句停頓處切段 ===
+    REALTIME_VAD_ENABLED: bool = (
+        os.getenv("REALTIME_VAD_ENABLED", "true").lower() == "true"
+    )
+    # 高於此音量 (dBFS) 的音框才可能視為語音，背景雜訊較大時會自動上調
+    REALTIME_VAD_THRESHOLD_DBFS: float = float(
+        os.getenv("REALTIME_VAD_THRESHOLD_DBFS", "-40")
+    )
+    # 停頓超過此長度 (毫秒) 即切段；語音累積未達 REALTIME_VAD_MIN_SPEECH_MS 視為雜訊
+    REALTIME_VAD_MIN_SILENCE_MS: int = int(os.getenv("REALTIME_VAD_MIN_SILENCE_MS", "500"))
+    REALTIME_VAD_MIN_SPEECH_MS: int = int(os.getenv("REALTIME_VAD_MIN_SPEECH_MS", "200"))
+    # 單一片段的最大長度 (秒)，持續說話時也會切段以限制字幕延遲
+    REALTIME_MAX_SEGMENT_SECONDS: float = float(
+        os.getenv("REALTIME_MAX_SEGMENT_SECONDS", "8")
+    )
+
+    # === 即時轉錄暫定字幕：定期轉錄進行中的片段，先推送暫定結果，之後由正式結果取代 ===
+    REALTIME_PARTIAL_ENABLED: bool = (
+        os.getenv("REALTIME_PARTIAL_ENABLED", "true").lower() == "true"
+    )
+    # 同一房間兩次暫定轉錄的最小間隔 (秒)，進行中的片段需至少 REALTIME_PARTIAL_MIN_SECONDS
+    REALTIME_PARTIAL_INTERVAL_SECONDS: float = float(
+        os.getenv("REALTIME_PARTIAL_INTERVAL_SECONDS", "1.5")
+    )
+    REALTIME_PARTIAL_MIN_SECONDS: float = float(
+        os.getenv("REALTIME_PARTIAL_MIN_SECONDS", "1.0")
+    )
+    # 每個房間每分鐘最多的暫定轉錄次數 (STT 請求預算)
+    REALTIME_PARTIAL_MAX_PER_MINUTE: float = float(
+        os.getenv("REALTIME_PARTIAL_MAX_PER_MINUTE", "20")
+    )
+
+    # === 即時片段重用：即時轉錄完整涵蓋通話時，直接作為監控端轉錄稿 ===
+    REALTIME_REUSE_ENABLED: bool = (
+        os.getenv("REALTIME_REUSE_ENABLED", "true").lower() == "true"
+    )
+    # 片段涵蓋時間佔監控音檔長度的最低比例，低於此值視為有缺口
+    REALTIME_REUSE_MIN_COVERAGE: float = float(
+        os.getenv("REALTIME_REUSE_MIN_COVERAGE", "0.8")
+    )
+    # 分析開始時即時串流尚未結束，最多等待的秒數
+    REALTIME_REUSE_WAIT_SECONDS: float = float(
+        os.getenv("REALTIME_REUSE_WAIT_SECONDS", "5")
+    )
+
+    # === 正式錄音分段：使用系統一在通話中送來的分段轉錄結果，取代事後整檔轉錄 ===
+    RECORDING_SEGMENTS_ENABLED: bool = (
+        os.getenv("RECORDING_SEGMENTS_ENABLED", "true").lower() == "true"
+    )
+    # 等待系統一送出分段清單的最長秒數
+    RECORDING_SEGMENT_WAIT_SECONDS: float = float(
+        os.getenv("RECORDING_SEGMENT_WAIT_SECONDS", "10")
+    )
+    # 分段狀態超過此秒數沒有新通知且未被分析取用時釋放，並取消其轉錄工作
+    RECORDING_SEGMENT_SESSION_TTL_SECONDS: float = float(
+        os.getenv("RECORDING_SEGMENT_SESSION_TTL_SECONDS", "3600")
+    )
+
+    # === OpenAI 共用客戶端 (連線池、限流與重試) ===
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10")
+    )
+    OPENAI_TIMEOUT_SECONDS: float = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "120"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+    OPENAI_RETRY_BASE_SECONDS: float = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", "0.5"))
+    OPENAI_RETRY_MAX_SECONDS: float = float(os.getenv("OPENAI_RETRY_MAX_SECONDS", "30"))
+    # 每分鐘額度，設為 0 表示不限制
+    STT_REQUESTS_PER_MINUTE: float = float(os.getenv("STT_REQUESTS_PER_MINUTE", "50"))
+    STT_AUDIO_SECONDS_PER_MINUTE: float = float(
+        os.getenv("STT_AUDIO_SECONDS_PER_MINUTE", "0")
+    )
+    STT_MAX_CONCURRENCY: int = int(os.getenv("STT_MAX_CONCURRENCY", "8"))
+    # 保留給即時轉錄的併發名額，以及即時轉錄排隊等待的延遲上限 (秒)
+    STT_REALTIME_RESERVED_SLOTS: int = int(os.getenv("STT_REALTIME_RESERVED_SLOTS", "2"))
+    STT_REALTIME_SLO_SECONDS: float = float(os.getenv("STT_REALTIME_SLO_SECONDS", "1.5"))
+    LLM_REQUESTS_PER_MINUTE: float = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    LLM_TOKENS_PER_MINUTE: float = float(os.getenv("LLM_TOKENS_PER_MINUTE", "30000"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+    # === 本地離線 STT 設定 (STT_MODEL 設為 "local:<模型>" 時啟用，例如 local:small) ===
+    STT_LOCAL_WORKERS: int = int(os.getenv("STT_LOCAL_WORKERS", "1"))
+    STT_LOCAL_DEVICE: str = os.getenv("STT_LOCAL_DEVICE", "cpu")
+    STT_LOCAL_COMPUTE_TYPE: str = os.getenv("STT_LOCAL_COMPUTE_TYPE", "int8")
+    STT_LOCAL_CPU_THREADS: int = int(os.getenv("STT_LOCAL_CPU_THREADS", "0"))
+    # 預先下載的模型目錄，離線環境請指向已存放模型的路徑
+    STT_LOCAL_MODEL_DIR: str = os.getenv("STT_LOCAL_MODEL_DIR", "")
+
+    # === 報告快取：記憶體中最多保留的完整報告數 (其餘報告只保留摘要) ===
+    REPORT_CACHE_SIZE: int = int(os.getenv("REPORT_CACHE_SIZE", "200"))
+
+    # === 資料保留：各類資料的保留天數 (0 表示永久保留)，以及排程清理間隔 (0 表示停用排程) ===
+    # 預設全部永久保留，升級後不會刪除既有資料；需要清理時再逐項設定天數
+    RETENTION_REPORT_DAYS: float = float(os.getenv("RETENTION_REPORT_DAYS", "0"))
+    RETENTION_MONITORING_AUDIO_DAYS: float = float(
+        os.getenv("RETENTION_MONITORING_AUDIO_DAYS", "0")
+    )
+    RETENTION_REALTIME_SEGMENT_DAYS: float = float(
+        os.getenv("RETENTION_REALTIME_SEGMENT_DAYS", "0")
+    )
+    RETENTION_INTERVAL_HOURS: float = float(os.getenv("RETENTION_INTERVAL_HOURS", "6"))
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+    # 報告刪除墓碑的保留天數，即儀表板增量同步可間隔的最長時間 (0 表示永久保留)；
+    # 超過此時間未同步的儀表板會被要求重新載入全部摘要
+    REPORT_SYNC_TOMBSTONE_DAYS: float = float(os.getenv("REPORT_SYNC_TOMBSTONE_DAYS", "7"))
+
     # === 後端服務埠號 (Ports) ===
     # 系統二現在只關心自己的埠號
     MONITORING_SERVER_PORT: int = int(os.getenv("MONITORING_SERVER_PORT", "8003"))
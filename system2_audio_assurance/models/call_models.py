@@ -120,6 +120,16 @@ class CallSession(BaseModel):
 # --- Analysis Models ---
 
 
+class TranscriptSegment(BaseModel):
+    """
+    轉錄稿中的一個時間片段，時間以原始錄音的時間軸 (秒) 表示
+    """
+
+    start: float = Field(..., description="片段開始時間（秒）")
+    end: float = Field(..., description="片段結束時間（秒）")
+    text: str = Field(..., description="片段文字")
+
+
 class SttResult(BaseModel):
     """
     單次 STT (語音轉文字) 的結果模型
@@ -130,6 +140,25 @@ class SttResult(BaseModel):
         1.0, description="置信度分數 (預設為1.0，因Whisper不直接提供)"
     )
     language: Optional[str] = Field(None, description="識別出的語言")
+    segments: List[TranscriptSegment] = Field(
+        [], description="帶有原始錄音時間戳記的轉錄片段"
+    )
+    trimmed_silence_seconds: float = Field(
+        0.0, description="上傳前移除的靜音長度（秒）"
+    )
+    upload_format: Optional[str] = Field(
+        None, description="上傳至 STT 時使用的音訊格式，例如 opus, flac"
+    )
+    upload_size_bytes: Optional[int] = Field(
+        None, description="上傳至 STT 的音訊大小（位元組）"
+    )
+    source: str = Field(
+        "batch",
+        description=(
+            "轉錄來源: batch (整檔轉錄)、realtime (拼接通話中的即時片段) "
+            "或 segments (拼接系統一的正式錄音分段)"
+        ),
+    )
 
 
 class LlmAnalysisResult(BaseModel):
@@ -142,6 +171,17 @@ class LlmAnalysisResult(BaseModel):
     key_differences: List[str] = Field([], description="兩份文稿之間的主要語意差異點")
     suggestions: List[str] = Field([], description="根據差異點提供的具體改進建議")
     reasoning: str = Field(..., description="解釋給出此準確率分數的理由")
+    analysis_method: str = Field(
+        "llm",
+        description=(
+            "分析方式: llm (GPT 完整比對)、diff (只送出差異區段)、"
+            "segmented (長文分段比對) 或 fast_path (本地相似度直接判定)"
+        ),
+    )
+    text_similarity: Optional[float] = Field(
+        None, description="兩份轉錄稿的本地 n-gram 相似度 (0-1)"
+    )
+    from_cache: bool = Field(False, description="結果是否取自 LLM 分析快取")
 
 
 class AnalysisReport(BaseModel):
@@ -163,6 +203,7 @@ class AnalysisReport(BaseModel):
     monitoring_file_path: Optional[str] = Field(
         None, description="系統二儲存的監控側錄檔的相對路徑"
     )
+    participant_ids: List[str] = Field([], description="此通話的參與者ID列表")
 
     # 對「正式錄音檔」的轉錄結果
     recording_stt_result: Optional[SttResult] = Field(
@@ -187,3 +228,38 @@ class AnalysisReport(BaseModel):
         """Pydantic模型配置"""
 
         use_enum_values = True
+
+
+class ReportSummary(BaseModel):
+    """
+    分析報告的摘要欄位 (不含轉錄稿與 LLM 說明)，常駐記憶體並供列表查詢使用
+    """
+
+    report_id: str = Field(..., description="報告的唯一ID")
+    call_session_id: str = Field(..., description="關聯的通話會話ID")
+    status: AnalysisStatus = Field(..., description="分析任務的當前狀態")
+    accuracy_score: Optional[float] = Field(None, description="LLM 內容一致性分數")
+    created_at: datetime = Field(..., description="報告建立時間")
+    completed_at: Optional[datetime] = Field(None, description="分析完成時間")
+    updated_at: datetime = Field(..., description="報告最後更新時間")
+
+    class Config:
+        """Pydantic模型配置"""
+
+        use_enum_values = True
+
+
+class ReportSummaryPage(BaseModel):
+    """
+    報告摘要列表的單頁回應 (分頁查詢或增量同步)
+    """
+
+    items: List[ReportSummary] = Field(default_factory=list, description="本頁的報告摘要")
+    next_cursor: Optional[str] = Field(None, description="下一頁的游標，沒有下一頁時為 None")
+    deleted: List[str] = Field(
+        default_factory=list, description="增量同步時，自 since 之後被刪除的報告ID"
+    )
+    sync_token: float = Field(..., description="下次增量同步時帶入 since 的值")
+    resync_required: bool = Field(
+        False, description="since 早於刪除墓碑的保留期限，需重新以分頁載入全部摘要"
+    )
@@ -6,7 +6,7 @@ Analysis Coordinator Service
 
 import asyncio
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 import httpx
 
@@ -23,6 +23,7 @@ class AnalysisJob(BaseModel):
     monitoring_file: Optional[AudioFile] = None
     recording_file_url: Optional[str] = None
     recording_file: Optional[AudioFile] = None  # 下載後儲存的物件
+    participant_ids: List[str] = []
 
 
 class AnalysisCoordinator:
@@ -44,10 +45,16 @@ class AnalysisCoordinator:
                 logger.info("分析協調器：已為 %s 建立新的分析任務", session_id)
             return self.jobs[session_id]
 
-    async def set_monitoring_file(self, session_id: str, audio_file: AudioFile):
-        """由 monitoring_service 呼叫，設定側錄參考檔"""
+    async def set_monitoring_file(
+        self,
+        session_id: str,
+        audio_file: AudioFile,
+        participant_ids: Optional[List[str]] = None,
+    ):
+        """由 monitoring_service 呼叫，設定側錄參考檔與通話參與者"""
         job = await self._get_or_create_job(session_id)
         job.monitoring_file = audio_file
+        job.participant_ids = participant_ids or []
         logger.info("分析協調器 (會話 %s): 已登錄側錄參考檔", session_id)
         await self._check_and_trigger_analysis(session_id)
 
@@ -76,6 +83,7 @@ class AnalysisCoordinator:
                 call_session_id=session_id,
                 monitoring_file=job.monitoring_file,
                 recording_file_url=job.recording_file_url,
+                participant_ids=job.participant_ids,
             )
             self._cleanup_job(session_id)
 
@@ -4,10 +4,10 @@ AudioAssuranceSystem - 分析編排服務 (系統二版本)
 
 import asyncio
 import logging
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 import httpx
 import tempfile
-import json
 from pathlib import Path
 from datetime import datetime
 
@@ -17,12 +17,21 @@ from models.call_models import (
     AudioFile,
     LlmAnalysisResult,
     MonitoringProgressStatus,
+    ReportSummary,
+    ReportSummaryPage,
     SttResult,
 )
 from services.llm_service import LLMService
+from services.quality_rollups import quality_rollup_store
+from services.realtime_segment_store import realtime_segment_store
+from services.recording_segment_service import recording_segment_service
+from services.report_events import ReportEventType, report_event_hub
+from services.report_store import report_store
 from services.realtime_transcription_service import realtime_transcription_service
 from services.stt_service import STTService
+from services.transcript_search import transcript_search_index
 from utils.audio_utils import get_audio_duration
+from utils.rate_limit import RequestPriority
 from config.settings import settings # 引入 settings
 
 logger = logging.getLogger(__name__)
@@ -33,9 +42,12 @@ class AnalysisService:
         try:
             self.stt_service = STTService()
             self.llm_service = LLMService()
-            self.reports: Dict[str, AnalysisReport] = {}
+            # 記憶體中只保留摘要；完整報告依需求從資料庫載入並放入 LRU 快取
+            self.report_summaries: Dict[str, ReportSummary] = {}
+            # 分析中的報告會被流程持續修改，完成前固定保留在記憶體
+            self._active_reports: Dict[str, AnalysisReport] = {}
+            self._report_cache: "OrderedDict[str, AnalysisReport]" = OrderedDict()
             self.http_client = httpx.AsyncClient()
-            self.reports_file = settings.STORAGE_PATH / "reports.json"
             self._load_reports()
             logger.info("分析服務 (AnalysisService) 初始化完成")
         except Exception as e:
@@ -47,6 +59,7 @@ class AnalysisService:
         call_session_id: str,
         monitoring_file: AudioFile,
         recording_file_url: str,
+        participant_ids: Optional[List[str]] = None,
     ):
         """建立一個新的分析報告任務，並在背景非同步執行它。"""
         
@@ -58,10 +71,11 @@ class AnalysisService:
             status=AnalysisStatus.PENDING,
             recording_file_url=recording_file_url,
             monitoring_file_path=correct_url_path,
+            participant_ids=participant_ids or [],
         )
         
-        self.reports[report.report_id] = report
-        self._save_reports()
+        self._active_reports[report.report_id] = report
+        await self._save_report(report)
         logger.info(
             "已為通話 %s 建立分析任務，ID: %s", call_session_id, report.report_id
         )
@@ -95,6 +109,28 @@ class AnalysisService:
             logger.error("下載官方錄音檔失敗: %s", e)
             return None
 
+    async def _transcribe_monitoring(
+        self, call_session_id: str, monitoring_file: AudioFile
+    ) -> SttResult:
+        """
+        取得監控端轉錄稿：優先拼接通話中已完成的即時轉錄片段，
+        即時片段有缺口或不存在時才將整個監控音檔送去轉錄。
+        """
+        if settings.REALTIME_REUSE_ENABLED:
+            realtime_result = await realtime_segment_store.build_stt_result(
+                call_session_id, monitoring_file.duration_seconds
+            )
+            if realtime_result is not None:
+                logger.info(
+                    "通話 %s：沿用即時轉錄片段作為監控端轉錄稿 (%d 個片段)",
+                    call_session_id,
+                    len(realtime_result.segments),
+                )
+                return realtime_result
+        return await self.stt_service.transcribe_audio_result(
+            monitoring_file.file_path, priority=RequestPriority.BATCH
+        )
+
     async def _run_analysis_pipeline(
         self,
         report: AnalysisReport,
@@ -105,19 +141,42 @@ class AnalysisService:
         downloaded_recording_path = None
         try:
             report.status = AnalysisStatus.PROCESSING
+            # 寫入狀態變更，儀表板才會收到 STATUS_CHANGED 事件
+            await self._save_report(report)
             logger.info("分析任務 %s 開始處理...", report.report_id)
 
-            # --- 下載官方錄音檔 ---
+            # --- 取得官方錄音：優先使用通話中已轉錄的分段，否則下載完整錄音檔 ---
             await realtime_transcription_service.broadcast_status(
                 MonitoringProgressStatus.FILE_STORAGE,
                 session_id=report.call_session_id,
             )
-            logger.info("分析任務 %s: 開始下載官方錄音檔...", report.report_id)
-            downloaded_recording_path = await self._download_recording_file(
-                recording_file_url
+            monitoring_task = asyncio.create_task(
+                self._transcribe_monitoring(report.call_session_id, monitoring_file)
             )
-            if not downloaded_recording_path:
-                raise RuntimeError(f"無法下載官方錄音檔從 {recording_file_url}")
+            recording_result = None
+            if settings.RECORDING_SEGMENTS_ENABLED:
+                recording_result = await recording_segment_service.build_stt_result(
+                    report.call_session_id
+                )
+            # 監控端轉錄固定執行，正式錄音只有沒有分段結果時才需要轉錄
+            stt_tasks = [monitoring_task]
+            if recording_result is not None:
+                logger.info(
+                    "分析任務 %s：沿用通話中已轉錄的正式錄音分段", report.report_id
+                )
+            else:
+                logger.info("分析任務 %s: 開始下載官方錄音檔...", report.report_id)
+                downloaded_recording_path = await self._download_recording_file(
+                    recording_file_url
+                )
+                if not downloaded_recording_path:
+                    monitoring_task.cancel()
+                    raise RuntimeError(f"無法下載官方錄音檔從 {recording_file_url}")
+                stt_tasks.append(
+                    self.stt_service.transcribe_audio_result(
+                        str(downloaded_recording_path), priority=RequestPriority.BATCH
+                    )
+                )
 
             # --- STT 階段：並行處理兩個音檔 ---
             await realtime_transcription_service.broadcast_status(
@@ -125,20 +184,17 @@ class AnalysisService:
                 session_id=report.call_session_id,
             )
             logger.info("分析任務 %s：開始 STT 轉錄...", report.report_id)
-            stt_tasks = [
-                self.stt_service.transcribe_audio(str(downloaded_recording_path)),
-                self.stt_service.transcribe_audio(monitoring_file.file_path),
-            ]
             results = await asyncio.gather(*stt_tasks, return_exceptions=True)
 
-            if isinstance(results[0], Exception) or isinstance(results[1], Exception):
+            if any(isinstance(result, Exception) for result in results):
                 raise RuntimeError(f"STT 轉錄失敗: {results}")
 
-            transcript_recording, _ = results[0]
-            transcript_monitoring, _ = results[1]
-
-            report.recording_stt_result = SttResult(transcript=transcript_recording)
-            report.monitoring_stt_result = SttResult(transcript=transcript_monitoring)
+            report.monitoring_stt_result = results[0]
+            report.recording_stt_result = (
+                recording_result if recording_result is not None else results[1]
+            )
+            transcript_recording = report.recording_stt_result.transcript
+            transcript_monitoring = report.monitoring_stt_result.transcript
             await realtime_transcription_service.broadcast_status(
                 MonitoringProgressStatus.CROSS_VERIFICATION,
                 session_id=report.call_session_id,
@@ -167,7 +223,8 @@ class AnalysisService:
             )
             report.status = AnalysisStatus.SUCCESS
             report.completed_at = datetime.now() # 增加完成時間
-            self._save_reports()
+            await self._save_report(report)
+            await self._on_report_completed(report)
             logger.info("✅ 分析任務 %s 已成功完成", report.report_id)
             await realtime_transcription_service.broadcast_status(
                 MonitoringProgressStatus.VERIFICATION_SUCCESS,
@@ -183,7 +240,8 @@ class AnalysisService:
             report.status = AnalysisStatus.ERROR
             report.error_message = error_message
             report.completed_at = datetime.now() # 增加完成時間
-            self._save_reports()
+            await self._save_report(report)
+            await self._on_report_completed(report)
             await realtime_transcription_service.broadcast_status(
                 MonitoringProgressStatus.VERIFICATION_FAILED,
                 session_id=report.call_session_id,
@@ -191,37 +249,140 @@ class AnalysisService:
             )
             # realtime_transcription_service.schedule_waiting_reset(delay=8.0)  # 移除自動重置
         finally:
+            # 分析結束，報告改由 LRU 快取管理
+            self._active_reports.pop(report.report_id, None)
+            self._cache_report(report)
             # 清理下載的暫存檔
             if downloaded_recording_path and downloaded_recording_path.exists():
                 downloaded_recording_path.unlink()
                 logger.info("分析任務 %s: 已清理下載的暫存檔", report.report_id)
 
     def _load_reports(self):
-        """從 JSON 檔案載入報告資料"""
-        if self.reports_file.exists():
-            try:
-                with open(self.reports_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    for report_id, report_data in data.items():
-                        self.reports[report_id] = AnalysisReport(**report_data)
-                logger.info(f"已載入 {len(self.reports)} 個歷史報告")
-            except Exception as e:
-                logger.error(f"載入報告檔案失敗: {e}")
-
-    def _save_reports(self):
-        """將報告資料儲存到 JSON 檔案"""
+        """從報告資料庫載入所有報告的摘要 (不解析完整報告與轉錄稿)"""
+        try:
+            for summary in report_store.load_summaries():
+                self.report_summaries[summary.report_id] = summary
+            logger.info("已載入 %d 個歷史報告摘要", len(self.report_summaries))
+        except Exception as e:
+            logger.error("載入報告資料失敗: %s", e)
+        try:
+            # 第一次啟用品質指標彙總時，以既有的已完成報告建立初始彙總
+            backfilled = quality_rollup_store.backfill(
+                [
+                    (
+                        summary.report_id,
+                        summary.created_at,
+                        summary.status,
+                        summary.accuracy_score,
+                        [],
+                    )
+                    for summary in self.report_summaries.values()
+                    if summary.status in (AnalysisStatus.SUCCESS, AnalysisStatus.ERROR)
+                ]
+            )
+            if backfilled:
+                logger.info("已以 %d 個歷史報告建立品質指標彙總", backfilled)
+        except Exception as e:
+            logger.error("建立品質指標彙總失敗: %s", e)
+
+    async def _on_report_completed(self, report: AnalysisReport):
+        """報告完成 (成功或失敗) 後：計入品質指標彙總並建立轉錄稿檢索索引。"""
+        await quality_rollup_store.record(
+            report.report_id,
+            report.created_at,
+            report.status,
+            report.llm_analysis.accuracy_score if report.llm_analysis else None,
+            report.participant_ids,
+        )
+        await transcript_search_index.index_report(report)
+
+    async def backfill_search_index(self):
+        """為尚未建立檢索索引的已完成報告補建索引 (應用程式啟動後於背景執行)。"""
+        completed_ids = [
+            summary.report_id
+            for summary in self.report_summaries.values()
+            if summary.status in (AnalysisStatus.SUCCESS, AnalysisStatus.ERROR)
+        ]
         try:
-            data = {}
-            for report_id, report in self.reports.items():
-                data[report_id] = report.dict()
-            with open(self.reports_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            await transcript_search_index.backfill(completed_ids, report_store.get)
         except Exception as e:
-            logger.error(f"儲存報告檔案失敗: {e}")
+            logger.error("補建轉錄稿檢索索引失敗: %s", e)
+
+    async def _save_report(self, report: AnalysisReport):
+        """只寫入單一報告 (UPSERT)，寫入失敗不影響分析流程"""
+        try:
+            summary = await report_store.upsert(report)
+        except Exception as e:
+            logger.error("儲存報告 %s 失敗: %s", report.report_id, e)
+            return
+        previous = self.report_summaries.get(report.report_id)
+        self.report_summaries[report.report_id] = summary
+        # 只在列表會改變時推播 (建立、狀態變更、完成)，中間的轉錄結果寫入不推播
+        if previous is None:
+            report_event_hub.publish_summary(ReportEventType.CREATED, summary)
+        elif previous.status != summary.status:
+            completed = summary.status in (AnalysisStatus.SUCCESS, AnalysisStatus.ERROR)
+            report_event_hub.publish_summary(
+                ReportEventType.COMPLETED if completed else ReportEventType.STATUS_CHANGED,
+                summary,
+            )
+
+    def _cache_report(self, report: AnalysisReport):
+        self._report_cache[report.report_id] = report
+        self._report_cache.move_to_end(report.report_id)
+        while len(self._report_cache) > settings.REPORT_CACHE_SIZE:
+            self._report_cache.popitem(last=False)
+
+    async def delete_reports_older_than(
+        self, cutoff: datetime, limit: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """刪除早於 cutoff 建立的報告 (最多 limit 筆)，回傳 (刪除數量, 釋放位元組數)。"""
+        removed_ids, reclaimed_bytes = await report_store.delete_older_than(cutoff, limit)
+        for report_id in removed_ids:
+            self.report_summaries.pop(report_id, None)
+            self._report_cache.pop(report_id, None)
+        report_event_hub.publish_deleted(removed_ids)
+        await transcript_search_index.delete_reports(removed_ids)
+        return len(removed_ids), reclaimed_bytes
+
+    async def get_report(self, report_id: str) -> Optional[AnalysisReport]:
+        """根據 ID 獲取完整分析報告：分析中的報告、LRU 快取，最後才讀取資料庫。"""
+        report = self._active_reports.get(report_id)
+        if report is not None:
+            return report
+        report = self._report_cache.get(report_id)
+        if report is not None:
+            self._report_cache.move_to_end(report_id)
+            return report
+        if report_id not in self.report_summaries:
+            return None
+        report = await report_store.get(report_id)
+        if report is not None:
+            self._cache_report(report)
+        return report
+
+    async def query_report_summaries(self, **filters) -> ReportSummaryPage:
+        """分頁或增量查詢報告摘要，參數見 ReportStore.query_summaries。"""
+        return await report_store.query_summaries(**filters)
+
+    async def query_quality_analytics(self, **filters) -> Dict[str, Any]:
+        """查詢品質指標趨勢，參數見 QualityRollupStore.query。"""
+        return await quality_rollup_store.query(**filters)
+
+    async def search_transcripts(self, **params) -> List[Dict[str, Any]]:
+        """全文檢索轉錄稿與差異說明，參數見 TranscriptSearchIndex.search。"""
+        return await transcript_search_index.search(**params)
+
+    async def report_revision(self) -> str:
+        """報告資料版本，用於計算 ETag。"""
+        return await report_store.revision()
 
-    def get_report(self, report_id: str) -> Optional[AnalysisReport]:
-        """根據 ID 獲取分析報告。"""
-        return self.reports.get(report_id)
+    async def list_reports(self) -> List[AnalysisReport]:
+        """讀取所有完整報告 (直接從資料庫讀取，不放入快取)。"""
+        reports = {report.report_id: report for report in await report_store.load_all()}
+        # 分析中的報告以記憶體中的最新狀態為準
+        reports.update(self._active_reports)
+        return list(reports.values())
 
 
 analysis_service = AnalysisService()
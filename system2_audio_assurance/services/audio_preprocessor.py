@@ -0,0 +1,189 @@
+"""
+音訊前處理模組 - 在送往 STT 之前壓縮音訊內容
+
+處理階段：
+- 靜音壓縮：移除超過門檻長度的靜音區段，並產生時間軸對照表，
+  讓轉錄結果的時間戳記可以換算回原始錄音。
+- 上傳編碼：重新編碼為低位元率單聲道 Opus 或 FLAC，縮短上傳時間。
+
+解碼與編碼皆在專用的 worker 執行緒池中進行 (FFmpeg 子行程與 numpy 運算不受 GIL 限制)，
+不會阻塞事件迴圈。
+"""
+
+import asyncio
+import io
+import logging
+import subprocess
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+
+from config.settings import settings
+from services.stt_backends import UploadFile
+from utils.vad import TimeOffsetMap, compact_silence
+
+logger = logging.getLogger(__name__)
+
+# 上傳格式: (副檔名, MIME 類型, FFmpeg 編碼參數)
+UPLOAD_FORMATS = {
+    "opus": ("ogg", "audio/ogg", ["-c:a", "libopus", "-application", "voip", "-f", "ogg"]),
+    "flac": ("flac", "audio/flac", ["-c:a", "flac", "-f", "flac"]),
+    "wav": ("wav", "audio/wav", None),
+}
+
+
+@dataclass
+class PreparedAudio:
+    """前處理後準備上傳的音訊"""
+
+    upload: UploadFile
+    offset_map: TimeOffsetMap
+    original_seconds: float
+    upload_format: str
+
+
+def load_pcm(audio_path: Path) -> Tuple[np.ndarray, int]:
+    """將音檔解碼為單聲道 int16 PCM 樣本。"""
+    audio = AudioSegment.from_file(str(audio_path)).set_channels(1).set_sample_width(2)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.int16)
+    return samples, audio.frame_rate
+
+
+def pcm_to_wav_bytes(samples: np.ndarray, sample_rate: int) -> bytes:
+    """將 int16 PCM 樣本封裝為 WAV。"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def _run_ffmpeg(input_args: list, output_format: str, data: bytes) -> bytes:
+    _, _, codec_args = UPLOAD_FORMATS[output_format]
+    if output_format == "opus":
+        codec_args = [*codec_args, "-b:a", settings.STT_UPLOAD_BITRATE]
+    command = [
+        "ffmpeg",
+        *input_args,
+        "-i", "pipe:0",
+        "-ac", "1",
+        "-ar", str(settings.STT_UPLOAD_SAMPLE_RATE),
+        *codec_args,
+        "-hide_banner",
+        "-loglevel", "error",
+        "pipe:1",
+    ]
+    process = subprocess.run(command, input=data, capture_output=True, check=True)
+    return process.stdout
+
+
+def encode_pcm(
+    samples: np.ndarray, sample_rate: int, upload_format: str, name: str
+) -> UploadFile:
+    """將 int16 PCM 樣本編碼為指定的上傳格式。"""
+    extension, mime_type, codec_args = UPLOAD_FORMATS[upload_format]
+    if codec_args is None:
+        data = pcm_to_wav_bytes(samples, sample_rate)
+    else:
+        data = _run_ffmpeg(
+            ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"],
+            upload_format,
+            samples.astype(np.int16).tobytes(),
+        )
+    return f"{name}.{extension}", data, mime_type
+
+
+def _prepare_audio(audio_path: Path, upload_format: str) -> PreparedAudio:
+    samples, sample_rate = load_pcm(audio_path)
+    offset_map = TimeOffsetMap()
+    compacted = samples
+    if settings.STT_SILENCE_TRIM_ENABLED:
+        compacted, offset_map = compact_silence(
+            samples,
+            sample_rate,
+            threshold_dbfs=settings.STT_SILENCE_THRESHOLD_DBFS,
+            min_silence_seconds=settings.STT_SILENCE_MIN_SECONDS,
+            keep_silence_seconds=settings.STT_SILENCE_KEEP_SECONDS,
+        )
+    return PreparedAudio(
+        upload=encode_pcm(compacted, sample_rate, upload_format, audio_path.stem),
+        offset_map=offset_map,
+        original_seconds=len(samples) / sample_rate,
+        upload_format=upload_format,
+    )
+
+
+def _prepare_stream_bytes(audio_bytes: bytes, upload_format: str) -> UploadFile:
+    extension, mime_type, _ = UPLOAD_FORMATS[upload_format]
+    return f"audio.{extension}", _run_ffmpeg([], upload_format, audio_bytes), mime_type
+
+
+class AudioPreprocessor:
+    """以 worker 執行緒池執行的音訊前處理"""
+
+    def __init__(self):
+        self.upload_format = settings.STT_UPLOAD_FORMAT.lower()
+        if self.upload_format not in UPLOAD_FORMATS:
+            logger.warning(
+                "不支援的上傳格式 %s，改用 wav (可選: %s)",
+                self.upload_format,
+                ", ".join(UPLOAD_FORMATS),
+            )
+            self.upload_format = "wav"
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.STT_PREPROCESS_WORKERS,
+                thread_name_prefix="audio-preprocess",
+            )
+        return self._executor
+
+    async def prepare_file(self, audio_path: Path) -> PreparedAudio:
+        """解碼音檔、壓縮靜音並重新編碼為上傳格式。"""
+        loop = asyncio.get_running_loop()
+        prepared = await loop.run_in_executor(
+            self._get_executor(), _prepare_audio, audio_path, self.upload_format
+        )
+        logger.info(
+            "音檔 %s 前處理完成: 移除 %.1f 秒靜音 (原長 %.1f 秒)，以 %s 上傳 %.1f KB",
+            audio_path.name,
+            prepared.offset_map.removed_seconds,
+            prepared.original_seconds,
+            prepared.upload_format,
+            len(prepared.upload[1]) / 1024,
+        )
+        return prepared
+
+    async def encode_pcm_segment(
+        self, samples: np.ndarray, sample_rate: int, name: str
+    ) -> UploadFile:
+        """將即時串流切出的 PCM 片段編碼為可單獨解碼的上傳檔。"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), encode_pcm, samples, sample_rate, self.upload_format, name
+        )
+
+    async def prepare_stream_bytes(self, audio_bytes: bytes) -> Optional[UploadFile]:
+        """
+        將串流片段 (例如 webm) 重新編碼為上傳格式。
+
+        設定為 wav 時不轉換 (轉成 PCM 只會讓檔案變大)，回傳 None 表示沿用原始內容。
+        """
+        if self.upload_format == "wav":
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), _prepare_stream_bytes, audio_bytes, self.upload_format
+        )
+
+
+audio_preprocessor = AudioPreprocessor()
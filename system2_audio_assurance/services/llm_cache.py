@@ -0,0 +1,141 @@
+"""
+LLM 分析結果快取模組 - 以 SQLite 持久化保存轉錄稿比對結果
+
+重新分析、重複觸發或流程後段失敗後的重試，都會以相同的轉錄稿再次比對；
+以 (模型, 提示詞版本, 正規化後的兩份轉錄稿) 的雜湊作為鍵，直接回傳先前的結果。
+超過 TTL 的項目視為失效，項目數超過上限時依最後存取時間淘汰 (LRU)。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model: str, prompt_version: str, recording_text: str, monitoring_text: str
+) -> str:
+    """計算快取鍵 (SHA-256)。"""
+    payload = json.dumps(
+        [model, prompt_version, recording_text, monitoring_text], ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LlmResultCache:
+    """SQLite 實作的 LLM 結果快取，所有資料庫操作在執行緒中進行以免阻塞事件迴圈"""
+
+    def __init__(self, db_path: Path, ttl_seconds: float, max_entries: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed "
+                "ON llm_cache (last_accessed)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT result FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE llm_cache SET last_accessed = ? WHERE key = ?", (now, key)
+            )
+            conn.commit()
+        return json.loads(row[0])
+
+    def _put(self, key: str, model: str, prompt_version: str, result: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, prompt_version, result, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, json.dumps(result, ensure_ascii=False), now, now),
+            )
+            conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY last_accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """取得快取結果，讀取失敗時視為未命中。"""
+        try:
+            result = await asyncio.to_thread(self._get, key)
+        except sqlite3.Error as e:
+            logger.warning("讀取 LLM 快取失敗: %s", e)
+            result = None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    async def put(
+        self, key: str, model: str, prompt_version: str, result: Dict[str, Any]
+    ):
+        """寫入快取結果，寫入失敗只記錄警告，不影響分析流程。"""
+        try:
+            await asyncio.to_thread(self._put, key, model, prompt_version, result)
+        except sqlite3.Error as e:
+            logger.warning("寫入 LLM 快取失敗: %s", e)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+llm_result_cache = LlmResultCache(
+    db_path=settings.STORAGE_PATH / "llm_cache.sqlite3",
+    ttl_seconds=settings.LLM_CACHE_TTL_HOURS * 3600,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+)
@@ -2,16 +2,53 @@
 LLM 服務模組 - 使用 OpenAI GPT 進行對話品質分析
 """
 
+import asyncio
 import json
 import logging
 import re
-from typing import Dict, Any
-from openai import AsyncOpenAI, APIError
+from typing import Dict, Any, List
+from openai import APIError
 
 from config.settings import settings
+from services.llm_cache import llm_result_cache, make_cache_key
+from services.openai_gateway import get_openai_gateway
+from utils.text_alignment import (
+    AlignedWindow,
+    DiffSummary,
+    align_windows,
+    diff_regions,
+    fast_path_blocker,
+)
+from utils.text_similarity import ngram_similarity
 
 logger = logging.getLogger(__name__)
 
+# 提示詞或評分規則有變動時需遞增，讓舊的快取結果失效
+PROMPT_VERSION = "3"
+
+# 完整比對與差異比對共用的角色說明與評分規則
+ANALYSIS_RULES = """你是專業的錄音品質稽核員。你的任務是嚴格比對兩份由不同系統產出的語音轉文字(STT)稿，以判斷錄音過程是否遺失了任何對話內容。
+
+【分析目標】
+你的唯一目標是判斷「監控系統轉錄稿」是否在「語意」上完整地包含了「正式錄音轉錄稿」的內容。
+「正式錄音轉錄稿」應被視為這次對話內容的基準 (Ground Truth)。
+
+【評分標準】
+你必須嚴格遵守以下計分規則：
+- **100分條件**: 如果「監控系統轉錄稿」在語意上與「正式錄音轉錄稿」完全一致，沒有任何意義上的偏差、扭曲或**內容遺漏**，
+一致性分數 **必須** 為 100。即便兩者在用詞、語氣助詞或斷句上存在微小差異（這是STT模型的正常誤差），
+只要不影響核心語意，分數就 **必須** 是 100。
+- **扣分條件**: 只有在「監控系統轉錄稿」出現了**明顯的語意錯誤、關鍵內容遺漏、或新增了不相關的內容**時，才應該扣分。根據內容遺失或錯誤的嚴重程度酌情給予 0-99 分。"""
+
+RESPONSE_INSTRUCTIONS = """請嚴格按照上述規則，以 JSON 格式回傳分析結果，包含以下欄位：
+- "accuracy_score": 內容一致性分數 (0-100)。
+- "summary": 根據比對結果，生成一句話的簡潔摘要。
+- "key_differences": 簡潔地列出兩者之間的主要 "語意" 差異點。如果沒有語意差異，請回傳空列表 `[]`。
+- "suggestions": 根據差異點，提供錄音系統可能的改進建議。如果沒有差異，請回傳空列表 `[]`。
+- "reasoning": 解釋你為什麼嚴格根據評分標準給出這個一致性分數。
+
+請只回傳 JSON 格式的分析結果："""
+
 
 class LLMService:
     """OpenAI GPT LLM 服務"""
@@ -19,9 +56,7 @@ class LLMService:
     def __init__(self):
         """初始化 LLM 服務"""
         try:
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OpenAI API Key 未設定")
-            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+            self.gateway = get_openai_gateway()
             self.model = settings.LLM_MODEL
             logger.info("LLM 服務 (非同步) 初始化成功，使用模型: %s", self.model)
         except Exception as e:
@@ -44,13 +79,46 @@ class LLMService:
             normalized_recording = self._normalize_text(recording_transcript)
             normalized_monitoring = self._normalize_text(monitoring_transcript)
 
-            logger.info("開始進行錄音內容一致性分析...")
+            similarity = ngram_similarity(normalized_recording, normalized_monitoring)
+            if await self._can_fast_path(
+                normalized_recording, normalized_monitoring, similarity
+            ):
+                logger.info(
+                    "轉錄稿相似度 %.3f 達門檻 %.3f，略過 LLM 比對",
+                    similarity,
+                    settings.LLM_FAST_PATH_THRESHOLD,
+                )
+                return self._fast_path_result(similarity)
 
-            prompt = self._build_analysis_prompt(
-                normalized_recording, normalized_monitoring
+            prompt_version = self._prompt_version()
+            cache_key = make_cache_key(
+                self.model, prompt_version, normalized_recording, normalized_monitoring
             )
-            response = await self._call_gpt_api(prompt)
-            analysis = self._parse_analysis_response(response)
+            if settings.LLM_CACHE_ENABLED:
+                cached = await llm_result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(
+                        "LLM 快取命中 - 內容一致性分數: %.1f%%",
+                        cached.get("accuracy_score", 0),
+                    )
+                    cached["from_cache"] = True
+                    return cached
+
+            logger.info("開始進行錄音內容一致性分析 (相似度 %.3f)...", similarity)
+
+            if len(normalized_recording) > settings.LLM_SEGMENT_MAX_CHARS:
+                analysis = await self._analyze_segmented(
+                    normalized_recording, normalized_monitoring
+                )
+            else:
+                analysis = await self._analyze_pair(
+                    normalized_recording, normalized_monitoring
+                )
+            analysis["text_similarity"] = round(similarity, 4)
+
+            # 回應無法解析的結果不寫入快取，下次仍會重新比對
+            if settings.LLM_CACHE_ENABLED and not analysis.pop("parse_failed", False):
+                await llm_result_cache.put(cache_key, self.model, prompt_version, analysis)
 
             logger.info(
                 "分析完成 - 內容一致性分數: %.1f%%", analysis.get("accuracy_score", 0)
@@ -60,6 +128,203 @@ class LLMService:
             logger.error("對話品質分析失敗: %s", e)
             raise RuntimeError(f"LLM 分析錯誤: {e}") from e
 
+    async def _analyze_pair(
+        self, recording_text: str, monitoring_text: str, segment_note: str = ""
+    ) -> Dict[str, Any]:
+        """
+        以單一 GPT 請求比對一組轉錄稿。
+
+        LLM_PROMPT_MODE 為 diff 時先逐字對齊，只送出差異區段；
+        差異區段的總字數超過完整內容的 LLM_DIFF_MAX_RATIO 時，精簡無效益，改送完整內容。
+        """
+        prompt = self._build_analysis_prompt(
+            recording_text, monitoring_text, segment_note
+        )
+        method = "llm"
+        if settings.LLM_PROMPT_MODE == "diff":
+            diff = await asyncio.to_thread(
+                diff_regions,
+                recording_text,
+                monitoring_text,
+                settings.LLM_DIFF_CONTEXT_CHARS,
+            )
+            diff_prompt = self._build_diff_prompt(diff, segment_note)
+            if len(diff_prompt) <= len(prompt) * settings.LLM_DIFF_MAX_RATIO:
+                logger.info(
+                    "以差異模式比對: %d 處差異，提示詞 %d 字 (完整內容 %d 字)",
+                    len(diff.regions),
+                    len(diff_prompt),
+                    len(prompt),
+                )
+                prompt, method = diff_prompt, "diff"
+        response = await self._call_gpt_api(prompt)
+        analysis = self._parse_analysis_response(response)
+        analysis["analysis_method"] = method
+        return analysis
+
+    async def _analyze_segmented(
+        self, recording_text: str, monitoring_text: str
+    ) -> Dict[str, Any]:
+        """
+        長篇轉錄稿的分段比對 (map-reduce)。
+
+        先將兩份轉錄稿對齊並切成對應的窗口，各窗口同時送出比對 (併發數由共用客戶端控管)，
+        最後以窗口長度加權彙整成單一結果。
+        """
+        # 對齊為純 CPU 運算，長篇轉錄稿可能耗時數百毫秒，移到執行緒避免阻塞事件迴圈
+        windows = await asyncio.to_thread(
+            align_windows,
+            recording_text,
+            monitoring_text,
+            window_chars=settings.LLM_SEGMENT_WINDOW_CHARS,
+            margin_chars=settings.LLM_SEGMENT_MARGIN_CHARS,
+        )
+        logger.info(
+            "轉錄稿長度 %d 字超過 %d 字，分為 %d 段比對",
+            len(recording_text),
+            settings.LLM_SEGMENT_MAX_CHARS,
+            len(windows),
+        )
+        results = await asyncio.gather(
+            *(self._analyze_window(window, len(windows)) for window in windows)
+        )
+        return self._reduce_window_results(windows, list(results))
+
+    async def _analyze_window(
+        self, window: AlignedWindow, total: int
+    ) -> Dict[str, Any]:
+        """比對單一窗口，窗口內容幾乎相同時同樣走快速判定。"""
+        similarity = ngram_similarity(window.reference_text, window.candidate_text)
+        if await self._can_fast_path(
+            window.reference_text, window.candidate_text, similarity
+        ):
+            return self._fast_path_result(similarity)
+        segment_note = (
+            f"這是一段長篇對話的第 {window.index + 1}/{total} 段。"
+            "監控系統轉錄稿的開頭與結尾可能多包含少量相鄰段落的內容，請忽略這些多出的部分；"
+            "也不要因為語句在段落邊界被截斷而扣分。"
+        )
+        return await self._analyze_pair(
+            window.reference_text, window.candidate_text, segment_note
+        )
+
+    def _reduce_window_results(
+        self, windows: List[AlignedWindow], results: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """將各窗口的比對結果彙整為一份，分數以基準窗口長度加權平均。"""
+        total_weight = sum(window.weight for window in windows)
+        score = (
+            sum(
+                window.weight * result["accuracy_score"]
+                for window, result in zip(windows, results)
+            )
+            / total_weight
+        )
+
+        key_differences: List[str] = []
+        suggestions: List[str] = []
+        reasoning: List[str] = []
+        for window, result in zip(windows, results):
+            label = f"第 {window.index + 1} 段"
+            key_differences.extend(
+                f"[{label}] {difference}" for difference in result["key_differences"]
+            )
+            for suggestion in result["suggestions"]:
+                if suggestion not in suggestions:
+                    suggestions.append(suggestion)
+            reasoning.append(
+                f"{label} ({window.weight} 字): {result['accuracy_score']:.0f} 分"
+                f" - {result['reasoning']}"
+            )
+
+        flagged = [
+            (window, result)
+            for window, result in zip(windows, results)
+            if result["accuracy_score"] < 100
+        ]
+        if flagged:
+            worst_window, worst = min(flagged, key=lambda item: item[1]["accuracy_score"])
+            summary = (
+                f"共 {len(windows)} 段中有 {len(flagged)} 段存在差異；"
+                f"差異最大為第 {worst_window.index + 1} 段: {worst['summary']}"
+            )
+        else:
+            summary = f"共 {len(windows)} 段比對，內容皆一致"
+
+        return {
+            "accuracy_score": round(score, 1),
+            "parse_failed": any(result.get("parse_failed") for result in results),
+            "summary": summary,
+            "key_differences": key_differences,
+            "suggestions": suggestions,
+            "reasoning": "\n".join(reasoning),
+            "analysis_method": "segmented",
+        }
+
+    @staticmethod
+    def _prompt_version() -> str:
+        """
+        快取鍵使用的版本字串。
+
+        除了提示詞版本外，也涵蓋所有會影響分析結果的設定 (提示詞模式、分段與差異比對參數，
+        以及分段時各窗口套用的快速判定門檻)，任一設定變動都不會命中舊的快取結果。
+        """
+        fast_path = (
+            f"{settings.LLM_FAST_PATH_THRESHOLD:g},{settings.LLM_FAST_PATH_MIN_LENGTH_RATIO:g},"
+            f"{settings.LLM_FAST_PATH_MAX_DIFF_CHARS}"
+            if settings.LLM_FAST_PATH_ENABLED
+            else "off"
+        )
+        return "/".join(
+            [
+                PROMPT_VERSION,
+                settings.LLM_PROMPT_MODE,
+                f"seg={settings.LLM_SEGMENT_MAX_CHARS},"
+                f"{settings.LLM_SEGMENT_WINDOW_CHARS},{settings.LLM_SEGMENT_MARGIN_CHARS}",
+                f"diff={settings.LLM_DIFF_CONTEXT_CHARS},{settings.LLM_DIFF_MAX_RATIO:g}",
+                f"fast={fast_path}",
+            ]
+        )
+
+    async def _can_fast_path(
+        self, reference: str, candidate: str, similarity: float
+    ) -> bool:
+        """相似度達門檻，且沒有大段遺漏或數字、否定詞改變時，才可不經 LLM 直接判定。"""
+        if (
+            not settings.LLM_FAST_PATH_ENABLED
+            or similarity < settings.LLM_FAST_PATH_THRESHOLD
+        ):
+            return False
+        blocker = await asyncio.to_thread(
+            fast_path_blocker,
+            reference,
+            candidate,
+            settings.LLM_FAST_PATH_MIN_LENGTH_RATIO,
+            settings.LLM_FAST_PATH_MAX_DIFF_CHARS,
+        )
+        if blocker is not None:
+            logger.info(
+                "轉錄稿相似度 %.3f 達門檻，但%s，改由 LLM 比對", similarity, blocker
+            )
+            return False
+        return True
+
+    def _fast_path_result(self, similarity: float) -> Dict[str, Any]:
+        """兩份轉錄稿幾乎相同時，不經 LLM 直接產生的分析結果。"""
+        return {
+            "accuracy_score": 100.0,
+            "summary": "兩份轉錄稿內容一致",
+            "key_differences": [],
+            "suggestions": [],
+            "reasoning": (
+                f"兩份轉錄稿的字元相似度為 {similarity:.1%}，"
+                f"達到快速判定門檻 {settings.LLM_FAST_PATH_THRESHOLD:.0%}，"
+                "差異僅屬 STT 的正常誤差，未另行呼叫 LLM 比對。"
+            ),
+            "analysis_method": "fast_path",
+            "text_similarity": round(similarity, 4),
+        }
+
     def _normalize_text(self, text: str) -> str:
         """文字正規化處理，移除標點符號並統一空格。"""
         if not text:
@@ -68,60 +333,71 @@ class LLMService:
         text = re.sub(r"[^\w\s]", "", text)
         return text.strip()
 
-    def _build_analysis_prompt(self, recording_text: str, monitoring_text: str) -> str:
-        """建構分析提示詞"""
-        return f"""你是專業的錄音品質稽核員。你的任務是嚴格比對兩份由不同系統產出的語音轉文字(STT)稿，以判斷錄音過程是否遺失了任何對話內容。
-
-【分析目標】
-你的唯一目標是判斷「監控系統轉錄稿」是否在「語意」上完整地包含了「正式錄音轉錄稿」的內容。
-「正式錄音轉錄稿」應被視為這次對話內容的基準 (Ground Truth)。
-
-【評分標準】
-你必須嚴格遵守以下計分規則：
-- **100分條件**: 如果「監控系統轉錄稿」在語意上與「正式錄音轉錄稿」完全一致，沒有任何意義上的偏差、扭曲或**內容遺漏**，
-一致性分數 **必須** 為 100。即便兩者在用詞、語氣助詞或斷句上存在微小差異（這是STT模型的正常誤差），
-只要不影響核心語意，分數就 **必須** 是 100。
-- **扣分條件**: 只有在「監控系統轉錄稿」出現了**明顯的語意錯誤、關鍵內容遺漏、或新增了不相關的內容**時，才應該扣分。根據內容遺失或錯誤的嚴重程度酌情給予 0-99 分。
+    def _build_analysis_prompt(
+        self, recording_text: str, monitoring_text: str, segment_note: str = ""
+    ) -> str:
+        """建構分析提示詞，segment_note 為分段比對時附加的段落說明"""
+        segment_section = f"【分段說明】\n{segment_note}\n\n" if segment_note else ""
+        return f"""{ANALYSIS_RULES}
 
-【正式錄音轉錄稿 (基準)】
+{segment_section}【正式錄音轉錄稿 (基準)】
 {recording_text}
 
 【監控系統轉錄稿 (待驗證)】
 {monitoring_text}
 
-請嚴格按照上述規則，以 JSON 格式回傳分析結果，包含以下欄位：
-- "accuracy_score": 內容一致性分數 (0-100)。
-- "summary": 根據比對結果，生成一句話的簡潔摘要。
-- "key_differences": 簡潔地列出兩者之間的主要 "語意" 差異點。如果沒有語意差異，請回傳空列表 `[]`。
-- "suggestions": 根據差異點，提供錄音系統可能的改進建議。如果沒有差異，請回傳空列表 `[]`。
-- "reasoning": 解釋你為什麼嚴格根據評分標準給出這個一致性分數。
+{RESPONSE_INSTRUCTIONS}"""
 
-請只回傳 JSON 格式的分析結果："""
+    def _build_diff_prompt(self, diff: DiffSummary, segment_note: str = "") -> str:
+        """建構只包含差異區段的精簡提示詞，評分規則與完整比對相同"""
+        segment_section = f"【分段說明】\n{segment_note}\n\n" if segment_note else ""
+        region_lines = []
+        for number, region in enumerate(diff.regions, start=1):
+            region_lines.append(
+                f"#{number} (基準第 {region.reference_start + 1}-{region.reference_end} 字)\n"
+                f"  前文: …{region.context_before}\n"
+                f"  基準: 「{region.reference_text}」\n"
+                f"  監控: 「{region.candidate_text}」\n"
+                f"  後文: {region.context_after}…"
+            )
+        regions_text = "\n".join(region_lines)
+        return f"""{ANALYSIS_RULES}
 
-    async def _call_gpt_api(self, prompt: str, retry_count: int = 0) -> str:
-        """呼叫 GPT API (非同步版本)"""
+{segment_section}【比對方式說明】
+兩份轉錄稿已先以逐字對齊比對，以下只列出不一致的區段 (附前後文，前後文取自基準稿)，
+未列出的部分兩份轉錄稿逐字相同。「監控」為空字串表示該段內容在監控系統轉錄稿中遺漏，
+「基準」為空字串表示監控系統轉錄稿多出了該段內容。
+
+【比對統計】
+- 正式錄音轉錄稿 (基準) 共 {diff.reference_length} 字，監控系統轉錄稿共 {diff.candidate_length} 字
+- 逐字相同 {diff.matched_chars} 字，佔基準的 {diff.match_ratio:.1%}
+- 共 {len(diff.regions)} 處差異
+
+【差異區段】
+{regions_text}
+
+{RESPONSE_INSTRUCTIONS}"""
+
+    async def _call_gpt_api(self, prompt: str) -> str:
+        """呼叫 GPT API (非同步版本)，限流、退避與重試由共用客戶端處理"""
+        system_prompt = "你是一個專業、嚴謹的錄音品質稽核員，專注於比對文字稿的內容一致性。"
+        max_tokens = 800
         try:
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat_completion(
+                # 中文約一字一個 token，以字數加上輸出上限作為保守預估
+                estimated_tokens=len(system_prompt) + len(prompt) + max_tokens,
                 model=self.model,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一個專業、嚴謹的錄音品質稽核員，專注於比對文字稿的內容一致性。",
-                    },
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0,
-                max_tokens=800,
+                max_tokens=max_tokens,
                 top_p=0.9,
                 response_format={"type": "json_object"},
             )
             return response.choices[0].message.content.strip()
         except APIError as e:
-            if retry_count < 2:
-                logger.warning(
-                    "GPT API 呼叫失敗，重試中 (%d/2): %s", retry_count + 1, e
-                )
-                return await self._call_gpt_api(prompt, retry_count + 1)
             logger.error("GPT API 呼叫失敗: %s", e)
             raise RuntimeError(f"OpenAI API 錯誤: {e}") from e
 
@@ -149,15 +425,18 @@ class LLMService:
                 "key_differences": [],
                 "suggestions": ["檢查輸入資料", "重新嘗試分析"],
                 "reasoning": f"無法解析分析結果: {str(e)}",
+                "parse_failed": True,
             }
 
     async def test_connection(self) -> bool:
         """(維持不變) 測試 OpenAI GPT 連接"""
         try:
             logger.info("測試 OpenAI GPT (%s) 連接...", self.model)
-            response = await self.client.chat.completions.create(
+            prompt = "回答'測試成功'"
+            response = await self.gateway.chat_completion(
+                estimated_tokens=len(prompt) + 10,
                 model=self.model,
-                messages=[{"role": "user", "content": "回答'測試成功'"}],
+                messages=[{"role": "user", "content": prompt}],
                 max_tokens=10,
             )
             return "測試成功" in response.choices[0].message.content
@@ -177,7 +177,7 @@ class MonitoringService:
             )
 
             await analysis_coordinator.set_monitoring_file(
-                room_id, monitoring_audio_file
+                room_id, monitoring_audio_file, participant_ids
             )
 
         except Exception as e:
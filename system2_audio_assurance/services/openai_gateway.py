@@ -0,0 +1,229 @@
+"""
+OpenAI 共用客戶端模組 - 系統二所有 STT 與 LLM 呼叫的統一出口
+
+職責：
+- 共用一個具連線池的 AsyncOpenAI 客戶端，避免各服務各自建立連線。
+- 依請求類型 (STT / LLM) 套用令牌桶限流：每分鐘請求數，以及每分鐘音訊秒數或 token 數。
+- 以 AIMD 方式依 429/5xx 回應自動調整併發上限。
+- 對可重試的錯誤以指數退避加抖動重試，並尊重伺服器回傳的 Retry-After。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    RateLimitError,
+)
+
+from config.settings import settings
+from utils.rate_limit import (
+    AdaptiveConcurrencyLimiter,
+    RequestPriority,
+    TokenBucket,
+    backoff_delay,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedChannel:
+    """單一類型請求的限流通道"""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        units_per_minute: float,
+        max_concurrency: int,
+        reserved_interactive: int = 0,
+        interactive_slo: Optional[float] = None,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.units = TokenBucket(units_per_minute)
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=max_concurrency,
+            maximum=max_concurrency,
+            reserved_interactive=reserved_interactive,
+            interactive_slo=interactive_slo,
+        )
+        self.retries = 0
+        self.overloads = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.limiter.snapshot(),
+            "rate_limit_waiting": self.requests.waiting + self.units.waiting,
+            "rate_limit_overdrafts": (
+                self.requests.overdraft_grants + self.units.overdraft_grants
+            ),
+            "retries": self.retries,
+            "overloads": self.overloads,
+        }
+
+
+def _is_overload(error: Exception) -> bool:
+    """429 與 5xx 視為上游過載訊號。"""
+    if isinstance(error, RateLimitError):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _is_retryable(error: Exception) -> bool:
+    return _is_overload(error) or isinstance(error, APIConnectionError)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class OpenAIGateway:
+    """具限流、自適應併發與重試機制的共用 OpenAI 客戶端"""
+
+    def __init__(self):
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OpenAI API Key 未設定")
+
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(settings.OPENAI_TIMEOUT_SECONDS, connect=10.0),
+        )
+        # 重試由閘道統一處理，關閉 SDK 內建的重試
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+        self.stt = RateLimitedChannel(
+            "stt",
+            requests_per_minute=settings.STT_REQUESTS_PER_MINUTE,
+            units_per_minute=settings.STT_AUDIO_SECONDS_PER_MINUTE,
+            max_concurrency=settings.STT_MAX_CONCURRENCY,
+            reserved_interactive=settings.STT_REALTIME_RESERVED_SLOTS,
+            interactive_slo=settings.STT_REALTIME_SLO_SECONDS,
+        )
+        self.llm = RateLimitedChannel(
+            "llm",
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            units_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+        )
+        logger.info("OpenAI 共用客戶端初始化完成")
+
+    async def transcribe(
+        self,
+        *,
+        audio_seconds: float,
+        priority: RequestPriority = RequestPriority.BATCH,
+        **kwargs,
+    ) -> Any:
+        """呼叫語音轉錄 API，以音訊秒數計算額度；即時請求優先於批次請求。"""
+        return await self._call(
+            self.stt,
+            audio_seconds,
+            lambda: self.client.audio.transcriptions.create(**kwargs),
+            priority,
+        )
+
+    async def chat_completion(self, *, estimated_tokens: int, **kwargs) -> Any:
+        """呼叫對話補全 API，先以預估 token 數扣額度，完成後依實際用量修正。"""
+        response = await self._call(
+            self.llm,
+            estimated_tokens,
+            lambda: self.client.chat.completions.create(**kwargs),
+        )
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.llm.units.adjust(estimated_tokens - usage.total_tokens)
+        return response
+
+    async def list_models(self) -> List[str]:
+        """列出帳號可用的模型 ID (供 STT 連接測試使用，計入 STT 通道的請求額度)。"""
+        models = await self._call(self.stt, 0, lambda: self.client.models.list())
+        return [model.id for model in models.data]
+
+    async def _call(
+        self,
+        channel: RateLimitedChannel,
+        cost: float,
+        request: Callable[[], Awaitable[Any]],
+        priority: RequestPriority = RequestPriority.BATCH,
+    ) -> Any:
+        max_retries = settings.OPENAI_MAX_RETRIES
+        attempt = 0
+        while True:
+            # 先依優先等級取得額度再排併發名額，兩段等待都計入排隊時間與 SLO
+            started = time.monotonic()
+            deadline = channel.limiter.slo_deadline(priority, started)
+            await channel.requests.acquire(1, priority, deadline)
+            await channel.units.acquire(cost, priority, deadline)
+            async with channel.limiter.slot(priority, started):
+                try:
+                    result = await request()
+                except Exception as e:
+                    if _is_overload(e):
+                        channel.overloads += 1
+                        channel.limiter.on_overload()
+                    if not _is_retryable(e) or attempt >= max_retries:
+                        raise
+                    error = e
+                else:
+                    channel.limiter.on_success()
+                    return result
+
+            delay = backoff_delay(
+                attempt,
+                base=settings.OPENAI_RETRY_BASE_SECONDS,
+                cap=settings.OPENAI_RETRY_MAX_SECONDS,
+            )
+            retry_after = _retry_after_seconds(error)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            attempt += 1
+            channel.retries += 1
+            logger.warning(
+                "OpenAI %s 呼叫失敗，%.1f 秒後重試 (%d/%d): %s",
+                channel.name,
+                delay,
+                attempt,
+                max_retries,
+                error,
+            )
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"stt": self.stt.snapshot(), "llm": self.llm.snapshot()}
+
+
+_gateway: Optional[OpenAIGateway] = None
+
+
+def get_openai_gateway() -> OpenAIGateway:
+    """取得共用的 OpenAI 客戶端 (第一次使用時建立)。"""
+    global _gateway
+    if _gateway is None:
+        _gateway = OpenAIGateway()
+    return _gateway
+
+
+async def close_openai_gateway():
+    """關閉共用客戶端的連線池 (僅在已建立時)。"""
+    global _gateway
+    if _gateway is not None:
+        await _gateway.http_client.aclose()
+        _gateway = None
@@ -0,0 +1,305 @@
+"""
+品質指標彙總模組 - 以 SQLite 增量維護每小時 / 每日的品質 KPI
+
+每份報告完成 (成功或失敗) 時，把它的結果累加到所屬時間桶的彙總列：
+整體 (dimension="all") 與每位參與者 (dimension="participant") 各一列。
+每列保存筆數、成功 / 失敗數、分數總和與平方和、最小 / 最大分數，以及 10 分一格的分數分布，
+查詢趨勢時只需讀取時間範圍內的彙總列，與歷史報告總數無關。
+
+彙總資料獨立於報告保存，清理舊報告不會改變歷史趨勢；
+rollup_applied 記錄已彙總的報告，同一份報告重複完成時不會重複計入。
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.settings import settings
+from models.call_models import AnalysisStatus
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+DIMENSION_ALL = "all"
+DIMENSION_PARTICIPANT = "participant"
+# 分數分布：0-10、10-20 ... 90-100 共 10 格 (100 分歸入最後一格)
+HISTOGRAM_BINS = 10
+_BIN_COLUMNS = [f"bin_{i}" for i in range(HISTOGRAM_BINS)]
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """將時間截斷到所屬時間桶的開始。"""
+    if granularity == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"不支援的時間粒度: {granularity}")
+
+
+def _score_bin(score: float) -> int:
+    return min(max(int(score // (100 / HISTOGRAM_BINS)), 0), HISTOGRAM_BINS - 1)
+
+
+class QualityRollupStore:
+    """SQLite 實作的品質指標彙總，資料庫操作在執行緒中進行以免阻塞事件迴圈"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            bin_columns = ", ".join(
+                f"{column} INTEGER NOT NULL DEFAULT 0" for column in _BIN_COLUMNS
+            )
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS quality_rollups (
+                    granularity TEXT NOT NULL,
+                    dimension TEXT NOT NULL,
+                    dimension_key TEXT NOT NULL,
+                    bucket_start REAL NOT NULL,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    success INTEGER NOT NULL DEFAULT 0,
+                    error INTEGER NOT NULL DEFAULT 0,
+                    score_count INTEGER NOT NULL DEFAULT 0,
+                    score_sum REAL NOT NULL DEFAULT 0,
+                    score_sq_sum REAL NOT NULL DEFAULT 0,
+                    score_min REAL,
+                    score_max REAL,
+                    {bin_columns},
+                    PRIMARY KEY (granularity, dimension, dimension_key, bucket_start)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rollup_applied (
+                    report_id TEXT PRIMARY KEY,
+                    applied_at REAL NOT NULL
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _increments(status: str, score: Optional[float]) -> Dict[str, Any]:
+        status = AnalysisStatus(status)
+        values: Dict[str, Any] = {
+            "total": 1,
+            "success": int(status == AnalysisStatus.SUCCESS),
+            "error": int(status == AnalysisStatus.ERROR),
+            "score_count": int(score is not None),
+            "score_sum": score or 0.0,
+            "score_sq_sum": (score or 0.0) ** 2,
+        }
+        for index, column in enumerate(_BIN_COLUMNS):
+            values[column] = int(score is not None and _score_bin(score) == index)
+        return values
+
+    def _apply(
+        self,
+        conn: sqlite3.Connection,
+        report_id: str,
+        created_at: datetime,
+        status: str,
+        score: Optional[float],
+        participant_ids: Iterable[str],
+        applied_at: float,
+    ) -> bool:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO rollup_applied (report_id, applied_at) VALUES (?, ?)",
+            (report_id, applied_at),
+        )
+        if cursor.rowcount == 0:
+            return False
+
+        increments = self._increments(status, score)
+        columns = list(increments)
+        dimensions = [(DIMENSION_ALL, "")] + [
+            (DIMENSION_PARTICIPANT, participant_id)
+            for participant_id in sorted(set(participant_ids))
+        ]
+        rows = [
+            (
+                granularity,
+                dimension,
+                key,
+                bucket_start(created_at, granularity).timestamp(),
+                *increments.values(),
+                score,
+                score,
+            )
+            for granularity in GRANULARITIES
+            for dimension, key in dimensions
+        ]
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in columns)
+        conn.executemany(
+            f"""
+            INSERT INTO quality_rollups (
+                granularity, dimension, dimension_key, bucket_start,
+                {", ".join(columns)}, score_min, score_max
+            ) VALUES ({", ".join("?" * (len(columns) + 6))})
+            ON CONFLICT (granularity, dimension, dimension_key, bucket_start) DO UPDATE SET
+                {updates},
+                score_min = COALESCE(
+                    MIN(score_min, excluded.score_min), score_min, excluded.score_min
+                ),
+                score_max = COALESCE(
+                    MAX(score_max, excluded.score_max), score_max, excluded.score_max
+                )
+            """,
+            rows,
+        )
+        return True
+
+    def _record(self, *args) -> bool:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return self._apply(conn, *args)
+
+    def _backfill(self, entries: List[tuple], applied_at: float) -> int:
+        with self._lock:
+            conn = self._connect()
+            (count,) = conn.execute("SELECT COUNT(*) FROM rollup_applied").fetchone()
+            if count:
+                return 0
+            with conn:
+                return sum(self._apply(conn, *entry, applied_at) for entry in entries)
+
+    def _query(
+        self,
+        granularity: str,
+        dimension: str,
+        dimension_key: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+    ) -> List[sqlite3.Row]:
+        conditions = ["granularity = ?", "dimension = ?", "dimension_key = ?"]
+        params: List[Any] = [granularity, dimension, dimension_key]
+        if start is not None:
+            conditions.append("bucket_start >= ?")
+            params.append(bucket_start(start, granularity).timestamp())
+        if end is not None:
+            conditions.append("bucket_start < ?")
+            params.append(end.timestamp())
+        with self._lock:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            try:
+                return conn.execute(
+                    f"SELECT * FROM quality_rollups WHERE {' AND '.join(conditions)} "
+                    "ORDER BY bucket_start",
+                    params,
+                ).fetchall()
+            finally:
+                conn.row_factory = None
+
+    async def record(
+        self,
+        report_id: str,
+        created_at: datetime,
+        status: str,
+        score: Optional[float],
+        participant_ids: Iterable[str] = (),
+    ):
+        """將一份已完成的報告累加到彙總 (同一份報告只會計入一次)，寫入失敗只記錄錯誤。"""
+        try:
+            await asyncio.to_thread(
+                self._record,
+                report_id,
+                created_at,
+                status,
+                score,
+                list(participant_ids),
+                datetime.now().timestamp(),
+            )
+        except sqlite3.Error as e:
+            logger.error("更新品質指標彙總失敗 (報告 %s): %s", report_id, e)
+
+    def backfill(self, entries: List[tuple]) -> int:
+        """
+        彙總表為空時，以既有報告 (report_id, created_at, status, score, participant_ids)
+        建立初始彙總 (啟動時同步呼叫)，回傳計入的報告數。
+        """
+        return self._backfill(entries, datetime.now().timestamp())
+
+    async def query(
+        self,
+        granularity: str = "day",
+        participant_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        查詢時間範圍內的趨勢 (每個時間桶一筆) 與整段期間的合計。
+
+        時間粒度不支援時拋出 ValueError。
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"不支援的時間粒度: {granularity}")
+        dimension, key = (
+            (DIMENSION_PARTICIPANT, participant_id) if participant_id else (DIMENSION_ALL, "")
+        )
+        rows = await asyncio.to_thread(self._query, granularity, dimension, key, start, end)
+        series = [self._format(dict(row)) for row in rows]
+
+        totals: Dict[str, Any] = {
+            column: sum(row[column] for row in rows)
+            for column in ("total", "success", "error", "score_count", "score_sum", "score_sq_sum")
+            + tuple(_BIN_COLUMNS)
+        }
+        scores_min = [row["score_min"] for row in rows if row["score_min"] is not None]
+        scores_max = [row["score_max"] for row in rows if row["score_max"] is not None]
+        totals["score_min"] = min(scores_min) if scores_min else None
+        totals["score_max"] = max(scores_max) if scores_max else None
+        return {
+            "granularity": granularity,
+            "participant_id": participant_id,
+            "series": series,
+            "totals": self._format(totals),
+        }
+
+    @staticmethod
+    def _format(row: Dict[str, Any]) -> Dict[str, Any]:
+        score_count = row["score_count"]
+        average = row["score_sum"] / score_count if score_count else None
+        stddev = None
+        if score_count:
+            variance = max(row["score_sq_sum"] / score_count - average * average, 0.0)
+            stddev = variance ** 0.5
+        result = {
+            "total": row["total"],
+            "success": row["success"],
+            "error": row["error"],
+            "failure_rate": row["error"] / row["total"] if row["total"] else None,
+            "average_score": average,
+            "score_stddev": stddev,
+            "min_score": row["score_min"],
+            "max_score": row["score_max"],
+            "score_distribution": [row[column] for column in _BIN_COLUMNS],
+        }
+        if "bucket_start" in row:
+            result = {"bucket_start": datetime.fromtimestamp(row["bucket_start"]), **result}
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+quality_rollup_store = QualityRollupStore(settings.STORAGE_PATH / "analytics.sqlite3")
@@ -0,0 +1,200 @@
+"""
+即時轉錄片段儲存模組 - 保存通話中即時轉錄的片段，供通話結束後的分析重複使用
+
+每個通話 (房間) 的片段以 JSON Lines 追加寫入 STORAGE_PATH/realtime_segments/<session_id>.jsonl，
+第一行為通話開始標記 (含該通通話的 call_id)，其後每一行為一個片段 (含相對於通話開始的時間)
+或通話結束標記。房間 ID 會被重複使用，分析時只接受本程序為這通電話開啟的紀錄。
+監控側錄與即時串流是同一段音訊，若即時片段完整涵蓋整通電話，
+分析流程即可直接使用拼接後的轉錄稿，不必再把整個監控音檔送去轉錄。
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import settings
+from models.call_models import SttResult, TranscriptSegment
+from services.artifact_index import KIND_REALTIME_SEGMENTS, artifact_index
+
+logger = logging.getLogger(__name__)
+
+# 沒有語音、未送 STT 的靜音區段不佔用片段序號
+SILENT_SEQ = -1
+
+
+@dataclass
+class RealtimeSegment:
+    """一個即時轉錄片段，時間為相對於通話開始的秒數"""
+
+    seq: int
+    start: float
+    end: float
+    text: str
+    # STT 是否成功；失敗的片段代表轉錄稿有缺口
+    ok: bool = True
+
+
+@dataclass
+class RealtimeSessionLog:
+    """讀取自片段檔的單通通話紀錄"""
+
+    call_id: Optional[str] = None
+    segments: List[RealtimeSegment] = field(default_factory=list)
+    closed: bool = False
+
+
+class RealtimeSegmentStore:
+    """以 JSON Lines 檔案保存各通話的即時轉錄片段"""
+
+    def __init__(self, base_path: Path):
+        self.base_path = base_path
+        self._closed_events: Dict[str, asyncio.Event] = {}
+        self._started_at: Dict[str, float] = {}
+        self._next_seq: Dict[str, int] = {}
+        # 各房間最近一次開啟、尚未被分析取用的通話 ID
+        self._call_ids: Dict[str, str] = {}
+
+    def _path(self, session_id: str) -> Path:
+        return self.base_path / f"{session_id}.jsonl"
+
+    def _append(self, session_id: str, record: dict):
+        path = self._path(session_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def open_session(self, session_id: str):
+        """通話開始：清除同一 ID 的舊紀錄、寫入帶有新 call_id 的開始標記並開始計時。"""
+        call_id = uuid.uuid4().hex
+        self._path(session_id).unlink(missing_ok=True)
+        self._append(session_id, {"type": "start", "call_id": call_id, "started_at": time.time()})
+        # 房間 ID 會被重複使用，通話開始時就更新登錄時間，避免進行中的片段檔被當成過期檔案清除
+        artifact_index.register(self._path(session_id), KIND_REALTIME_SEGMENTS)
+        self._call_ids[session_id] = call_id
+        self._closed_events[session_id] = asyncio.Event()
+        self._started_at[session_id] = time.monotonic()
+        self._next_seq[session_id] = 0
+
+    def elapsed(self, session_id: str) -> float:
+        """目前距離通話開始的秒數。"""
+        started_at = self._started_at.get(session_id)
+        return time.monotonic() - started_at if started_at is not None else 0.0
+
+    def next_seq(self, session_id: str) -> int:
+        """取得下一個片段序號 (依緩衝區送出的順序)。"""
+        seq = self._next_seq.get(session_id, 0)
+        self._next_seq[session_id] = seq + 1
+        return seq
+
+    def append_segment(self, session_id: str, segment: RealtimeSegment):
+        self._append(session_id, {"type": "segment", **asdict(segment)})
+
+    def append_silence(self, session_id: str, start: float, end: float):
+        """記錄 VAD 判定為靜音的區段 (空白文字)，讓涵蓋率計算包含通話中的停頓。"""
+        self.append_segment(
+            session_id,
+            RealtimeSegment(seq=SILENT_SEQ, start=round(start, 3), end=round(end, 3), text=""),
+        )
+
+    def close_session(self, session_id: str):
+        """通話結束：寫入結束標記，通知等待中的分析流程。"""
+        self._append(
+            session_id, {"type": "end", "duration": round(self.elapsed(session_id), 3)}
+        )
+        artifact_index.register(self._path(session_id), KIND_REALTIME_SEGMENTS)
+        self._started_at.pop(session_id, None)
+        self._next_seq.pop(session_id, None)
+        event = self._closed_events.pop(session_id, None)
+        if event:
+            event.set()
+
+    async def wait_closed(self, session_id: str, timeout: float):
+        """等待仍在進行中的通話寫入結束標記，最多等待 timeout 秒。"""
+        event = self._closed_events.get(session_id)
+        if event is None:
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.info("即時片段: 通話 %s 在 %.1f 秒內未結束", session_id, timeout)
+
+    def load(self, session_id: str) -> Tuple[List[RealtimeSegment], bool]:
+        """
+        讀取通話的所有片段。
+
+        Returns:
+            Tuple[List[RealtimeSegment], bool]: 依開始時間排序的片段，以及通話是否已正常結束。
+        """
+        log = self._read(session_id)
+        return log.segments, log.closed
+
+    def _read(self, session_id: str) -> RealtimeSessionLog:
+        log = RealtimeSessionLog()
+        path = self._path(session_id)
+        if not path.exists():
+            return log
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                record_type = record.pop("type", None)
+                if record_type == "start":
+                    log.call_id = record.get("call_id")
+                elif record_type == "end":
+                    log.closed = True
+                else:
+                    log.segments.append(RealtimeSegment(**record))
+        log.segments.sort(key=lambda segment: (segment.start, segment.seq))
+        return log
+
+    async def build_stt_result(
+        self, session_id: str, expected_seconds: float
+    ) -> Optional[SttResult]:
+        """
+        將即時片段拼接為監控端的 STT 結果。
+
+        這通電話沒有開啟即時轉錄 (例如房間數已達上限被拒絕)、片段檔屬於同一房間的其他通話、
+        通話未正常結束、有轉錄失敗的片段，或片段 (含靜音區段) 涵蓋的時間低於
+        REALTIME_REUSE_MIN_COVERAGE 時回傳 None，由呼叫端改為完整轉錄。
+        每次開啟的紀錄只能被取用一次。
+        """
+        call_id = self._call_ids.pop(session_id, None)
+        if call_id is None:
+            logger.info("即時片段: 通話 %s 沒有本次通話開啟的即時轉錄紀錄", session_id)
+            return None
+        await self.wait_closed(session_id, settings.REALTIME_REUSE_WAIT_SECONDS)
+        log = await asyncio.to_thread(self._read, session_id)
+        if log.call_id != call_id:
+            logger.info("即時片段: 通話 %s 的片段檔屬於其他通話，改為完整轉錄", session_id)
+            return None
+        segments = log.segments
+        if not segments or not log.closed:
+            logger.info("即時片段: 通話 %s 沒有完整的即時轉錄紀錄", session_id)
+            return None
+        failed = sum(1 for segment in segments if not segment.ok)
+        covered = sum(segment.end - segment.start for segment in segments)
+        coverage = covered / expected_seconds if expected_seconds > 0 else 0.0
+        if failed or coverage < settings.REALTIME_REUSE_MIN_COVERAGE:
+            logger.info(
+                "即時片段: 通話 %s 有缺口 (失敗片段 %d 個，涵蓋率 %.0f%%)，改為完整轉錄",
+                session_id,
+                failed,
+                coverage * 100,
+            )
+            return None
+        return SttResult(
+            transcript="".join(segment.text for segment in segments).strip(),
+            segments=[
+                TranscriptSegment(start=segment.start, end=segment.end, text=segment.text)
+                for segment in segments
+                if segment.text
+            ],
+            source="realtime",
+        )
+
+
+realtime_segment_store = RealtimeSegmentStore(settings.STORAGE_PATH / "realtime_segments")
@@ -1,35 +1,232 @@
 """
 AudioAssuranceSystem - 即時轉錄服務
+
+每個通話房間有獨立的轉錄管線 (RoomPipeline)：各自的音訊緩衝、語音活動偵測、STT 併發名額與吞吐量統計，
+多通電話可同時進行即時轉錄。監控端可訂閱特定房間或全部房間的結果。
+
+音訊串流由每個房間常駐的解碼器轉為 PCM，以能量/過零率 VAD 在實際的語句停頓處切段，
+並以最大片段長度限制字幕延遲。片段直接從 PCM 切出並編碼為獨立的小檔案 (STT_UPLOAD_FORMAT)，
+每次 STT 請求都是可單獨解碼的完整音檔。
+無法啟動解碼器時退回「音訊停止送達即切段」的計時器模式，送出的容器片段會補上串流開頭的容器標頭。
+
+說話期間會依請求預算定期轉錄進行中的片段，推送暫定字幕 (partial)；
+片段切段後的正式結果 (transcript) 以相同的序號取代暫定字幕。
+
+同一房間的多個片段可同時轉錄 (受 REALTIME_ROOM_STT_CONCURRENCY 限制)，
+完成的結果先放入依序號排列的重排緩衝，前面的片段都完成後才依說話順序保存與推送。
+推送給監控端時經由 WebSocketFanout：每個連線有各自的有界佇列與寫入工作，較慢的連線不會拖慢其他連線。
+每通電話最近的正式字幕保留在記憶體的環狀緩衝，中途加入的監控端會先收到一批補送的字幕 (history)，
+再接續即時推送；超出環狀緩衝的較早字幕可從即時片段檔補讀。
 """
 
 import asyncio
+import json
 import logging
-from collections import defaultdict
-from typing import Any, Dict, List, Optional
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 
+import numpy as np
 from fastapi import WebSocket, WebSocketDisconnect
 
+from config.settings import settings
 from models.call_models import MonitoringProgressStatus
+from services.realtime_segment_store import RealtimeSegment, realtime_segment_store
+from services.stream_decoder import StreamingDecoder
+from services.ws_fanout import WS_CLOSE_TRY_AGAIN_LATER, WebSocketFanout
 from services.stt_service import STTService
+from utils.rate_limit import RequestPriority, TokenBucket
+from utils.vad import StreamingVAD, VoiceSegment
 
 
 logger = logging.getLogger(__name__)
 
+# 保留字幕歷史的通話數 (進行中的通話之外，保留最近結束的通話)
+HISTORY_SESSIONS = 20
+# 補送批次中每筆字幕的欄位
+HISTORY_FIELDS = ["seq", "start", "end", "text"]
+
+# WebM (Matroska) 的 Cluster 元素 ID，第一個 Cluster 之前為容器標頭
+WEBM_CLUSTER_ID = b"\x1f\x43\xb6\x75"
+
+
+def container_header(first_chunk: bytes) -> bytes:
+    """取出串流第一個區塊中的 WebM 容器標頭，不是 WebM 時回傳空字串。"""
+    index = first_chunk.find(WEBM_CLUSTER_ID)
+    return first_chunk[:index] if index > 0 else b""
+
+
+@dataclass
+class RoomMetrics:
+    """單一房間的即時轉錄吞吐量統計"""
+
+    started_at: float = field(default_factory=time.time)
+    ended_at: Optional[float] = None
+    chunks_received: int = 0
+    bytes_received: int = 0
+    segments_transcribed: int = 0
+    partial_transcriptions: int = 0
+    # 比前面的片段先完成、需在重排緩衝等待的片段數與最大等待深度
+    reordered_segments: int = 0
+    max_reorder_depth: int = 0
+    stt_failures: int = 0
+    # 已轉錄片段涵蓋的通話秒數與 STT 花費的秒數
+    audio_seconds: float = 0.0
+    stt_seconds: float = 0.0
+    characters: int = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max((self.ended_at or time.time()) - self.started_at, 1e-6)
+        return {
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "chunks_received": self.chunks_received,
+            "bytes_received": self.bytes_received,
+            "bytes_per_second": round(self.bytes_received / elapsed, 1),
+            "segments_transcribed": self.segments_transcribed,
+            "segments_per_minute": round(self.segments_transcribed * 60 / elapsed, 2),
+            "partial_transcriptions": self.partial_transcriptions,
+            "reordered_segments": self.reordered_segments,
+            "max_reorder_depth": self.max_reorder_depth,
+            "stt_failures": self.stt_failures,
+            "audio_seconds": round(self.audio_seconds, 3),
+            "stt_seconds": round(self.stt_seconds, 3),
+            "average_stt_latency": (
+                round(self.stt_seconds / self.segments_transcribed, 3)
+                if self.segments_transcribed
+                else None
+            ),
+            "characters": self.characters,
+        }
+
+
+@dataclass
+class SegmentResult:
+    """單一片段的正式轉錄結果"""
+
+    seq: int
+    start: float
+    end: float
+    text: str
+    ok: bool
+    stt_seconds: float = 0.0
+
+
+class SegmentReorderBuffer:
+    """
+    依序號排列轉錄結果：較晚的片段先完成時暫存，等前面的片段都完成後依序取出。
+
+    保留了序號卻沒有片段 (例如通話結束時) 以 None 略過，避免後面的結果卡住。
+    """
+
+    def __init__(self):
+        self.next_seq = 0
+        self._pending: Dict[int, Optional[SegmentResult]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, seq: int, result: Optional[SegmentResult]):
+        if seq >= self.next_seq:
+            self._pending[seq] = result
+
+    def pop_ready(self) -> List[SegmentResult]:
+        ready = []
+        while self.next_seq in self._pending:
+            result = self._pending.pop(self.next_seq)
+            if result is not None:
+                ready.append(result)
+            self.next_seq += 1
+        return ready
+
+
+class TranscriptHistory:
+    """單一通話最近的正式字幕 (環狀緩衝)，以及進行中片段最新的暫定字幕"""
+
+    def __init__(self, maxlen: int):
+        self.entries: Deque[Tuple[int, float, float, str]] = deque(maxlen=max(1, maxlen))
+        self.partial: Optional[Tuple[int, str]] = None
+        # 是否已有較早的字幕被擠出環狀緩衝
+        self.evicted = False
+
+    def append(self, seq: int, start: float, end: float, text: str):
+        if len(self.entries) == self.entries.maxlen:
+            self.evicted = True
+        self.entries.append((seq, round(start, 3), round(end, 3), text))
+        if self.partial is not None and self.partial[0] <= seq:
+            self.partial = None
+
+    def covers(self, since_seq: Optional[int]) -> bool:
+        """記憶體中的字幕是否足以補送 since_seq 之後的全部內容。"""
+        if not self.evicted:
+            return True
+        return since_seq is not None and since_seq >= self.entries[0][0] - 1
+
+
+@dataclass
+class RoomPipeline:
+    """單一房間的即時轉錄狀態"""
+
+    room_id: str
+    stt_slots: asyncio.Semaphore
+    # 已連線的音訊來源；同一通話的參與者送出的是同一條混音串流，只採用第一個來源
+    producers: List[str] = field(default_factory=list)
+    # 串流解碼器與 VAD；解碼器無法使用時為 None，改以計時器在音訊停止送達時觸發轉錄
+    decoder: Optional[StreamingDecoder] = None
+    vad: Optional[StreamingVAD] = None
+    # 尚未切段的 PCM (int16 bytes) 與其第一個樣本在串流中的索引
+    pcm: bytearray = field(default_factory=bytearray)
+    pcm_base: int = 0
+    # PCM 時間軸起點 (第一個音訊塊到達時，相對於通話開始的秒數)
+    pcm_origin: Optional[float] = None
+    # 暫定字幕：進行中片段預先保留的序號、已推送暫定字幕的序號、執行中的暫定轉錄與請求預算
+    open_seq: Optional[int] = None
+    partial_seqs: Set[int] = field(default_factory=set)
+    partial_task: Optional[asyncio.Task] = None
+    last_partial_at: float = 0.0
+    partial_budget: Optional[TokenBucket] = None
+    # 計時器模式：容器片段緩衝、串流開頭的容器標頭
+    # 以及緩衝區第一個與最後一個音訊塊的到達時間 (相對於通話開始的秒數)
+    buffer: bytearray = field(default_factory=bytearray)
+    stream_header: Optional[bytes] = None
+    buffer_span: Optional[List[float]] = None
+    vad_timer: Optional[asyncio.TimerHandle] = None
+    # 尚未完成的轉錄工作，通話結束時需等待完成才能寫入結束標記
+    pending_tasks: Set[asyncio.Task] = field(default_factory=set)
+    # 依序號保存與推送結果的重排緩衝，emit_lock 確保同一時間只有一個工作依序送出
+    reorder: SegmentReorderBuffer = field(default_factory=SegmentReorderBuffer)
+    emit_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    metrics: RoomMetrics = field(default_factory=RoomMetrics)
+    # 收尾完成 (結束標記已寫入) 時設定
+    closed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def primary_producer(self) -> Optional[str]:
+        return self.producers[0] if self.producers else None
+
 
 class RealtimeTranscriptionService:
-    """管理即時串流轉錄與監控推播"""
+    """管理各房間的即時串流轉錄與監控推播"""
 
     def __init__(self):
         self.stt_service = STTService()
-        # 儲存目前訂閱結果的監控端 WebSocket
-        self.consumers: List[WebSocket] = []
-        # 追蹤目前活躍的通話房間
-        self.active_room_id: Optional[str] = None
-        # 針對每個房間的音訊緩衝
-        self.audio_buffers: Dict[str, bytearray] = defaultdict(bytearray)
-        # VAD 計時器，控制當音訊靜止時觸發轉錄
-        self.vad_timers: Dict[str, asyncio.TimerHandle] = {}
-        # 音訊靜止多久 (秒) 視為片段結束
+        # 監控端連線 (各自訂閱的房間，None 表示全部房間) 與非阻塞推送
+        self.consumers = WebSocketFanout(
+            "即時轉錄推送",
+            queue_size=settings.REALTIME_CONSUMER_QUEUE_SIZE,
+            send_timeout=settings.REALTIME_CONSUMER_SEND_TIMEOUT_SECONDS,
+        )
+        # 進行中的房間轉錄管線
+        self.rooms: Dict[str, RoomPipeline] = {}
+        # 已不接受新來源、正在送出剩餘片段並寫入結束標記的房間
+        self.closing_rooms: Dict[str, RoomPipeline] = {}
+        # 最近結束的房間統計，供查詢吞吐量使用
+        self.finished_rooms: Deque[Dict[str, Any]] = deque(maxlen=20)
+        # 各通話的字幕歷史，供中途加入的監控端補送
+        self.histories: "OrderedDict[str, TranscriptHistory]" = OrderedDict()
+        # 計時器模式下，音訊停止送達多久 (秒) 視為片段結束
         self.VAD_TIMEOUT = 0.8
         # 進度條目前狀態與通話 ID
         self.current_status: MonitoringProgressStatus = MonitoringProgressStatus.WAITING_FOR_CALL
@@ -68,11 +265,11 @@ class RealtimeTranscriptionService:
         extra: Optional[Dict[str, Any]] = None,
         force: bool = False,
     ):
-        """廣播進度狀態到所有監控端"""
+        """廣播進度狀態到訂閱該通話 (或全部房間) 的監控端"""
         if status == MonitoringProgressStatus.WAITING_FOR_CALL:
             target_session = None
         else:
-            target_session = session_id or self.current_call_id or self.active_room_id
+            target_session = session_id or self.current_call_id
 
         if (
             not force
@@ -104,129 +301,523 @@ class RealtimeTranscriptionService:
     async def handle_audio_producer(self, websocket: WebSocket, room_id: str, client_id: str):
         """接收來自話務端的即時音訊串流"""
         await websocket.accept()
+        room = self.rooms.get(room_id)
+        closing = self.closing_rooms.get(room_id)
+        if room is None and closing is not None:
+            # 同一房間的上一段串流仍在收尾，等它寫完結束標記再開新的管線
+            await closing.closed.wait()
+            room = self.rooms.get(room_id)
+        if room is None:
+            if settings.REALTIME_MAX_ROOMS > 0 and len(self.rooms) >= settings.REALTIME_MAX_ROOMS:
+                logger.warning(
+                    "即時轉錄: 同時進行的房間已達上限 %d，拒絕房間 %s",
+                    settings.REALTIME_MAX_ROOMS,
+                    room_id,
+                )
+                await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
+                return
+            room = await self._open_room(room_id)
+        room.producers.append(client_id)
         logger.info("即時轉錄: 來源 %s 已連線房間 %s", client_id, room_id)
 
-        if self.active_room_id is None:
-            self.active_room_id = room_id
-            logger.info("即時轉錄: 房間 %s 設為目前活躍通話", room_id)
-            await self.broadcast_status(
-                MonitoringProgressStatus.RECORDING_STARTED,
-                session_id=room_id,
-            )
-
         try:
             while True:
                 audio_chunk = await websocket.receive_bytes()
-                if room_id == self.active_room_id:
-                    self._handle_audio_chunk(room_id, audio_chunk)
+                if client_id == room.primary_producer:
+                    await self._handle_audio_chunk(room, audio_chunk)
         except WebSocketDisconnect:
             logger.info("即時轉錄: 來源 %s 與房間 %s 連線中斷", client_id, room_id)
-            if room_id == self.active_room_id:
-                if room_id in self.vad_timers:
-                    self.vad_timers[room_id].cancel()
-                if self.audio_buffers[room_id]:
-                    await self._process_buffer(room_id)
-
-                logger.info("即時轉錄: 活躍房間 %s 已結束", room_id)
-                await self.broadcast_status(
-                    MonitoringProgressStatus.CALL_ENDED,
-                    session_id=room_id,
-                )
-                self.active_room_id = None
-                if room_id in self.audio_buffers:
-                    del self.audio_buffers[room_id]
         except Exception as exc:
             logger.error("即時轉錄: 房間 %s 發生未預期錯誤: %s", room_id, exc, exc_info=True)
+        finally:
+            room.producers.remove(client_id)
+            if not room.producers:
+                await self._close_room(room)
+            elif client_id != room.primary_producer:
+                logger.info("即時轉錄: 房間 %s 改用來源 %s 的串流", room_id, room.primary_producer)
+
+    async def _open_room(self, room_id: str) -> RoomPipeline:
+        room = RoomPipeline(
+            room_id=room_id,
+            stt_slots=asyncio.Semaphore(max(1, settings.REALTIME_ROOM_STT_CONCURRENCY)),
+        )
+        self.rooms[room_id] = room
+        self._open_history(room_id)
+        realtime_segment_store.open_session(room_id)
+        if settings.REALTIME_VAD_ENABLED:
+            await self._start_decoder(room)
+        logger.info("即時轉錄: 房間 %s 開始即時轉錄 (目前 %d 個房間)", room_id, len(self.rooms))
+        await self.broadcast_status(
+            MonitoringProgressStatus.RECORDING_STARTED,
+            session_id=room_id,
+        )
+        return room
+
+    async def _start_decoder(self, room: RoomPipeline):
+        sample_rate = settings.STT_UPLOAD_SAMPLE_RATE
+        vad = StreamingVAD(
+            sample_rate,
+            threshold_dbfs=settings.REALTIME_VAD_THRESHOLD_DBFS,
+            min_silence_ms=settings.REALTIME_VAD_MIN_SILENCE_MS,
+            min_speech_ms=settings.REALTIME_VAD_MIN_SPEECH_MS,
+            max_segment_seconds=settings.REALTIME_MAX_SEGMENT_SECONDS,
+        )
+        decoder = StreamingDecoder(
+            room.room_id, sample_rate, lambda pcm: self._on_pcm(room, pcm)
+        )
+        if await decoder.start():
+            room.decoder, room.vad = decoder, vad
+            room.partial_budget = TokenBucket(settings.REALTIME_PARTIAL_MAX_PER_MINUTE, capacity=1)
+        else:
+            logger.warning("即時轉錄: 房間 %s 無法啟動串流解碼，改用計時器切段", room.room_id)
+
+    async def _close_room(self, room: RoomPipeline):
+        """最後一個來源離線：送出剩餘緩衝、寫入結束標記並釋放房間。"""
+        # 在第一次等待前就移出房間表，收尾期間新連線的來源不會加入這個即將結束的管線
+        if self.rooms.get(room.room_id) is room:
+            del self.rooms[room.room_id]
+        self.closing_rooms[room.room_id] = room
+        try:
+            if room.vad_timer is not None:
+                room.vad_timer.cancel()
+            if room.partial_task is not None:
+                room.partial_task.cancel()
+            if room.decoder is not None:
+                # 等待剩餘音訊解碼完成，最後一段即使沒有停頓也要送出
+                await room.decoder.close()
+                segment = room.vad.flush()
+                if segment is not None:
+                    self._on_voice_segment(room, segment)
+            if room.buffer:
+                await self._process_buffer(room)
+            await self._finish_session(room)
+            room.metrics.ended_at = time.time()
+            self.finished_rooms.append({"room_id": room.room_id, **room.metrics.snapshot()})
+
+            logger.info("即時轉錄: 房間 %s 已結束", room.room_id)
             await self.broadcast_status(
                 MonitoringProgressStatus.CALL_ENDED,
-                session_id=room_id,
+                session_id=room.room_id,
                 force=True,
             )
-            self.active_room_id = None
-            if room_id in self.audio_buffers:
-                del self.audio_buffers[room_id]
+        finally:
+            if self.closing_rooms.get(room.room_id) is room:
+                del self.closing_rooms[room.room_id]
+            room.closed.set()
+
+    async def _handle_audio_chunk(self, room: RoomPipeline, chunk: bytes):
+        """處理即時音訊片段：送入解碼器由 VAD 切段，或在計時器模式下重設計時器"""
+        room.metrics.chunks_received += 1
+        room.metrics.bytes_received += len(chunk)
+        now = realtime_segment_store.elapsed(room.room_id)
+        if room.pcm_origin is None:
+            room.pcm_origin = now
+        if room.stream_header is None:
+            room.stream_header = container_header(chunk)
+
+        if room.decoder is not None and not room.decoder.failed:
+            await room.decoder.feed(chunk)
+            return
 
-    def _handle_audio_chunk(self, room_id: str, chunk: bytes):
-        """處理即時音訊片段並重設 VAD 計時器"""
-        self.audio_buffers[room_id].extend(chunk)
+        room.buffer.extend(chunk)
+        if room.buffer_span is None:
+            room.buffer_span = [now, now]
+        room.buffer_span[1] = now
 
-        if room_id in self.vad_timers:
-            self.vad_timers[room_id].cancel()
+        if room.vad_timer is not None:
+            room.vad_timer.cancel()
+
+        if now - room.buffer_span[0] >= settings.REALTIME_MAX_SEGMENT_SECONDS:
+            # 持續送達的音訊也要在最大片段長度時切段
+            self._schedule_process_buffer(room)
+            return
 
         loop = asyncio.get_event_loop()
-        self.vad_timers[room_id] = loop.call_later(
-            self.VAD_TIMEOUT,
-            lambda: asyncio.create_task(self._process_buffer(room_id)),
+        room.vad_timer = loop.call_later(
+            self.VAD_TIMEOUT, self._schedule_process_buffer, room
+        )
+
+    def _on_pcm(self, room: RoomPipeline, pcm: np.ndarray):
+        """解碼器回呼：累積 PCM 並交給 VAD，在語句停頓或達到最大長度時送出片段"""
+        room.pcm.extend(pcm.tobytes())
+        for segment in room.vad.process(pcm):
+            self._on_voice_segment(room, segment)
+        if settings.REALTIME_PARTIAL_ENABLED:
+            self._maybe_schedule_partial(room)
+
+    def _on_voice_segment(self, room: RoomPipeline, segment: VoiceSegment):
+        """從 PCM 緩衝切出 VAD 區段；含語音的區段送往 STT，靜音區段只記錄時間範圍。"""
+        offset = (segment.start - room.pcm_base) * 2
+        length = (segment.end - segment.start) * 2
+        samples = np.frombuffer(bytes(room.pcm[offset : offset + length]), dtype=np.int16)
+        del room.pcm[: offset + length]
+        room.pcm_base = segment.end
+        sample_rate = room.vad.sample_rate
+        origin = room.pcm_origin or 0.0
+        if not segment.has_speech:
+            # 靜音不送 STT，但仍需記錄，否則整檔分析會把停頓當成轉錄缺口
+            realtime_segment_store.append_silence(
+                room.room_id,
+                origin + segment.start / sample_rate,
+                origin + segment.end / sample_rate,
+            )
+            return
+
+        # 已推送暫定字幕的片段沿用預先保留的序號
+        seq = room.open_seq
+        if seq is None:
+            seq = realtime_segment_store.next_seq(room.room_id)
+        room.open_seq = None
+        self._schedule_segment(
+            room,
+            seq,
+            origin + segment.start / sample_rate,
+            origin + segment.end / sample_rate,
+            samples,
         )
 
-    async def _process_buffer(self, room_id: str):
-        """將緩衝區音訊送往 STT 並廣播轉錄結果"""
-        if room_id in self.vad_timers:
-            del self.vad_timers[room_id]
+    def _maybe_schedule_partial(self, room: RoomPipeline):
+        """
+        說話中的片段已夠長且距上次暫定轉錄超過間隔時，轉錄目前為止的內容。
 
-        buffer = self.audio_buffers[room_id]
+        每個房間同時只有一個暫定轉錄；STT 名額已滿或超出每分鐘預算時略過，正式結果優先。
+        """
+        vad = room.vad
+        if room.partial_task is not None or not vad.in_speech:
+            return
+        now = time.monotonic()
+        if now - room.last_partial_at < settings.REALTIME_PARTIAL_INTERVAL_SECONDS:
+            return
+        offset = (vad.segment_start - room.pcm_base) * 2
+        if len(room.pcm) - offset < settings.REALTIME_PARTIAL_MIN_SECONDS * vad.sample_rate * 2:
+            return
+        if room.stt_slots.locked() or not room.partial_budget.try_acquire():
+            return
+
+        if room.open_seq is None:
+            room.open_seq = realtime_segment_store.next_seq(room.room_id)
+        samples = np.frombuffer(bytes(room.pcm[offset:]), dtype=np.int16)
+        room.last_partial_at = now
+        room.partial_task = asyncio.create_task(
+            self._transcribe_partial(room, room.open_seq, samples)
+        )
+
+    async def _transcribe_partial(self, room: RoomPipeline, seq: int, samples: np.ndarray):
+        try:
+            async with room.stt_slots:
+                transcript, _ = await self.stt_service.transcribe_pcm(
+                    samples,
+                    room.vad.sample_rate,
+                    name=f"{room.room_id}-{seq}-partial",
+                    priority=RequestPriority.INTERACTIVE,
+                )
+        finally:
+            room.partial_task = None
+        # 片段已切段時正式結果即將送出，不再推送過時的暫定字幕
+        if transcript and room.open_seq == seq:
+            room.metrics.partial_transcriptions += 1
+            room.partial_seqs.add(seq)
+            history = self.histories.get(room.room_id)
+            if history is not None:
+                history.partial = (seq, transcript)
+            await self._broadcast_result(room.room_id, transcript, seq, final=False)
+
+    def _schedule_segment(
+        self, room: RoomPipeline, seq: int, start: float, end: float, audio
+    ):
+        task = asyncio.create_task(self._transcribe_segment(room, seq, start, end, audio))
+        room.pending_tasks.add(task)
+        task.add_done_callback(room.pending_tasks.discard)
+
+    def _schedule_process_buffer(self, room: RoomPipeline):
+        task = asyncio.create_task(self._process_buffer(room))
+        room.pending_tasks.add(task)
+        task.add_done_callback(room.pending_tasks.discard)
+
+    async def _finish_session(self, room: RoomPipeline):
+        """等待尚未完成的轉錄後，寫入即時片段的結束標記。"""
+        if room.pending_tasks:
+            await asyncio.gather(*room.pending_tasks, return_exceptions=True)
+        if room.open_seq is not None:
+            # 已為暫定字幕保留序號但沒有對應的正式片段
+            room.reorder.add(room.open_seq, None)
+            room.open_seq = None
+            await self._emit_ready(room)
+        realtime_segment_store.close_session(room.room_id)
+
+    async def _process_buffer(self, room: RoomPipeline):
+        """計時器模式：將容器片段緩衝送往 STT"""
+        room.vad_timer = None
+        buffer = room.buffer
         if not buffer:
             return
 
-        self.audio_buffers[room_id] = bytearray()
+        room.buffer = bytearray()
+        start, end = room.buffer_span or (0.0, 0.0)
+        room.buffer_span = None
+        header = room.stream_header
+        if header and not buffer.startswith(header):
+            # 只有串流的第一個區塊帶有容器標頭，之後的片段補上標頭才能單獨解碼
+            buffer = header + buffer
+        seq = realtime_segment_store.next_seq(room.room_id)
+        await self._transcribe_segment(room, seq, start, end, bytes(buffer))
+
+    async def _transcribe_segment(
+        self, room: RoomPipeline, seq: int, start: float, end: float, audio
+    ):
+        """
+        將一個片段送往 STT、保存片段並廣播轉錄結果。
+
+        Args:
+            audio: VAD 切出的 PCM 樣本 (np.ndarray)，或計時器模式的容器片段 (bytes)。
+        """
+        if isinstance(audio, np.ndarray):
+            sample_rate = room.vad.sample_rate
+            too_short = len(audio) < self.stt_service.MIN_PCM_SECONDS * sample_rate
+            logger.info("即時轉錄: 房間 %s 片段長度 %.2f 秒", room.room_id, len(audio) / sample_rate)
+            request = self.stt_service.transcribe_pcm(
+                audio, sample_rate, name=f"{room.room_id}-{seq}",
+                priority=RequestPriority.INTERACTIVE,
+            )
+        else:
+            too_short = len(audio) < self.stt_service.MIN_AUDIO_BYTES
+            logger.info("即時轉錄: 房間 %s 音訊緩衝量 %d bytes", room.room_id, len(audio))
+            request = self.stt_service.transcribe_audio_bytes(
+                audio, priority=RequestPriority.INTERACTIVE
+            )
 
-        logger.info("即時轉錄: 房間 %s 音訊緩衝量 %d bytes", room_id, len(buffer))
-        transcript, _ = await self.stt_service.transcribe_audio_bytes(bytes(buffer))
+        result = SegmentResult(seq=seq, start=start, end=end, text="", ok=False)
+        try:
+            # 每個房間各自的 STT 併發上限，避免單一房間佔滿即時轉錄的名額
+            async with room.stt_slots:
+                stt_started = time.monotonic()
+                transcript, confidence = await request
+                result.stt_seconds = time.monotonic() - stt_started
+            result.text = transcript
+            # 過短的片段本來就不會送出轉錄，不視為缺口
+            result.ok = confidence > 0 or too_short
+        finally:
+            # 無論成功與否都要交給重排緩衝，後面的片段才不會被卡住
+            room.reorder.add(seq, result)
+            if seq > room.reorder.next_seq:
+                room.metrics.reordered_segments += 1
+                room.metrics.max_reorder_depth = max(
+                    room.metrics.max_reorder_depth, len(room.reorder)
+                )
+            await self._emit_ready(room)
+
+    async def _emit_ready(self, room: RoomPipeline):
+        """依序號保存並推送前面片段都已完成的結果。"""
+        async with room.emit_lock:
+            for result in room.reorder.pop_ready():
+                await self._emit_result(room, result)
+
+    async def _emit_result(self, room: RoomPipeline, result: SegmentResult):
+        realtime_segment_store.append_segment(
+            room.room_id,
+            RealtimeSegment(
+                seq=result.seq,
+                start=round(result.start, 3),
+                end=round(result.end, 3),
+                text=result.text,
+                ok=result.ok,
+            ),
+        )
 
-        if transcript:
-            logger.info("即時轉錄結果 (%s): %s", room_id, transcript)
-            await self._broadcast_result(room_id, transcript)
+        metrics = room.metrics
+        if result.ok:
+            metrics.segments_transcribed += 1
+            metrics.audio_seconds += result.end - result.start
+            metrics.stt_seconds += result.stt_seconds
+            metrics.characters += len(result.text)
+        else:
+            metrics.stt_failures += 1
+
+        if result.text:
+            logger.info("即時轉錄結果 (%s): %s", room.room_id, result.text)
+            history = self.histories.get(room.room_id)
+            if history is not None:
+                history.append(result.seq, result.start, result.end, result.text)
+        # 推送過暫定字幕的片段即使沒有正式文字也要送出，讓監控端移除暫定字幕
+        if result.text or result.seq in room.partial_seqs:
+            room.partial_seqs.discard(result.seq)
+            await self._broadcast_result(room.room_id, result.text, result.seq)
+
+    def get_room_metrics(self) -> Dict[str, Any]:
+        """取得進行中與最近結束房間的吞吐量統計。"""
+        return {
+            "active_rooms": {
+                room_id: {
+                    "producers": len(room.producers),
+                    "pending_stt": len(room.pending_tasks),
+                    "awaiting_reorder": len(room.reorder),
+                    **room.metrics.snapshot(),
+                }
+                for room_id, room in self.rooms.items()
+            },
+            "finished_rooms": list(self.finished_rooms),
+            "fanout": self.consumers.snapshot(),
+        }
 
-    async def handle_results_consumer(self, websocket: WebSocket):
-        """處理監控前端的訂閱連線"""
+    @staticmethod
+    def _parse_rooms(value: Any) -> Optional[Set[str]]:
+        """將訂閱參數轉為房間集合；空值、"*" 或 "all" 表示訂閱全部房間。"""
+        if value is None:
+            return None
+        rooms = {value} if isinstance(value, str) else set(value)
+        rooms = {room for room in rooms if room}
+        if not rooms or rooms & {"*", "all"}:
+            return None
+        return rooms
+
+    def _open_history(self, room_id: str):
+        """通話開始時建立新的字幕歷史，只保留進行中 (含收尾中) 與最近結束的通話。"""
+        self.histories.pop(room_id, None)
+        self.histories[room_id] = TranscriptHistory(settings.REALTIME_HISTORY_SIZE)
+        for old_room in list(self.histories):
+            if len(self.histories) <= HISTORY_SESSIONS:
+                break
+            if old_room not in self.rooms and old_room not in self.closing_rooms:
+                del self.histories[old_room]
+
+    async def _load_spilled_history(
+        self, room_ids: List[str], since_seq: Optional[int]
+    ) -> Dict[str, List[Tuple[int, float, float, str]]]:
+        """環狀緩衝不足以補送時，從即時片段檔讀取較早的字幕。"""
+        spilled: Dict[str, List[Tuple[int, float, float, str]]] = {}
+        if not settings.REALTIME_HISTORY_DISK_REPLAY:
+            return spilled
+        for room_id in room_ids:
+            history = self.histories.get(room_id)
+            # 只接受單純的檔名，避免以房間 ID 讀取片段目錄以外的檔案
+            if (history is None or not history.covers(since_seq)) and Path(room_id).name == room_id:
+                segments, _ = await asyncio.to_thread(realtime_segment_store.load, room_id)
+                spilled[room_id] = [
+                    (segment.seq, segment.start, segment.end, segment.text)
+                    for segment in segments
+                    if segment.text
+                ]
+        return spilled
+
+    def _send_history(
+        self,
+        websocket: WebSocket,
+        room_ids: List[str],
+        since_seq: Optional[int],
+        spilled: Dict[str, List[Tuple[int, float, float, str]]],
+    ):
+        """
+        送出各通話的補送批次：since_seq 之後的正式字幕 (依序號排列) 與進行中的暫定字幕。
+
+        必須與登錄連線在同一段同步程式中完成，之後的即時字幕才會排在補送批次之後。
+        """
+        for room_id in room_ids:
+            history = self.histories.get(room_id)
+            entries = {entry[0]: entry for entry in spilled.get(room_id, [])}
+            if history is not None:
+                entries.update((entry[0], entry) for entry in history.entries)
+            segments = [
+                list(entries[seq])
+                for seq in sorted(entries)
+                if since_seq is None or seq > since_seq
+            ]
+            partial = history.partial if history is not None and room_id in self.rooms else None
+            if not segments and partial is None:
+                continue
+            payload: Dict[str, Any] = {
+                "type": "history",
+                "session_id": room_id,
+                "fields": HISTORY_FIELDS,
+                "segments": segments,
+            }
+            if partial is not None:
+                payload["partial"] = {"seq": partial[0], "text": partial[1]}
+            self.consumers.send_to(websocket, payload)
+
+    def _replay_rooms(self, topics: Optional[Set[str]]) -> List[str]:
+        """補送的通話：指定房間時為這些房間，否則為所有進行中的通話。"""
+        return sorted(topics) if topics is not None else list(self.rooms)
+
+    async def handle_results_consumer(
+        self,
+        websocket: WebSocket,
+        rooms: Optional[List[str]] = None,
+        since_seq: Optional[int] = None,
+    ):
+        """
+        處理監控前端的訂閱連線。
+
+        連線時可用 rooms 指定訂閱的房間 (預設全部)；之後可送出
+        {"type": "subscribe", "rooms": [...]} 變更訂閱 ("*" 表示全部房間)。
+        連線後先送出狀態快照與字幕補送批次 (只含 since_seq 之後的字幕)，再接續即時推送；
+        也可送出 {"type": "replay", "rooms": [...], "since_seq": n} 重新取得補送批次。
+        """
         await websocket.accept()
-        self.consumers.append(websocket)
+        topics = self._parse_rooms(rooms)
+        spilled = await self._load_spilled_history(self._replay_rooms(topics), since_seq)
+        self.consumers.add(websocket, topics)
         logger.info("即時轉錄: 新增監控端連線 (目前 %d 個)", len(self.consumers))
 
-        try:
-            await websocket.send_json(
-                {
-                    "type": "status",
-                    "status": self.current_status.value,
-                    "session_id": self.current_call_id,
-                    "is_snapshot": True,
-                }
-            )
-        except Exception as exc:
-            logger.warning("即時轉錄: 傳送狀態快照失敗: %s", exc)
+        self.consumers.send_to(
+            websocket,
+            {
+                "type": "status",
+                "status": self.current_status.value,
+                "session_id": self.current_call_id,
+                "active_rooms": list(self.rooms),
+                "is_snapshot": True,
+            },
+        )
+        self._send_history(websocket, self._replay_rooms(topics), since_seq, spilled)
 
         try:
             while True:
-                await websocket.receive_text()
+                message = await websocket.receive_text()
+                try:
+                    request = json.loads(message)
+                except ValueError:
+                    continue
+                if not isinstance(request, dict):
+                    continue
+                if request.get("type") == "subscribe":
+                    self.consumers.set_topics(websocket, self._parse_rooms(request.get("rooms")))
+                elif request.get("type") == "replay":
+                    await self._handle_replay_request(websocket, request)
         except WebSocketDisconnect:
-            if websocket in self.consumers:
-                self.consumers.remove(websocket)
-            logger.info("即時轉錄: 一個監控端連線已中斷 (剩餘 %d 個)", len(self.consumers))
+            logger.info("即時轉錄: 一個監控端連線已中斷 (剩餘 %d 個)", len(self.consumers) - 1)
         except Exception as exc:
-            if websocket in self.consumers:
-                self.consumers.remove(websocket)
             logger.error("即時轉錄: 監控端連線錯誤: %s", exc, exc_info=True)
+        finally:
+            self.consumers.remove(websocket)
+
+    async def _handle_replay_request(self, websocket: WebSocket, request: Dict[str, Any]):
+        since_seq = request.get("since_seq")
+        if not isinstance(since_seq, int):
+            since_seq = None
+        consumer = self.consumers.get(websocket)
+        if consumer is None:
+            return
+        topics = self._parse_rooms(request.get("rooms")) if "rooms" in request else consumer.topics
+        room_ids = self._replay_rooms(topics)
+        spilled = await self._load_spilled_history(room_ids, since_seq)
+        self._send_history(websocket, room_ids, since_seq, spilled)
 
-    async def _broadcast_result(self, room_id: str, transcript: str):
+    async def _broadcast_result(
+        self, room_id: str, transcript: str, seq: int, final: bool = True
+    ):
+        """推送轉錄結果：正式結果 (transcript) 會取代相同序號的暫定字幕 (partial)。"""
         payload = {
-            "type": "transcript",
+            "type": "transcript" if final else "partial",
             "text": transcript,
             "session_id": room_id,
+            "seq": seq,
         }
-        await self._broadcast_payload(payload)
+        # 暫定字幕之後會被取代，連線跟不上時可以直接捨棄
+        await self._broadcast_payload(payload, droppable=not final)
 
-    async def _broadcast_payload(self, payload: Dict[str, Any]):
-        """共用的廣播輔助方法"""
-        disconnected_consumers: List[WebSocket] = []
-        for consumer in self.consumers:
-            try:
-                await consumer.send_json(payload)
-            except Exception:
-                disconnected_consumers.append(consumer)
-
-        for consumer in disconnected_consumers:
-            if consumer in self.consumers:
-                self.consumers.remove(consumer)
+    async def _broadcast_payload(self, payload: Dict[str, Any], droppable: bool = False):
+        """共用的廣播輔助方法：放入訂閱該房間 (或全部房間) 的監控端佇列，不等待送出"""
+        self.consumers.publish(payload, topic=payload.get("session_id"), droppable=droppable)
 
 
 realtime_transcription_service = RealtimeTranscriptionService()
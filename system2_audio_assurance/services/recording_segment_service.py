@@ -0,0 +1,256 @@
+"""
+正式錄音分段服務 - 在通話進行中逐段下載並轉錄系統一送來的正式錄音分段
+
+系統一每歸檔一段錄音就會通知一次，本服務隨即在背景以批次優先等級下載並轉錄；
+通話結束時系統一送出分段清單 (manifest)。分析流程只需等待最後一段完成，
+即可將各段結果依時間偏移拼接為完整的正式錄音 STT 結果，不必再下載整個錄音檔重新轉錄。
+"""
+
+import asyncio
+import logging
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+
+from config.settings import settings
+from models.call_models import SttResult, TranscriptSegment
+from services.stt_service import STTService
+from utils.rate_limit import RequestPriority
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecordingSegment:
+    """一段正式錄音分段與其轉錄工作"""
+
+    index: int
+    start_seconds: float
+    duration_seconds: float
+    url: str
+    task: asyncio.Task
+
+
+@dataclass
+class SessionSegments:
+    """單一通話已收到的分段與分段清單"""
+
+    # 系統一的通話實例識別碼；房間 ID 會被重複使用，實例不同即為另一通電話
+    call_instance: Optional[str] = None
+    segments: Dict[int, RecordingSegment] = field(default_factory=dict)
+    segment_count: Optional[int] = None
+    complete: bool = False
+    manifest_received: asyncio.Event = field(default_factory=asyncio.Event)
+    # 最後一次收到通知的時間 (time.monotonic())，用於釋放逾時未取用的通話
+    updated_at: float = field(default_factory=time.monotonic)
+    # 分析流程正在等待此通話，不可被逾時釋放
+    in_use: bool = False
+
+
+class RecordingSegmentService:
+    """管理正式錄音分段的增量轉錄"""
+
+    def __init__(self):
+        self.stt_service = STTService()
+        self.http_client = httpx.AsyncClient()
+        self.sessions: Dict[str, SessionSegments] = {}
+
+    def _session(self, session_id: str, call_instance: Optional[str]) -> SessionSegments:
+        """
+        取得 (或建立) 通話的分段狀態，順便釋放逾時未取用的其他通話。
+
+        同一房間的新一通電話 (通話實例不同) 會捨棄上一通殘留的分段狀態，
+        避免上一通的分段或清單被拼進這一通的結果。
+        """
+        self._evict_expired()
+        session = self.sessions.get(session_id)
+        if (
+            session is not None
+            and call_instance is not None
+            and session.call_instance not in (None, call_instance)
+        ):
+            logger.info(
+                "錄音分段: 通話 %s 開始新的通話實例 %s，捨棄實例 %s 的分段",
+                session_id,
+                call_instance,
+                session.call_instance,
+            )
+            # 正在被分析流程使用的狀態由分析流程自行取消
+            if not session.in_use:
+                self._cancel(session)
+            session = None
+        if session is None:
+            session = SessionSegments(call_instance=call_instance)
+            self.sessions[session_id] = session
+        elif session.call_instance is None:
+            session.call_instance = call_instance
+        session.updated_at = time.monotonic()
+        return session
+
+    def _evict_expired(self):
+        """
+        釋放超過 RECORDING_SEGMENT_SESSION_TTL_SECONDS 沒有新通知的通話並取消其轉錄工作。
+
+        例如分析從未執行的通話，或分析結束後才送達的遲到通知所建立的狀態。
+        """
+        deadline = time.monotonic() - settings.RECORDING_SEGMENT_SESSION_TTL_SECONDS
+        for session_id, session in list(self.sessions.items()):
+            if not session.in_use and session.updated_at < deadline:
+                logger.info("錄音分段: 通話 %s 逾時未被分析取用，釋放分段狀態", session_id)
+                del self.sessions[session_id]
+                self._cancel(session)
+
+    def add_segment(
+        self,
+        session_id: str,
+        index: int,
+        start_seconds: float,
+        duration_seconds: float,
+        url: str,
+        call_instance: Optional[str] = None,
+    ):
+        """登錄一段新的分段並立即在背景開始下載與轉錄。"""
+        session = self._session(session_id, call_instance)
+        if index in session.segments:
+            logger.info("錄音分段: 通話 %s 第 %d 段重複通知，略過", session_id, index)
+            return
+        task = asyncio.create_task(
+            self._transcribe_segment(session_id, index, start_seconds, url)
+        )
+        # 被釋放或取代而無人等待的工作，其例外在此取用，避免 "Task exception was never retrieved"
+        task.add_done_callback(self._consume_exception)
+        session.segments[index] = RecordingSegment(
+            index=index,
+            start_seconds=start_seconds,
+            duration_seconds=duration_seconds,
+            url=url,
+            task=task,
+        )
+        logger.info(
+            "錄音分段: 通話 %s 收到第 %d 段 (起點 %.1f 秒)", session_id, index, start_seconds
+        )
+
+    def set_manifest(
+        self,
+        session_id: str,
+        segment_count: int,
+        complete: bool,
+        call_instance: Optional[str] = None,
+    ):
+        """登錄通話結束時的分段清單。"""
+        session = self._session(session_id, call_instance)
+        session.segment_count = segment_count
+        session.complete = complete
+        session.manifest_received.set()
+        logger.info(
+            "錄音分段: 通話 %s 分段清單共 %d 段 (完整: %s)", session_id, segment_count, complete
+        )
+
+    async def _transcribe_segment(
+        self, session_id: str, index: int, start_seconds: float, url: str
+    ) -> SttResult:
+        temp_path: Optional[Path] = None
+        try:
+            async with self.http_client.stream("GET", url, timeout=30.0) as response:
+                response.raise_for_status()
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
+                    temp_path = Path(tmp_file.name)
+                    async for chunk in response.aiter_bytes():
+                        tmp_file.write(chunk)
+            result = await self.stt_service.transcribe_audio_result(
+                str(temp_path), priority=RequestPriority.BATCH
+            )
+            # 片段時間換算為整通錄音的時間軸
+            result.segments = [
+                TranscriptSegment(
+                    start=segment.start + start_seconds,
+                    end=segment.end + start_seconds,
+                    text=segment.text,
+                )
+                for segment in result.segments
+            ]
+            logger.info("錄音分段: 通話 %s 第 %d 段轉錄完成", session_id, index)
+            return result
+        finally:
+            if temp_path and temp_path.exists():
+                temp_path.unlink()
+
+    async def build_stt_result(self, session_id: str) -> Optional[SttResult]:
+        """
+        等待分段清單與所有分段轉錄完成，拼接為正式錄音的 STT 結果。
+
+        沒有收到分段、清單未在時限內送達、分段不齊或任一段轉錄失敗時回傳 None，
+        由呼叫端改為下載完整錄音檔轉錄。等待結束後才釋放該通話的分段狀態，
+        等待期間送達的分段清單與分段仍會記錄在同一個狀態中。
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        session.in_use = True
+        try:
+            return await self._collect(session_id, session)
+        finally:
+            if self.sessions.get(session_id) is session:
+                del self.sessions[session_id]
+            # 未使用或未完成的分段不再需要
+            self._cancel(session)
+
+    async def _collect(
+        self, session_id: str, session: SessionSegments
+    ) -> Optional[SttResult]:
+        try:
+            await asyncio.wait_for(
+                session.manifest_received.wait(), settings.RECORDING_SEGMENT_WAIT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.info("錄音分段: 通話 %s 未在時限內收到分段清單", session_id)
+            return None
+
+        expected = set(range(session.segment_count or 0))
+        if not session.complete or not expected or set(session.segments) != expected:
+            logger.info(
+                "錄音分段: 通話 %s 分段不完整 (收到 %d 段，清單 %s 段)",
+                session_id,
+                len(session.segments),
+                session.segment_count,
+            )
+            return None
+
+        ordered = [session.segments[index] for index in sorted(expected)]
+        results = await asyncio.gather(
+            *(segment.task for segment in ordered), return_exceptions=True
+        )
+        failed = [
+            segment.index
+            for segment, result in zip(ordered, results)
+            if isinstance(result, BaseException)
+        ]
+        if failed:
+            logger.warning("錄音分段: 通話 %s 第 %s 段轉錄失敗", session_id, failed)
+            return None
+
+        return SttResult(
+            transcript="".join(result.transcript for result in results).strip(),
+            segments=[segment for result in results for segment in result.segments],
+            trimmed_silence_seconds=sum(result.trimmed_silence_seconds for result in results),
+            upload_format=results[0].upload_format if results else None,
+            upload_size_bytes=sum(result.upload_size_bytes or 0 for result in results),
+            source="segments",
+        )
+
+    @staticmethod
+    def _cancel(session: SessionSegments):
+        for segment in session.segments.values():
+            segment.task.cancel()
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("錄音分段: 背景轉錄工作失敗: %s", task.exception())
+
+
+recording_segment_service = RecordingSegmentService()
@@ -0,0 +1,76 @@
+"""
+報告事件推播模組 - 將分析報告的生命週期事件即時推送給儀表板
+
+報告建立、狀態變更、分析完成與刪除時發布精簡的事件 (只含報告摘要欄位)，
+儀表板訂閱 /ws/reports 後即可逐筆更新列表，不必再定時輪詢。
+每個連線各有有界的送出佇列與送出時限 (WebSocketFanout)，分析流程與其他連線不會被較慢的連線拖住；
+跟不上的連線會被關閉，儀表板重新連線時會重新載入列表補齊漏掉的事件。
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from config.settings import settings
+from models.call_models import ReportSummary
+from services.ws_fanout import WebSocketFanout
+
+logger = logging.getLogger(__name__)
+
+
+class ReportEventType:
+    """報告事件類型"""
+
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    COMPLETED = "completed"
+    DELETED = "deleted"
+
+
+class ReportEventHub:
+    """管理報告事件的訂閱連線與非阻塞推播"""
+
+    def __init__(self):
+        # 與即時轉錄推送共用監控端連線的佇列長度與送出時限設定
+        self.subscribers = WebSocketFanout(
+            "報告事件推送",
+            queue_size=settings.REALTIME_CONSUMER_QUEUE_SIZE,
+            send_timeout=settings.REALTIME_CONSUMER_SEND_TIMEOUT_SECONDS,
+        )
+
+    def publish_summary(self, event: str, summary: ReportSummary):
+        """發布單一報告的事件。"""
+        self._publish(
+            {"type": "report", "event": event, "report": summary.model_dump(mode="json")}
+        )
+
+    def publish_deleted(self, report_ids: List[str]):
+        """發布報告刪除事件 (清理舊報告時一次送出所有 ID)。"""
+        if report_ids:
+            self._publish(
+                {"type": "report", "event": ReportEventType.DELETED, "report_ids": report_ids}
+            )
+
+    def _publish(self, payload: Dict[str, Any]):
+        # 列表更新不可遺漏，佇列已滿的連線直接關閉，由儀表板重新連線後重新載入
+        self.subscribers.publish(payload)
+
+    async def handle_subscriber(self, websocket: WebSocket):
+        """處理儀表板的訂閱連線，直到連線中斷。"""
+        await websocket.accept()
+        self.subscribers.add(websocket)
+        logger.info("報告事件: 新增訂閱連線 (目前 %d 個)", len(self.subscribers))
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        except Exception as exc:
+            logger.error("報告事件: 訂閱連線錯誤: %s", exc, exc_info=True)
+        finally:
+            self.subscribers.remove(websocket)
+            logger.info("報告事件: 一個訂閱連線已中斷 (剩餘 %d 個)", len(self.subscribers))
+
+
+report_event_hub = ReportEventHub()
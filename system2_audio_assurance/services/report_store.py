@@ -0,0 +1,445 @@
+"""
+分析報告儲存模組 - 以 SQLite 逐筆保存分析報告
+
+每次建立或更新報告只寫入該筆資料 (UPSERT)，寫入在交易中完成，
+中途當機不會破壞其他報告；WAL 模式讓讀取不會被寫入阻塞。
+摘要欄位 (狀態、分數、時間) 另外存成欄位並建立索引，供清理與查詢使用，
+完整報告則以 JSON 存放於 data 欄位。
+
+被刪除的報告會在 deleted_reports 表留下墓碑紀錄，讓儀表板的增量同步 (since=)
+也能得知哪些報告已被移除；墓碑保留 REPORT_SYNC_TOMBSTONE_DAYS 天，
+更早的 since 會要求儀表板重新載入全部摘要。
+
+首次啟動時若存在舊版的 reports.json，會自動匯入並將原檔更名保留。
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from config.settings import settings
+from models.call_models import (
+    AnalysisReport,
+    AnalysisStatus,
+    ReportSummary,
+    ReportSummaryPage,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value else None
+
+
+def _datetime(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value is not None else None
+
+
+# 摘要欄位的查詢順序，需與 _summary_from_row 一致
+SUMMARY_COLUMNS = (
+    "report_id, call_session_id, status, accuracy_score, "
+    "created_at, completed_at, updated_at"
+)
+
+
+# 增量同步時往前多取的秒數：updated_at 在寫入前就已決定，
+# 較早取得時間戳的寫入可能較晚才提交，重疊區間避免漏掉這類更新 (重複的項目由前端覆蓋)
+SYNC_OVERLAP_SECONDS = 5.0
+
+
+def encode_cursor(created_at: float, report_id: str) -> str:
+    """將 (created_at, report_id) 編碼為不透明的分頁游標。"""
+    return base64.urlsafe_b64encode(f"{created_at!r}|{report_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """解析分頁游標，格式錯誤時拋出 ValueError。"""
+    # binascii.Error 與 UnicodeDecodeError 皆為 ValueError 的子類別
+    created_at, report_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    return float(created_at), report_id
+
+
+def _summary_from_row(row: tuple) -> ReportSummary:
+    report_id, session_id, status, score, created_at, completed_at, updated_at = row
+    return ReportSummary(
+        report_id=report_id,
+        call_session_id=session_id,
+        status=status,
+        accuracy_score=score,
+        created_at=_datetime(created_at),
+        completed_at=_datetime(completed_at),
+        updated_at=_datetime(updated_at),
+    )
+
+
+class ReportStore:
+    """SQLite 實作的報告儲存，資料庫操作在執行緒中進行以免阻塞事件迴圈"""
+
+    def __init__(self, db_path: Path, legacy_json_path: Optional[Path] = None):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reports (
+                    report_id TEXT PRIMARY KEY,
+                    call_session_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    accuracy_score REAL,
+                    created_at REAL NOT NULL,
+                    completed_at REAL,
+                    updated_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_updated_at ON reports (updated_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reports_session ON reports (call_session_id)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS deleted_reports (
+                    report_id TEXT PRIMARY KEY,
+                    deleted_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_deleted_reports_deleted_at "
+                "ON deleted_reports (deleted_at)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._migrate_legacy_json(conn)
+        return self._conn
+
+    @staticmethod
+    def _row_values(report: AnalysisReport, updated_at: float) -> tuple:
+        score = report.llm_analysis.accuracy_score if report.llm_analysis else None
+        return (
+            report.report_id,
+            report.call_session_id,
+            AnalysisStatus(report.status).value,
+            score,
+            _timestamp(report.created_at),
+            _timestamp(report.completed_at),
+            updated_at,
+            report.model_dump_json(),
+        )
+
+    def _upsert_rows(self, conn: sqlite3.Connection, rows: List[tuple]):
+        conn.executemany(
+            """
+            INSERT INTO reports (
+                report_id, call_session_id, status, accuracy_score,
+                created_at, completed_at, updated_at, data
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(report_id) DO UPDATE SET
+                call_session_id = excluded.call_session_id,
+                status = excluded.status,
+                accuracy_score = excluded.accuracy_score,
+                created_at = excluded.created_at,
+                completed_at = excluded.completed_at,
+                updated_at = excluded.updated_at,
+                data = excluded.data
+            """,
+            rows,
+        )
+
+    def _migrate_legacy_json(self, conn: sqlite3.Connection):
+        """將舊版 reports.json 匯入資料庫 (僅在資料表為空時執行一次)。"""
+        path = self.legacy_json_path
+        if path is None or not path.exists():
+            return
+        (count,) = conn.execute("SELECT COUNT(*) FROM reports").fetchone()
+        if count:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            now = time.time()
+            rows = [
+                self._row_values(AnalysisReport(**report_data), now)
+                for report_data in data.values()
+            ]
+            with conn:
+                self._upsert_rows(conn, rows)
+            path.rename(path.with_suffix(path.suffix + ".migrated"))
+            logger.info("已將 %d 筆報告從 %s 匯入資料庫", len(rows), path.name)
+        except Exception as e:
+            logger.error("匯入舊版報告檔案 %s 失敗: %s", path, e)
+
+    def _upsert(self, row: tuple):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._upsert_rows(conn, [row])
+
+    def _load_all(self) -> List[AnalysisReport]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT data FROM reports ORDER BY created_at"
+            ).fetchall()
+        return [AnalysisReport.model_validate_json(data) for (data,) in rows]
+
+    def _load_summaries(self) -> List[ReportSummary]:
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM reports ORDER BY created_at"
+            ).fetchall()
+        return [_summary_from_row(row) for row in rows]
+
+    def _get(self, report_id: str) -> Optional[AnalysisReport]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT data FROM reports WHERE report_id = ?", (report_id,)
+            ).fetchone()
+        return AnalysisReport.model_validate_json(row[0]) if row else None
+
+    def _delete_older_than(
+        self, cutoff: datetime, limit: Optional[int]
+    ) -> Tuple[List[str], int]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                # 依 created_at 索引由舊到新取出一批；data 為 TEXT，轉為 BLOB 才能以位元組計算大小
+                rows = conn.execute(
+                    "SELECT report_id, LENGTH(CAST(data AS BLOB)) FROM reports "
+                    "WHERE created_at < ? ORDER BY created_at LIMIT ?",
+                    (cutoff.timestamp(), -1 if limit is None else limit),
+                ).fetchall()
+                report_ids = [(report_id,) for report_id, _ in rows]
+                conn.executemany("DELETE FROM reports WHERE report_id = ?", report_ids)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO deleted_reports (report_id, deleted_at) "
+                    "VALUES (?, ?)",
+                    [(report_id, now) for (report_id,) in report_ids],
+                )
+        return [report_id for report_id, _ in rows], sum(size for _, size in rows)
+
+    def _prune_tombstones(self, cutoff: float) -> int:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(
+                    "DELETE FROM deleted_reports WHERE deleted_at < ?", (cutoff,)
+                ).rowcount
+
+    def _revision(self) -> str:
+        with self._lock:
+            conn = self._connect()
+            max_updated, count = conn.execute(
+                "SELECT MAX(updated_at), COUNT(*) FROM reports"
+            ).fetchone()
+            (max_deleted,) = conn.execute(
+                "SELECT MAX(deleted_at) FROM deleted_reports"
+            ).fetchone()
+        return f"{max_updated or 0!r}/{count}/{max_deleted or 0!r}"
+
+    @staticmethod
+    def _filter_clause(
+        status: Optional[AnalysisStatus],
+        min_score: Optional[float],
+        max_score: Optional[float],
+        created_from: Optional[datetime],
+        created_to: Optional[datetime],
+    ) -> Tuple[List[str], List]:
+        conditions: List[str] = []
+        params: List = []
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(AnalysisStatus(status).value)
+        if min_score is not None:
+            conditions.append("accuracy_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            conditions.append("accuracy_score <= ?")
+            params.append(max_score)
+        if created_from is not None:
+            conditions.append("created_at >= ?")
+            params.append(created_from.timestamp())
+        if created_to is not None:
+            conditions.append("created_at < ?")
+            params.append(created_to.timestamp())
+        return conditions, params
+
+    def _query_summaries(
+        self,
+        conditions: List[str],
+        params: List,
+        cursor: Optional[str],
+        since: Optional[float],
+        limit: int,
+    ) -> ReportSummaryPage:
+        filter_conditions, filter_params = conditions, params
+        conditions = list(conditions)
+        params = list(params)
+        deleted: List[str] = []
+        tombstone_days = settings.REPORT_SYNC_TOMBSTONE_DAYS
+        if (
+            since is not None
+            and tombstone_days > 0
+            and since < time.time() - tombstone_days * 86400
+        ):
+            # 這段期間的墓碑可能已被清除，無法保證回傳所有刪除，改由前端重新載入
+            return ReportSummaryPage(sync_token=since, resync_required=True)
+        with self._lock:
+            conn = self._connect()
+            (sync_token,) = conn.execute(
+                "SELECT MAX(ts) FROM ("
+                "SELECT MAX(updated_at) AS ts FROM reports "
+                "UNION ALL SELECT MAX(deleted_at) FROM deleted_reports)"
+            ).fetchone()
+            if since is not None:
+                # 增量同步：回傳 since 之後有變動的報告 (不分頁) 與被刪除的報告ID
+                floor = since - SYNC_OVERLAP_SECONDS
+                conditions.append("updated_at > ?")
+                params.append(floor)
+                order = "updated_at"
+                limit_clause = ""
+                deleted = [
+                    report_id
+                    for (report_id,) in conn.execute(
+                        "SELECT report_id FROM deleted_reports WHERE deleted_at > ?",
+                        (floor,),
+                    )
+                ]
+                if filter_conditions:
+                    # 有篩選條件時，變動後不再符合條件的報告對前端而言等同被移除
+                    # (COALESCE 讓分數為 NULL 的報告也視為不符合)
+                    deleted.extend(
+                        report_id
+                        for (report_id,) in conn.execute(
+                            "SELECT report_id FROM reports WHERE updated_at > ? "
+                            f"AND NOT COALESCE({' AND '.join(filter_conditions)}, 0)",
+                            [floor, *filter_params],
+                        )
+                    )
+            else:
+                # 游標分頁：依建立時間由新到舊，以 (created_at, report_id) 作為 keyset
+                if cursor is not None:
+                    cursor_created_at, cursor_report_id = decode_cursor(cursor)
+                    conditions.append("(created_at, report_id) < (?, ?)")
+                    params.extend([cursor_created_at, cursor_report_id])
+                order = "created_at DESC, report_id DESC"
+                limit_clause = " LIMIT ?"
+                params.append(limit + 1)
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM reports{where} ORDER BY {order}{limit_clause}",
+                params,
+            ).fetchall()
+
+        next_cursor = None
+        if since is None and len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[4], last[0])
+        return ReportSummaryPage(
+            items=[_summary_from_row(row) for row in rows],
+            next_cursor=next_cursor,
+            deleted=deleted,
+            sync_token=sync_token or 0.0,
+        )
+
+    async def upsert(self, report: AnalysisReport) -> ReportSummary:
+        """新增或更新單一報告，回傳寫入後的摘要。"""
+        # 先在事件迴圈中序列化，避免背景執行緒讀到分析流程正在修改的報告
+        row = self._row_values(report, time.time())
+        await asyncio.to_thread(self._upsert, row)
+        return _summary_from_row(row[:7])
+
+    async def load_all(self) -> List[AnalysisReport]:
+        """依建立時間讀取所有完整報告。"""
+        return await asyncio.to_thread(self._load_all)
+
+    def load_summaries(self) -> List[ReportSummary]:
+        """依建立時間讀取所有報告的摘要欄位 (不解析完整報告，啟動時同步呼叫)。"""
+        return self._load_summaries()
+
+    async def get(self, report_id: str) -> Optional[AnalysisReport]:
+        """依 ID 讀取單一報告。"""
+        return await asyncio.to_thread(self._get, report_id)
+
+    async def delete_older_than(
+        self, cutoff: datetime, limit: Optional[int] = None
+    ) -> Tuple[List[str], int]:
+        """
+        以 created_at 索引刪除早於 cutoff 的報告 (最多 limit 筆，由舊到新)。
+
+        Returns:
+            Tuple[List[str], int]: 被刪除的報告 ID，以及釋放的報告資料位元組數。
+        """
+        return await asyncio.to_thread(self._delete_older_than, cutoff, limit)
+
+    async def prune_tombstones(self, cutoff: datetime) -> int:
+        """清除 cutoff 之前的刪除墓碑，回傳清除筆數。"""
+        return await asyncio.to_thread(self._prune_tombstones, cutoff.timestamp())
+
+    async def revision(self) -> str:
+        """目前資料版本 (最後更新時間、報告數與最後刪除時間)，任何寫入或刪除都會改變它。"""
+        return await asyncio.to_thread(self._revision)
+
+    async def query_summaries(
+        self,
+        status: Optional[AnalysisStatus] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 50,
+    ) -> ReportSummaryPage:
+        """
+        查詢報告摘要。
+
+        未指定 since 時依建立時間由新到舊分頁 (cursor 為上一頁的 next_cursor)；
+        指定 since (上次回應的 sync_token) 時改為增量同步，回傳之後有變動的報告與被刪除的報告ID；
+        有篩選條件時，變動後不再符合條件的報告也列在被刪除的報告ID中。
+        since 早於墓碑保留期限時只回傳 resync_required。
+        篩選條件在兩種模式下都適用。游標格式錯誤時拋出 ValueError。
+        """
+        conditions, params = self._filter_clause(
+            status, min_score, max_score, created_from, created_to
+        )
+        if cursor is not None:
+            decode_cursor(cursor)
+        return await asyncio.to_thread(
+            self._query_summaries, conditions, params, cursor, since, limit
+        )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+report_store = ReportStore(
+    db_path=settings.STORAGE_PATH / "reports.sqlite3",
+    legacy_json_path=settings.STORAGE_PATH / "reports.json",
+)
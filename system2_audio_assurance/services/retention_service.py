@@ -0,0 +1,187 @@
+"""
+資料保留服務 - 定期依保留期限清理分析報告與歸檔檔案
+
+每種資料有各自的保留天數 (設為 0 表示永久保留)：
+分析報告 (含檢索索引)、監控側錄音檔、即時轉錄片段。
+清理時依建立時間索引分批取出過期資料，每批刪除後讓出事件迴圈，
+並統計每種資料刪除的數量與釋放的位元組數。
+每輪也會清除超過 REPORT_SYNC_TOMBSTONE_DAYS 的報告刪除墓碑。
+"""
+
+import asyncio
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+from services.analysis_service import analysis_service
+from services.artifact_index import (
+    KIND_MONITORING_AUDIO,
+    KIND_REALTIME_SEGMENTS,
+    artifact_index,
+)
+from services.report_store import report_store
+
+logger = logging.getLogger(__name__)
+
+KIND_REPORTS = "reports"
+
+
+@dataclass
+class RetentionPolicy:
+    """單一資料類型的保留期限"""
+
+    kind: str
+    retention_days: float
+
+
+def _unlink(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _delete_files(paths: List[str]) -> List[str]:
+    """刪除檔案並回傳已不存在的路徑 (刪除失敗的保留在索引中，下次再試)。"""
+    removed = []
+    for path_str in paths:
+        path = Path(path_str)
+        try:
+            if path.exists():
+                _unlink(path)
+            removed.append(path_str)
+        except OSError as e:
+            logger.warning("資料保留: 刪除 %s 失敗: %s", path, e)
+    return removed
+
+
+class RetentionService:
+    """依保留政策定期清理過期資料"""
+
+    def __init__(self):
+        self.policies = [
+            RetentionPolicy(KIND_REPORTS, settings.RETENTION_REPORT_DAYS),
+            RetentionPolicy(KIND_MONITORING_AUDIO, settings.RETENTION_MONITORING_AUDIO_DAYS),
+            RetentionPolicy(KIND_REALTIME_SEGMENTS, settings.RETENTION_REALTIME_SEGMENT_DAYS),
+        ]
+        self.batch_size = settings.RETENTION_BATCH_SIZE
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+
+    def adopt_existing_files(self):
+        """首次啟用時登錄既有的監控音檔與即時片段檔 (以修改時間作為建立時間)。"""
+        audio_files = (p for p in settings.AUDIO_PATH.glob("*") if p.is_file())
+        segment_files = (settings.STORAGE_PATH / "realtime_segments").glob("*.jsonl")
+        for kind, paths in (
+            (KIND_MONITORING_AUDIO, audio_files),
+            (KIND_REALTIME_SEGMENTS, segment_files),
+        ):
+            adopted = artifact_index.adopt(kind, paths)
+            if adopted:
+                logger.info("資料保留: 已登錄 %d 個既有檔案 (%s)", adopted, kind)
+
+    async def _purge_reports(self, cutoff: datetime) -> Dict[str, int]:
+        deleted = reclaimed = 0
+        while True:
+            count, reclaimed_bytes = await analysis_service.delete_reports_older_than(
+                cutoff, limit=self.batch_size
+            )
+            deleted += count
+            reclaimed += reclaimed_bytes
+            if count < self.batch_size:
+                return {"deleted": deleted, "reclaimed_bytes": reclaimed}
+            await asyncio.sleep(0)
+
+    async def _purge_files(self, kind: str, cutoff: datetime) -> Dict[str, int]:
+        deleted = reclaimed = 0
+        while True:
+            batch = await asyncio.to_thread(
+                artifact_index.oldest_before, kind, cutoff.timestamp(), self.batch_size
+            )
+            if not batch:
+                break
+            sizes = dict(batch)
+            removed = await asyncio.to_thread(_delete_files, list(sizes))
+            await asyncio.to_thread(artifact_index.remove, removed)
+            deleted += len(removed)
+            reclaimed += sum(sizes[path] for path in removed)
+            if len(removed) < len(batch) or len(batch) < self.batch_size:
+                # 有檔案刪除失敗時停止本輪，避免重複取到同一批
+                break
+            await asyncio.sleep(0)
+        return {"deleted": deleted, "reclaimed_bytes": reclaimed}
+
+    async def run_once(self) -> Dict[str, Any]:
+        """執行一輪清理，回傳每種資料刪除的數量與釋放的位元組數。"""
+        async with self._run_lock:
+            started = time.monotonic()
+            now = datetime.now()
+            results: Dict[str, Dict[str, int]] = {}
+            for policy in self.policies:
+                if policy.retention_days <= 0:
+                    continue
+                cutoff = now - timedelta(days=policy.retention_days)
+                try:
+                    if policy.kind == KIND_REPORTS:
+                        results[policy.kind] = await self._purge_reports(cutoff)
+                    else:
+                        results[policy.kind] = await self._purge_files(policy.kind, cutoff)
+                except Exception as e:
+                    logger.error("資料保留: 清理 %s 失敗: %s", policy.kind, e, exc_info=True)
+            pruned_tombstones = 0
+            if settings.REPORT_SYNC_TOMBSTONE_DAYS > 0:
+                try:
+                    pruned_tombstones = await report_store.prune_tombstones(
+                        now - timedelta(days=settings.REPORT_SYNC_TOMBSTONE_DAYS)
+                    )
+                except Exception as e:
+                    logger.error("資料保留: 清除報告刪除墓碑失敗: %s", e, exc_info=True)
+            self.last_run = {
+                "finished_at": datetime.now().isoformat(),
+                "duration_seconds": round(time.monotonic() - started, 3),
+                "results": results,
+                "pruned_tombstones": pruned_tombstones,
+                "reclaimed_bytes": sum(r["reclaimed_bytes"] for r in results.values()),
+            }
+            logger.info(
+                "資料保留: 清理完成，共釋放 %d bytes (%s)",
+                self.last_run["reclaimed_bytes"],
+                results,
+            )
+            return self.last_run
+
+    async def _loop(self, interval_seconds: float):
+        try:
+            await asyncio.to_thread(self.adopt_existing_files)
+        except Exception as e:
+            logger.error("資料保留: 登錄既有檔案失敗: %s", e)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("資料保留: 排程清理失敗: %s", e, exc_info=True)
+            await asyncio.sleep(interval_seconds)
+
+    def start(self):
+        """啟動定期清理 (RETENTION_INTERVAL_HOURS 設為 0 時停用)。"""
+        if settings.RETENTION_INTERVAL_HOURS <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop(settings.RETENTION_INTERVAL_HOURS * 3600))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+retention_service = RetentionService()
@@ -12,6 +12,7 @@ from typing import Dict, Optional, Any
 
 from config.settings import settings
 from models.call_models import AudioFile
+from services.artifact_index import KIND_MONITORING_AUDIO, artifact_index
 from utils.audio_utils import get_audio_duration
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,7 @@ class StorageService:
 
             # 複製檔案以完成歸檔
             shutil.copy2(source_path, permanent_path)
+            artifact_index.register(permanent_path, KIND_MONITORING_AUDIO)
 
             # 獲取新檔案的資訊
             duration = get_audio_duration(permanent_path)
@@ -0,0 +1,110 @@
+"""
+串流解碼模組 - 以常駐 FFmpeg 子行程將即時音訊串流逐段解碼為 PCM
+
+話務端以 MediaRecorder 送出的 webm 串流只有第一個區塊帶有容器標頭，無法逐塊獨立解碼。
+每個房間保持一個 FFmpeg 子行程：音訊區塊依序寫入 stdin，
+stdout 持續讀出單聲道 int16 PCM 交給回呼函式 (例如語音活動偵測)。
+"""
+
+import asyncio
+import logging
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 每次從 stdout 讀取的最大位元組數
+READ_CHUNK_BYTES = 8192
+
+
+class StreamingDecoder:
+    """單一串流的常駐解碼器，PCM 依解碼順序交給 on_pcm 回呼"""
+
+    def __init__(
+        self,
+        name: str,
+        sample_rate: int,
+        on_pcm: Callable[[np.ndarray], None],
+    ):
+        self.name = name
+        self.sample_rate = sample_rate
+        self.on_pcm = on_pcm
+        self.failed = False
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        """啟動 FFmpeg 子行程，找不到 FFmpeg 時回傳 False。"""
+        command = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel", "error",
+            "-fflags", "nobuffer",
+            "-i", "pipe:0",
+            "-ac", "1",
+            "-ar", str(self.sample_rate),
+            "-f", "s16le",
+            "pipe:1",
+        ]
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+        except (FileNotFoundError, PermissionError) as e:
+            logger.warning("串流解碼: 無法啟動 FFmpeg (%s): %s", self.name, e)
+            self.failed = True
+            return False
+        self._reader = asyncio.create_task(self._read_loop())
+        return True
+
+    async def _read_loop(self):
+        carry = b""
+        stdout = self._process.stdout
+        try:
+            while True:
+                data = await stdout.read(READ_CHUNK_BYTES)
+                if not data:
+                    break
+                data = carry + data
+                # int16 樣本為 2 bytes，奇數長度的尾端留到下一次
+                usable = len(data) - len(data) % 2
+                carry = data[usable:]
+                if usable:
+                    self.on_pcm(np.frombuffer(data[:usable], dtype=np.int16))
+        except Exception as e:
+            logger.error("串流解碼: 讀取 %s 的 PCM 失敗: %s", self.name, e, exc_info=True)
+            self.failed = True
+
+    async def feed(self, data: bytes):
+        """寫入下一段音訊區塊，子行程已結束時標記為失敗。"""
+        if self.failed or self._process is None:
+            return
+        try:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            logger.warning("串流解碼: %s 的 FFmpeg 已結束: %s", self.name, e)
+            self.failed = True
+
+    async def close(self, timeout: float = 5.0):
+        """結束輸入並等待剩餘 PCM 解碼完成。"""
+        if self._process is None:
+            return
+        try:
+            if not self._process.stdin.is_closing():
+                self._process.stdin.close()
+            if self._reader is not None:
+                await asyncio.wait_for(self._reader, timeout)
+            await asyncio.wait_for(self._process.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("串流解碼: %s 的 FFmpeg 未在時限內結束，強制終止", self.name)
+            self._process.kill()
+            await self._process.wait()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self._process = None
@@ -0,0 +1,299 @@
+"""
+STT 後端模組 - 將語音轉文字的實際引擎與 STTService 解耦
+
+目前支援兩種後端，依 `settings.STT_MODEL` 選擇：
+- OpenAI API (例如 `whisper-1`)：透過網路上傳音檔轉錄。
+- 本地離線引擎 (例如 `local:small`)：使用 faster-whisper (CTranslate2) 在 CPU 上轉錄，
+  模型於常駐的 worker 行程池中載入一次並保持熱啟動，適用於無法連外的環境。
+"""
+
+import asyncio
+import importlib.util
+import io
+import logging
+import mimetypes
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from config.settings import settings
+from services.openai_gateway import get_openai_gateway
+from utils.audio_utils import estimate_audio_seconds
+from utils.rate_limit import AdaptiveConcurrencyLimiter, RequestPriority
+
+logger = logging.getLogger(__name__)
+
+# `STT_MODEL` 以此前綴開頭時使用本地引擎，例如 "local:small"、"local:large-v3"
+LOCAL_MODEL_PREFIX = "local:"
+
+# 上傳給 API 的檔案格式: (檔名, 內容, MIME 類型)
+UploadFile = Tuple[str, bytes, str]
+AudioSource = Union[Path, UploadFile]
+# 估算音訊長度時，各壓縮格式假設的位元率 (bps)，未列出者使用預設值
+ASSUMED_BITRATES = {"audio/flac": 140000}
+
+# 轉錄片段: (開始秒數, 結束秒數, 文字)，時間以送出的音訊為準
+RawSegment = Tuple[float, float, str]
+
+
+@dataclass
+class BackendTranscript:
+    """後端回傳的轉錄結果"""
+
+    text: str
+    segments: List[RawSegment] = field(default_factory=list)
+
+
+class STTBackend(ABC):
+    """語音轉文字後端的共用介面"""
+
+    name: str = "base"
+    # 單次請求可接受的最大檔案大小，None 表示沒有限制
+    max_upload_bytes: Optional[int] = None
+
+    @abstractmethod
+    async def transcribe(
+        self,
+        audio: AudioSource,
+        prompt: str,
+        priority: RequestPriority = RequestPriority.BATCH,
+        timestamps: bool = False,
+    ) -> BackendTranscript:
+        """
+        轉錄音訊 (檔案路徑或記憶體中的音訊內容)。
+
+        timestamps=True 時一併回傳帶時間戳記的片段。
+        """
+
+    @abstractmethod
+    async def test_connection(self) -> bool:
+        """確認後端可正常使用。"""
+
+    @abstractmethod
+    def queue_stats(self) -> Dict[str, Any]:
+        """回傳各優先等級的排隊狀態與等待時間統計。"""
+
+    def warm_up(self) -> None:
+        """預先載入資源，預設不做任何事。"""
+
+    def shutdown(self) -> None:
+        """釋放後端持有的資源，預設不做任何事。"""
+
+
+class OpenAISTTBackend(STTBackend):
+    """OpenAI Whisper API 後端，所有請求經由共用的 OpenAI 客戶端限流"""
+
+    name = "openai"
+    max_upload_bytes = 25 * 1024 * 1024
+
+    def __init__(self, model: str):
+        self.model = model
+        self.gateway = get_openai_gateway()
+
+    async def transcribe(
+        self,
+        audio: AudioSource,
+        prompt: str,
+        priority: RequestPriority = RequestPriority.BATCH,
+        timestamps: bool = False,
+    ) -> BackendTranscript:
+        if isinstance(audio, Path):
+            # 讀入記憶體再上傳，重試時才能重新送出完整內容
+            mime_type = mimetypes.guess_type(audio.name)[0] or "application/octet-stream"
+            audio = (audio.name, audio.read_bytes(), mime_type)
+        response = await self.gateway.transcribe(
+            audio_seconds=estimate_audio_seconds(
+                audio[1], ASSUMED_BITRATES.get(audio[2], 32000)
+            ),
+            priority=priority,
+            model=self.model,
+            file=audio,
+            language="zh",
+            prompt=prompt,
+            response_format="verbose_json" if timestamps else "json",
+            temperature=0.0,
+        )
+        return BackendTranscript(
+            text=response.text.strip(), segments=_segments_from_response(response)
+        )
+
+    async def test_connection(self) -> bool:
+        return self.model in await self.gateway.list_models()
+
+    def queue_stats(self) -> Dict[str, Any]:
+        return self.gateway.stt.snapshot()
+
+
+def _segments_from_response(response: Any) -> List[RawSegment]:
+    """從 verbose_json 回應中取出片段 (SDK 未定義此欄位，可能是 dict 或物件)。"""
+    segments: List[RawSegment] = []
+    for segment in getattr(response, "segments", None) or []:
+        if isinstance(segment, dict):
+            start, end, text = segment.get("start"), segment.get("end"), segment.get("text")
+        else:
+            start = getattr(segment, "start", None)
+            end = getattr(segment, "end", None)
+            text = getattr(segment, "text", None)
+        if start is None or end is None:
+            continue
+        segments.append((float(start), float(end), str(text or "").strip()))
+    return segments
+
+
+# --- 本地引擎：以下函式在 worker 行程中執行 ---
+
+_worker_model = None
+
+
+def _init_local_worker(
+    model_name: str,
+    device: str,
+    compute_type: str,
+    cpu_threads: int,
+    download_root: Optional[str],
+) -> None:
+    """worker 行程初始化：載入一次模型並常駐於行程中。"""
+    global _worker_model
+    from faster_whisper import WhisperModel
+
+    _worker_model = WhisperModel(
+        model_name,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        download_root=download_root,
+    )
+
+
+def _local_warm_up() -> bool:
+    """確認 worker 已完成模型載入。"""
+    return _worker_model is not None
+
+
+def _local_transcribe(
+    source: Union[str, bytes], prompt: str
+) -> Tuple[str, List[RawSegment]]:
+    """在 worker 行程中轉錄單一音訊，source 可為檔案路徑或音訊內容。"""
+    audio = io.BytesIO(source) if isinstance(source, bytes) else source
+    segments, _ = _worker_model.transcribe(
+        audio,
+        language="zh",
+        initial_prompt=prompt,
+        temperature=0.0,
+        beam_size=5,
+    )
+    raw_segments: List[RawSegment] = [
+        (segment.start, segment.end, segment.text.strip()) for segment in segments
+    ]
+    return "".join(text for _, _, text in raw_segments).strip(), raw_segments
+
+
+class LocalWhisperBackend(STTBackend):
+    """faster-whisper (CTranslate2) 本地 CPU 後端，使用常駐行程池"""
+
+    name = "local"
+
+    def __init__(self, model_name: str):
+        if importlib.util.find_spec("faster_whisper") is None:
+            raise ValueError(
+                "本地 STT 需要安裝 faster-whisper 套件 (pip install faster-whisper)"
+            )
+        self.model = model_name
+        self.workers = max(1, settings.STT_LOCAL_WORKERS)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 行程池本身是先進先出，另以限制器依優先等級決定送入順序
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=self.workers,
+            maximum=self.workers,
+            reserved_interactive=min(
+                settings.STT_REALTIME_RESERVED_SLOTS, self.workers - 1
+            ),
+            interactive_slo=settings.STT_REALTIME_SLO_SECONDS,
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # 行程池延遲建立：spawn 出的子行程會重新匯入主模組，
+        # 若在匯入階段就建立行程池會造成遞迴啟動
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_local_worker,
+                initargs=(
+                    self.model,
+                    settings.STT_LOCAL_DEVICE,
+                    settings.STT_LOCAL_COMPUTE_TYPE,
+                    settings.STT_LOCAL_CPU_THREADS,
+                    settings.STT_LOCAL_MODEL_DIR or None,
+                ),
+            )
+            logger.info(
+                "本地 STT 行程池已建立 (模型: %s, workers: %d)", self.model, self.workers
+            )
+        return self._executor
+
+    def warm_up(self) -> None:
+        executor = self._get_executor()
+        futures: List[Future] = [
+            executor.submit(_local_warm_up) for _ in range(self.workers)
+        ]
+        for future in futures:
+            future.add_done_callback(self._log_warm_up_result)
+
+    @staticmethod
+    def _log_warm_up_result(future: Future) -> None:
+        if future.exception():
+            logger.error("本地 STT 模型載入失敗: %s", future.exception())
+        else:
+            logger.info("本地 STT worker 已完成模型載入")
+
+    async def transcribe(
+        self,
+        audio: AudioSource,
+        prompt: str,
+        priority: RequestPriority = RequestPriority.BATCH,
+        timestamps: bool = False,
+    ) -> BackendTranscript:
+        source = str(audio) if isinstance(audio, Path) else audio[1]
+        loop = asyncio.get_running_loop()
+        async with self.limiter.slot(priority):
+            text, segments = await loop.run_in_executor(
+                self._get_executor(), _local_transcribe, source, prompt
+            )
+        return BackendTranscript(text=text, segments=segments)
+
+    async def test_connection(self) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), _local_warm_up)
+
+    def queue_stats(self) -> Dict[str, Any]:
+        return self.limiter.snapshot()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def create_stt_backend(model: str) -> STTBackend:
+    """依模型名稱建立對應的 STT 後端。"""
+    if model.startswith(LOCAL_MODEL_PREFIX):
+        return LocalWhisperBackend(model[len(LOCAL_MODEL_PREFIX):])
+    return OpenAISTTBackend(model)
+
+
+_default_backend: Optional[STTBackend] = None
+
+
+def get_stt_backend() -> STTBackend:
+    """取得依 `settings.STT_MODEL` 建立的共用後端 (所有 STTService 共用同一個實例)。"""
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = create_stt_backend(settings.STT_MODEL)
+        logger.info(
+            "STT 後端: %s (模型: %s)", _default_backend.name, settings.STT_MODEL
+        )
+    return _default_backend
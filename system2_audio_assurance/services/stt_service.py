@@ -1,38 +1,65 @@
 """
-STT 服務模組 - 使用 OpenAI STT
+STT 服務模組 - 語音轉文字，實際引擎由 STT 後端 (OpenAI API 或本地模型) 提供
 """
 
 import logging
 from pathlib import Path
 from typing import Tuple
-from openai import AsyncOpenAI, APIError
+
+import numpy as np
+from openai import APIError
 
 from config.settings import settings
+from models.call_models import SttResult, TranscriptSegment
+from services.audio_preprocessor import audio_preprocessor
+from services.stt_backends import AudioSource, get_stt_backend
+from utils.rate_limit import RequestPriority
+from utils.vad import TimeOffsetMap
 
 logger = logging.getLogger(__name__)
 
 
 class STTService:
-    """OpenAI STT 服務"""
+    """STT 服務"""
+
+    # 小於此大小 (bytes) 的音訊視為沒有有效內容，不送出轉錄
+    MIN_AUDIO_BYTES = 1024
+    # 短於此長度 (秒) 的 PCM 片段不送出轉錄
+    MIN_PCM_SECONDS = 0.3
 
     def __init__(self):
         """初始化 STT 服務"""
         try:
-            if not settings.OPENAI_API_KEY:
-                raise ValueError("OpenAI API Key 未設定")
-
-            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+            self.backend = get_stt_backend()
             self.model = settings.STT_MODEL
             self.prompt = settings.STT_PROMPT
 
-            logger.info("STT 服務 (非同步) 初始化成功")
+            logger.info("STT 服務 (非同步) 初始化成功，後端: %s", self.backend.name)
 
         except Exception as e:
             logger.error("STT 服務初始化失敗: %s", e)
             raise
 
-    async def transcribe_audio(self, audio_file_path: str) -> Tuple[str, float]:
-        """使用 OpenAI STT 轉錄音檔 (非同步版本)"""
+    async def transcribe_audio(
+        self,
+        audio_file_path: str,
+        priority: RequestPriority = RequestPriority.BATCH,
+    ) -> Tuple[str, float]:
+        """轉錄音檔 (非同步版本)，預設以批次優先等級排隊"""
+        result = await self.transcribe_audio_result(audio_file_path, priority)
+        return result.transcript, result.confidence
+
+    async def transcribe_audio_result(
+        self,
+        audio_file_path: str,
+        priority: RequestPriority = RequestPriority.BATCH,
+    ) -> SttResult:
+        """
+        轉錄音檔並回傳完整結果，片段時間戳記以原始錄音的時間軸表示。
+
+        上傳前會先移除長段靜音並重新編碼為 `STT_UPLOAD_FORMAT`，
+        再依對照表將時間戳記換算回原始錄音。
+        """
         try:
             audio_path = Path(audio_file_path)
 
@@ -40,37 +67,41 @@ class STTService:
                 raise FileNotFoundError(f"音檔不存在: {audio_file_path}")
 
             file_size = audio_path.stat().st_size
-            max_size = 25 * 1024 * 1024
 
-            if file_size > max_size:
-                raise ValueError(
-                    f"檔案過大: {file_size / 1024 / 1024:.1f}MB，超過 25MB 限制"
-                )
-
-            if file_size < 1024:
+            if file_size < self.MIN_AUDIO_BYTES:
                 # 檔案過小可能為空，直接回傳空字串，避免 API 報錯
                 logger.warning("檔案 %s 過小，可能沒有有效的音檔內容", audio_path.name)
-                return "", 0.0
-
-            logger.info("開始轉錄音檔: %s (%.1f KB)", audio_path.name, file_size / 1024)
-
-            with open(audio_file_path, "rb") as audio_file:
-                response = await self.client.audio.transcriptions.create(
-                    model=self.model,
-                    file=audio_file,
-                    language="zh",
-                    prompt=self.prompt,
-                    response_format="json",
-                    temperature=0.0,
+                return SttResult(transcript="", confidence=0.0)
+
+            upload: AudioSource = audio_path
+            upload_size = file_size
+            upload_format = audio_path.suffix.lstrip(".")
+            offset_map = TimeOffsetMap()
+            try:
+                prepared = await audio_preprocessor.prepare_file(audio_path)
+                upload, offset_map = prepared.upload, prepared.offset_map
+                upload_size = len(prepared.upload[1])
+                upload_format = prepared.upload_format
+            except Exception as e:
+                logger.warning("音檔 %s 前處理失敗，改為上傳原始檔: %s", audio_path.name, e)
+
+            max_size = self.backend.max_upload_bytes
+            if max_size and upload_size > max_size:
+                raise ValueError(
+                    f"檔案過大: {upload_size / 1024 / 1024:.1f}MB，"
+                    f"超過 {max_size / 1024 / 1024:.0f}MB 限制"
                 )
 
-            transcript = response.text.strip()
+            logger.info("開始轉錄音檔: %s (%.1f KB)", audio_path.name, upload_size / 1024)
+
+            result = await self.backend.transcribe(
+                upload, self.prompt, priority, timestamps=True
+            )
+            transcript = result.text
 
             if not transcript:
                 logger.warning("無法識別語音內容，檔案 %s 可能損壞或不包含語音", audio_path.name)
-                return "", 0.0
-            
-            confidence = 1.0
+                return SttResult(transcript="", confidence=0.0)
 
             logger.info(
                 "轉錄成功: %s%s",
@@ -78,7 +109,21 @@ class STTService:
                 "..." if len(transcript) > 50 else "",
             )
 
-            return transcript, confidence
+            return SttResult(
+                transcript=transcript,
+                confidence=1.0,
+                segments=[
+                    TranscriptSegment(
+                        start=offset_map.to_original(start),
+                        end=offset_map.to_original(end, is_end=True),
+                        text=text,
+                    )
+                    for start, end, text in result.segments
+                ],
+                trimmed_silence_seconds=offset_map.removed_seconds,
+                upload_format=upload_format,
+                upload_size_bytes=upload_size,
+            )
 
         except APIError as e:
             logger.error("OpenAI API 錯誤: %s", e)
@@ -90,43 +135,70 @@ class STTService:
             logger.error("STT 服務錯誤: %s", e)
             raise RuntimeError(f"語音轉錄失敗: {e}") from e
 
-    async def transcribe_audio_bytes(self, audio_bytes: bytes) -> Tuple[str, float]:
+    async def transcribe_audio_bytes(
+        self,
+        audio_bytes: bytes,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> Tuple[str, float]:
         """
-        OpenAI API 支援直接傳遞 (檔名, bytes) 的元組。
+        轉錄記憶體中的音訊內容，以 (檔名, bytes, MIME) 的元組交給後端。
+        預設為即時優先等級，會優先於排隊中的批次轉錄。
         """
-        if not audio_bytes or len(audio_bytes) < 1024:
+        if not audio_bytes or len(audio_bytes) < self.MIN_AUDIO_BYTES:
             # 忽略過小的音訊塊，直接回傳空結果
             return "", 0.0
         try:
-            # 將 bytes 包裝成 OpenAI API 需要的格式
+            # 將 bytes 包裝成後端需要的 (檔名, bytes, MIME) 格式
             audio_file = ("audio.webm", audio_bytes, "audio/webm")
-
-            response = await self.client.audio.transcriptions.create(
-                model=self.model,
-                file=audio_file,
-                language="zh",
-                prompt=self.prompt,
-                response_format="json",
-                temperature=0.0,
-            )
-            transcript = response.text.strip()
-            return transcript, 1.0
+            try:
+                encoded = await audio_preprocessor.prepare_stream_bytes(audio_bytes)
+                if encoded:
+                    audio_file = encoded
+            except Exception as e:
+                logger.warning("串流音訊重新編碼失敗，改為上傳原始內容: %s", e)
+
+            result = await self.backend.transcribe(audio_file, self.prompt, priority)
+            return result.text, 1.0
         except Exception as e:
             # 在即時串流中，轉錄失敗不應中斷整個服務，只記錄錯誤
             logger.error(f"從 bytes 轉錄音訊時發生錯誤: {e}")
             return "", 0.0
 
+    async def transcribe_pcm(
+        self,
+        samples: np.ndarray,
+        sample_rate: int,
+        name: str = "segment",
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+    ) -> Tuple[str, float]:
+        """
+        轉錄即時串流切出的 PCM 片段，編碼為 `STT_UPLOAD_FORMAT` 的獨立音檔後上傳。
+        預設為即時優先等級。
+        """
+        if len(samples) < self.MIN_PCM_SECONDS * sample_rate:
+            return "", 0.0
+        try:
+            audio_file = await audio_preprocessor.encode_pcm_segment(samples, sample_rate, name)
+            result = await self.backend.transcribe(audio_file, self.prompt, priority)
+            return result.text, 1.0
+        except Exception as e:
+            # 在即時串流中，轉錄失敗不應中斷整個服務，只記錄錯誤
+            logger.error("轉錄 PCM 片段 %s 時發生錯誤: %s", name, e)
+            return "", 0.0
+
+    def get_queue_stats(self) -> dict:
+        """取得 STT 排隊狀態，包含即時與批次請求各自的等待時間。"""
+        return {"backend": self.backend.name, **self.backend.queue_stats()}
+
     async def test_connection(self) -> bool:
-        """測試 OpenAI STT 連接 (非同步版本)"""
+        """測試 STT 後端連接 (非同步版本)"""
         try:
-            logger.info("測試 OpenAI %s 連接...", self.model)
+            logger.info("測試 STT 後端 %s (%s) 連接...", self.backend.name, self.model)
 
-            models = await self.client.models.list()
-            available_models = [model.id for model in models.data]
-            model_available = self.model in available_models
+            model_available = await self.backend.test_connection()
 
             if model_available:
-                logger.info("OpenAI %s 連接測試成功", self.model)
+                logger.info("STT 後端 %s 連接測試成功", self.model)
                 return True
             else:
                 logger.warning("未找到 %s 模型", self.model)
@@ -0,0 +1,347 @@
+"""
+轉錄稿全文檢索模組 - 以 SQLite FTS5 倒排索引搜尋通話轉錄稿與差異說明
+
+每份報告完成時，把正式錄音與監控側錄的轉錄稿、以及 LLM 列出的主要差異各自建立一筆索引文件。
+中日韓文字沒有空白分詞，因此索引前先斷詞：連續的中日韓字元切成重疊的雙字 (bigram)
+並補上最後一個字，英數字以整個單字為一個詞，再以空白串接交給 FTS5 建立倒排索引；
+查詢字串以相同方式斷詞後組成片語查詢，依 FTS5 內建的 BM25 排序，並從原文擷取標示命中位置的片段。
+"""
+
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from models.call_models import AnalysisReport
+
+logger = logging.getLogger(__name__)
+
+FIELD_RECORDING = "recording"
+FIELD_MONITORING = "monitoring"
+FIELD_KEY_DIFFERENCES = "key_differences"
+FIELDS = (FIELD_RECORDING, FIELD_MONITORING, FIELD_KEY_DIFFERENCES)
+
+# 中日韓統一表意文字 (含擴充 A 與相容字)、日文假名與韓文音節
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_TERM_PATTERN = re.compile(f"[{_CJK}]+|[a-z0-9]+")
+_CJK_PATTERN = re.compile(f"[{_CJK}]")
+
+SNIPPET_CHARS = 80
+
+# 斷詞規則變動時需遞增，既有索引會被清除並於啟動時重新補建
+TOKENIZER_VERSION = 2
+
+
+def _normalize(text: str) -> Tuple[str, List[int]]:
+    """NFKC 正規化並轉小寫，同時回傳每個正規化字元對應的原文位置 (供擷取片段使用)。"""
+    chars: List[str] = []
+    positions: List[int] = []
+    for index, char in enumerate(text):
+        normalized = unicodedata.normalize("NFKC", char).lower()
+        chars.append(normalized)
+        positions.extend([index] * len(normalized))
+    return "".join(chars), positions
+
+
+def _terms(normalized: str) -> List[str]:
+    """將正規化後的文字切成詞：中日韓字元連續段與英數字單字。"""
+    return _TERM_PATTERN.findall(normalized)
+
+
+def _term_tokens(term: str) -> List[str]:
+    """中日韓字元段切成重疊的雙字，單一字元與英數字單字維持原樣。"""
+    if _CJK_PATTERN.match(term) and len(term) > 1:
+        return [term[i : i + 2] for i in range(len(term) - 1)]
+    return [term]
+
+
+def _index_term_tokens(term: str) -> List[str]:
+    """
+    索引用的詞：在雙字之後補上字元段的最後一個字。
+
+    單字查詢以前綴比對雙字，段落最後一個字不是任何雙字的開頭，需另外索引才查得到；
+    補在最後不影響多字查詢的片語相鄰關係。
+    """
+    tokens = _term_tokens(term)
+    if _CJK_PATTERN.match(term) and len(term) > 1:
+        tokens.append(term[-1])
+    return tokens
+
+
+def index_tokens(text: str) -> str:
+    """將文字轉為以空白分隔的索引詞 (交給 FTS5 的 unicode61 斷詞器)。"""
+    normalized, _ = _normalize(text)
+    return " ".join(
+        token for term in _terms(normalized) for token in _index_term_tokens(term)
+    )
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    將使用者的查詢字串轉為 FTS5 MATCH 語法，沒有可查詢的詞時回傳 None。
+
+    每個詞 (中日韓字元段或英數字單字) 轉為一個片語，所有片語需同時出現；
+    單一中日韓字元以前綴查詢，同時比對以該字開頭的雙字與字元段結尾的單字。
+    """
+    normalized, _ = _normalize(query)
+    phrases = []
+    for term in _terms(normalized):
+        if _CJK_PATTERN.match(term) and len(term) == 1:
+            phrases.append(f'"{term}"*')
+        else:
+            phrases.append('"' + " ".join(_term_tokens(term)) + '"')
+    return " AND ".join(phrases) if phrases else None
+
+
+def build_snippet(text: str, query: str, max_chars: int = SNIPPET_CHARS) -> Dict[str, Any]:
+    """
+    從原文擷取包含最多命中詞的片段。
+
+    Returns:
+        Dict: snippet 為片段文字，highlights 為命中詞在片段中的 [開始, 結束) 位置。
+    """
+    normalized, positions = _normalize(text)
+    terms = set(_terms(_normalize(query)[0]))
+    spans: List[Tuple[int, int]] = []
+    for term in terms:
+        start = normalized.find(term)
+        while start != -1:
+            end = start + len(term)
+            spans.append((positions[start], positions[end - 1] + 1))
+            start = normalized.find(term, end)
+    spans.sort()
+    if not spans:
+        return {"snippet": text[:max_chars], "highlights": []}
+
+    # 以每個命中位置為起點，取能涵蓋最多命中詞的視窗
+    best_start, best_count = spans[0][0], 0
+    for window_start, _ in spans:
+        window_end = window_start + max_chars
+        count = sum(1 for start, end in spans if start >= window_start and end <= window_end)
+        if count > best_count:
+            best_start, best_count = window_start, count
+    snippet_start = max(0, min(best_start - max_chars // 4, len(text) - max_chars))
+    snippet_end = snippet_start + max_chars
+    highlights = [
+        [start - snippet_start, end - snippet_start]
+        for start, end in spans
+        if start >= snippet_start and end <= snippet_end
+    ]
+    return {"snippet": text[snippet_start:snippet_end], "highlights": highlights}
+
+
+def _report_documents(report: AnalysisReport) -> List[Tuple[str, str]]:
+    documents = []
+    if report.recording_stt_result and report.recording_stt_result.transcript:
+        documents.append((FIELD_RECORDING, report.recording_stt_result.transcript))
+    if report.monitoring_stt_result and report.monitoring_stt_result.transcript:
+        documents.append((FIELD_MONITORING, report.monitoring_stt_result.transcript))
+    if report.llm_analysis and report.llm_analysis.key_differences:
+        documents.append(
+            (FIELD_KEY_DIFFERENCES, "\n".join(report.llm_analysis.key_differences))
+        )
+    return documents
+
+
+class TranscriptSearchIndex:
+    """SQLite FTS5 實作的轉錄稿檢索，資料庫操作在執行緒中進行以免阻塞事件迴圈"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        self.available = True
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version < TOKENIZER_VERSION:
+                # 舊版斷詞建立的索引無法以新規則查詢，清除後由啟動時的補建流程重建
+                conn.execute("DROP TABLE IF EXISTS transcript_index")
+                conn.execute("DROP TABLE IF EXISTS indexed_documents")
+                conn.execute(f"PRAGMA user_version = {TOKENIZER_VERSION}")
+            conn.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS transcript_index USING fts5(
+                    report_id UNINDEXED,
+                    call_session_id UNINDEXED,
+                    field UNINDEXED,
+                    text UNINDEXED,
+                    tokens,
+                    tokenize = 'unicode61'
+                )
+                """
+            )
+            # FTS5 的 UNINDEXED 欄位無法以索引查找，另存報告與索引文件 rowid 的對應供更新與刪除使用
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS indexed_documents (
+                    doc_rowid INTEGER PRIMARY KEY,
+                    report_id TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_indexed_documents_report "
+                "ON indexed_documents (report_id)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _delete_report(conn: sqlite3.Connection, report_id: str):
+        conn.execute(
+            "DELETE FROM transcript_index WHERE rowid IN "
+            "(SELECT doc_rowid FROM indexed_documents WHERE report_id = ?)",
+            (report_id,),
+        )
+        conn.execute("DELETE FROM indexed_documents WHERE report_id = ?", (report_id,))
+
+    def _index(self, report_id: str, call_session_id: str, documents: List[Tuple[str, str]]):
+        rows = [
+            (report_id, call_session_id, field, text, index_tokens(text))
+            for field, text in documents
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._delete_report(conn, report_id)
+                for row in rows:
+                    cursor = conn.execute(
+                        "INSERT INTO transcript_index "
+                        "(report_id, call_session_id, field, text, tokens) VALUES (?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    conn.execute(
+                        "INSERT INTO indexed_documents (doc_rowid, report_id) VALUES (?, ?)",
+                        (cursor.lastrowid, report_id),
+                    )
+
+    def _delete(self, report_ids: List[str]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for report_id in report_ids:
+                    self._delete_report(conn, report_id)
+
+    def _indexed_ids(self) -> set:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT DISTINCT report_id FROM indexed_documents"
+            ).fetchall()
+        return {report_id for (report_id,) in rows}
+
+    def _search(
+        self, match: str, fields: List[str], limit: int
+    ) -> List[Tuple[str, str, str, str, float]]:
+        placeholders = ", ".join("?" * len(fields))
+        with self._lock:
+            return self._connect().execute(
+                "SELECT report_id, call_session_id, field, text, bm25(transcript_index) AS rank "
+                "FROM transcript_index "
+                f"WHERE transcript_index MATCH ? AND field IN ({placeholders}) "
+                "ORDER BY rank LIMIT ?",
+                [match, *fields, limit],
+            ).fetchall()
+
+    async def _run(self, func, *args):
+        if not self.available:
+            return None
+        try:
+            return await asyncio.to_thread(func, *args)
+        except sqlite3.OperationalError as e:
+            if "fts5" in str(e):
+                # SQLite 未編入 FTS5 時停用檢索，其他功能不受影響
+                logger.error("轉錄稿檢索: SQLite 不支援 FTS5，停用全文檢索: %s", e)
+                self.available = False
+                return None
+            raise
+
+    async def index_report(self, report: AnalysisReport):
+        """建立或更新單一報告的索引，寫入失敗只記錄錯誤。"""
+        try:
+            await self._run(
+                self._index, report.report_id, report.call_session_id, _report_documents(report)
+            )
+        except sqlite3.Error as e:
+            logger.error("轉錄稿檢索: 建立報告 %s 的索引失敗: %s", report.report_id, e)
+
+    async def delete_reports(self, report_ids: List[str]):
+        """移除已刪除報告的索引。"""
+        if not report_ids:
+            return
+        try:
+            await self._run(self._delete, report_ids)
+        except sqlite3.Error as e:
+            logger.error("轉錄稿檢索: 移除索引失敗: %s", e)
+
+    async def backfill(self, report_ids: List[str], load_report):
+        """
+        為尚未建立索引的既有報告補建索引 (啟動後於背景執行)。
+
+        Args:
+            report_ids: 應被索引的報告 ID (已完成的報告)。
+            load_report: 依 ID 讀取完整報告的非同步函式。
+        """
+        indexed = await self._run(self._indexed_ids)
+        if indexed is None:
+            return
+        missing = [report_id for report_id in report_ids if report_id not in indexed]
+        for report_id in missing:
+            report = await load_report(report_id)
+            if report is not None:
+                await self.index_report(report)
+        if missing:
+            logger.info("轉錄稿檢索: 已為 %d 個既有報告補建索引", len(missing))
+
+    async def search(
+        self, query: str, fields: Optional[List[str]] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        搜尋轉錄稿與差異說明，依 BM25 相關度排序，同一報告的多個欄位合併為一筆結果。
+
+        Raises:
+            RuntimeError: SQLite 不支援 FTS5，無法使用全文檢索。
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+        # 同一報告可能有多個欄位命中，多取一些再依報告合併
+        rows = await self._run(self._search, match, list(fields or FIELDS), limit * len(FIELDS))
+        if rows is None:
+            raise RuntimeError("全文檢索無法使用 (SQLite 不支援 FTS5)")
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for report_id, call_session_id, field, text, rank in rows:
+            result = results.get(report_id)
+            if result is None:
+                if len(results) >= limit:
+                    continue
+                # bm25() 越小越相關，轉為越大越相關的分數
+                result = results[report_id] = {
+                    "report_id": report_id,
+                    "call_session_id": call_session_id,
+                    "score": -rank,
+                    "matches": [],
+                }
+            result["matches"].append({"field": field, **build_snippet(text, query)})
+        return list(results.values())
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+transcript_search_index = TranscriptSearchIndex(settings.STORAGE_PATH / "search.sqlite3")
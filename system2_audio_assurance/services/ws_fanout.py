@@ -0,0 +1,167 @@
+"""
+WebSocket 扇出模組 - 每個訂閱連線各自的有界送出佇列與寫入工作
+
+廣播時訊息只序列化一次，放入每個符合訂閱條件的連線佇列後立即返回，
+實際送出由各連線的寫入工作負責，單一較慢的連線不會拖慢其他連線或呼叫端。
+佇列已滿時，可捨棄的訊息 (例如暫定字幕) 直接略過；其他訊息則視為連線跟不上而將其移除，
+單次送出超過時限的連線同樣會被移除。
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi import WebSocket
+
+from utils.rate_limit import WaitStats
+
+logger = logging.getLogger(__name__)
+
+# 移除跟不上的連線時使用的 WebSocket 關閉代碼 (Try Again Later)
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+@dataclass
+class FanoutConsumer:
+    """單一訂閱連線"""
+
+    websocket: WebSocket
+    # 訂閱的主題 (例如房間 ID)，None 表示全部
+    topics: Optional[Set[str]]
+    queue: "asyncio.Queue[Tuple[str, float]]"
+    writer: Optional[asyncio.Task] = None
+    dropped: int = 0
+    connected_at: float = field(default_factory=time.time)
+
+    def wants(self, topic: Optional[str]) -> bool:
+        return self.topics is None or topic is None or topic in self.topics
+
+
+class WebSocketFanout:
+    """以每個連線的有界佇列非阻塞地推送訊息"""
+
+    def __init__(self, name: str, queue_size: int, send_timeout: float):
+        self.name = name
+        self.queue_size = max(1, queue_size)
+        self.send_timeout = send_timeout
+        self.consumers: Dict[WebSocket, FanoutConsumer] = {}
+        # 從放入佇列到實際送出的延遲
+        self.latency = WaitStats()
+        self.messages_published = 0
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.consumers_evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.consumers)
+
+    def add(self, websocket: WebSocket, topics: Optional[Set[str]] = None) -> FanoutConsumer:
+        """登錄已接受的連線並啟動其寫入工作。"""
+        consumer = FanoutConsumer(
+            websocket=websocket,
+            topics=topics,
+            queue=asyncio.Queue(maxsize=self.queue_size),
+        )
+        consumer.writer = asyncio.create_task(self._write_loop(consumer))
+        self.consumers[websocket] = consumer
+        return consumer
+
+    def get(self, websocket: WebSocket) -> Optional[FanoutConsumer]:
+        return self.consumers.get(websocket)
+
+    def set_topics(self, websocket: WebSocket, topics: Optional[Set[str]]):
+        consumer = self.consumers.get(websocket)
+        if consumer is not None:
+            consumer.topics = topics
+
+    def remove(self, websocket: WebSocket):
+        """移除連線並停止其寫入工作 (連線本身由呼叫端處理)。"""
+        consumer = self.consumers.pop(websocket, None)
+        if consumer is not None and consumer.writer is not None:
+            consumer.writer.cancel()
+
+    @staticmethod
+    def serialize(payload: Dict[str, Any]) -> str:
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+    def publish(
+        self, payload: Dict[str, Any], topic: Optional[str] = None, droppable: bool = False
+    ):
+        """
+        將訊息放入所有訂閱該主題的連線佇列，不等待送出。
+
+        Args:
+            topic: 訊息主題，None 表示送給所有連線。
+            droppable: 佇列已滿時可直接捨棄 (之後的訊息會取代它)，否則移除該連線。
+        """
+        if not self.consumers:
+            return
+        self.messages_published += 1
+        text = self.serialize(payload)
+        for consumer in list(self.consumers.values()):
+            if consumer.wants(topic):
+                self._enqueue(consumer, text, droppable)
+
+    def send_to(self, websocket: WebSocket, payload: Dict[str, Any]):
+        """只送給單一連線 (例如連線時的狀態快照)。"""
+        consumer = self.consumers.get(websocket)
+        if consumer is not None:
+            self._enqueue(consumer, self.serialize(payload), droppable=False)
+
+    def _enqueue(self, consumer: FanoutConsumer, text: str, droppable: bool):
+        try:
+            consumer.queue.put_nowait((text, time.monotonic()))
+        except asyncio.QueueFull:
+            if droppable:
+                consumer.dropped += 1
+                self.messages_dropped += 1
+            else:
+                self._evict(consumer, "送出佇列已滿")
+
+    def _evict(self, consumer: FanoutConsumer, reason: str):
+        if self.consumers.get(consumer.websocket) is not consumer:
+            return
+        self.consumers_evicted += 1
+        self.messages_dropped += consumer.queue.qsize()
+        logger.warning(
+            "%s: 移除跟不上的連線 (%s，剩餘 %d 個)", self.name, reason, len(self.consumers) - 1
+        )
+        self.remove(consumer.websocket)
+        asyncio.create_task(self._close(consumer.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+
+    async def _write_loop(self, consumer: FanoutConsumer):
+        websocket = consumer.websocket
+        while True:
+            text, enqueued_at = await consumer.queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._evict(consumer, f"送出超過 {self.send_timeout:g} 秒")
+                return
+            except Exception:
+                # 連線已中斷，由連線處理端清理
+                self.consumers.pop(websocket, None)
+                return
+            self.messages_sent += 1
+            self.latency.record(time.monotonic() - enqueued_at)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "consumers": len(self.consumers),
+            "messages_published": self.messages_published,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "consumers_evicted": self.consumers_evicted,
+            "queued": sum(c.queue.qsize() for c in self.consumers.values()),
+            "latency": self.latency.snapshot(),
+        }
@@ -0,0 +1,6 @@
+"""測試共用設定：以系統二根目錄為匯入起點 (與 main.py 啟動時相同)。"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
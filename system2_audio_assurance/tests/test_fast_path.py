@@ -0,0 +1,60 @@
+"""LLM 快速判定的相似度門檻與差異檢查測試"""
+
+import pytest
+
+from config.settings import settings
+from utils.text_alignment import fast_path_blocker
+from utils.text_similarity import ngram_similarity
+
+TRANSCRIPT = (
+    "您好這裡是客服中心敝姓王請問有什麼可以為您服務我想詢問上個月申辦的方案目前是否有效"
+    "好的請您提供身分證字號後四碼以及申辦時留下的手機號碼我這邊幫您查詢資料"
+    "查詢到了您申辦的是商務方案目前狀態是有效的合約期間是兩年每個月會贈送三個國際漫遊天數"
+    "請問漫遊天數如果沒有用完可以累積到下個月嗎可以的未使用的天數可以累積最多保留六個月"
+    "另外提醒您合約期間內如果提前解約需要支付違約金金額會依照剩餘月份比例計算"
+    "了解那如果我想把門號轉給家人使用需要準備哪些文件呢需要雙方的身分證正本"
+    "以及原申辦人的同意書到門市辦理即可還有其他需要為您服務的地方嗎"
+    "沒有了謝謝你的說明不客氣祝您有美好的一天再見"
+)
+
+
+def _check(candidate: str):
+    return fast_path_blocker(
+        TRANSCRIPT,
+        candidate,
+        settings.LLM_FAST_PATH_MIN_LENGTH_RATIO,
+        settings.LLM_FAST_PATH_MAX_DIFF_CHARS,
+    )
+
+
+def test_identical_transcripts_pass():
+    assert ngram_similarity(TRANSCRIPT, TRANSCRIPT) >= settings.LLM_FAST_PATH_THRESHOLD
+    assert _check(TRANSCRIPT) is None
+
+
+def test_minor_stt_noise_passes():
+    candidate = TRANSCRIPT.replace("敝姓王", "敝姓黃").replace("說明", "説明")
+    assert _check(candidate) is None
+
+
+def test_dropped_sentence_is_blocked():
+    start = TRANSCRIPT.index("另外提醒您")
+    candidate = TRANSCRIPT[:start] + TRANSCRIPT[start + 30 :]
+    # 字元相似度對整句遺漏不敏感，需靠長度與連續差異檢查攔下
+    assert ngram_similarity(TRANSCRIPT, candidate) > 0.9
+    assert _check(candidate) is not None
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [("是有效的", "是失效的"), ("三個", "十個"), ("可以的", "不可以"), ("兩年", "一年")],
+)
+def test_meaning_changes_are_blocked(old, new):
+    candidate = TRANSCRIPT.replace(old, new, 1)
+    assert ngram_similarity(TRANSCRIPT, candidate) > 0.95
+    assert _check(candidate) is not None
+
+
+def test_default_threshold_rejects_negation_and_number_flip():
+    candidate = TRANSCRIPT.replace("有效的", "失效的").replace("三個", "十個")
+    assert ngram_similarity(TRANSCRIPT, candidate) < settings.LLM_FAST_PATH_THRESHOLD
@@ -0,0 +1,68 @@
+"""報告摘要增量同步的刪除回報與墓碑清除測試"""
+
+import time
+from datetime import datetime
+
+import pytest
+
+from config.settings import settings
+from models.call_models import AnalysisReport, AnalysisStatus
+from services.report_store import ReportStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReportStore(tmp_path / "reports.sqlite3")
+    yield store
+    store.close()
+
+
+def _save(store, report_id, status, updated_at):
+    report = AnalysisReport(
+        report_id=report_id, call_session_id="c1", status=status, created_at=datetime.now()
+    )
+    store._upsert(store._row_values(report, updated_at))
+
+
+def _delta(store, since, status=None):
+    conditions, params = store._filter_clause(status, None, None, None, None)
+    return store._query_summaries(conditions, params, None, since, 50)
+
+
+def test_filtered_delta_reports_items_that_left_the_filter(store):
+    now = time.time()
+    _save(store, "r1", AnalysisStatus.PROCESSING, now - 60)
+    _save(store, "r2", AnalysisStatus.PROCESSING, now - 60)
+    _save(store, "r1", AnalysisStatus.SUCCESS, now)
+
+    page = _delta(store, now - 30, AnalysisStatus.PROCESSING)
+    assert page.items == []
+    assert page.deleted == ["r1"]
+
+    page = _delta(store, now - 30, AnalysisStatus.SUCCESS)
+    assert [item.report_id for item in page.items] == ["r1"]
+    assert page.deleted == []
+
+
+def test_prune_tombstones_removes_only_old_entries(store):
+    now = time.time()
+    _save(store, "old", AnalysisStatus.SUCCESS, now)
+    _save(store, "new", AnalysisStatus.SUCCESS, now)
+    store._delete_older_than(datetime.now(), None)
+    with store._lock:
+        store._connect().execute(
+            "UPDATE deleted_reports SET deleted_at = ? WHERE report_id = 'old'", (now - 3600,)
+        )
+
+    assert store._prune_tombstones(now - 60) == 1
+    assert _delta(store, now - 120).deleted == ["new"]
+
+
+def test_delta_older_than_tombstone_window_requires_resync(store, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_SYNC_TOMBSTONE_DAYS", 1)
+    _save(store, "r1", AnalysisStatus.SUCCESS, time.time())
+
+    page = _delta(store, time.time() - 2 * 86400)
+    assert page.resync_required
+    assert page.items == [] and page.deleted == []
+    assert not _delta(store, time.time() - 60).resync_required
@@ -0,0 +1,56 @@
+"""轉錄稿全文檢索的斷詞與查詢語法測試"""
+
+import pytest
+
+from services.transcript_search import (
+    FIELDS,
+    TranscriptSearchIndex,
+    build_match_query,
+    index_tokens,
+)
+
+
+def test_index_tokens_emits_bigrams_and_trailing_character():
+    assert index_tokens("顧客服務") == "顧客 客服 服務 務"
+
+
+def test_index_tokens_keeps_single_characters_and_words():
+    assert index_tokens("好 OK 123") == "好 ok 123"
+    assert index_tokens("很好。") == "很好 好"
+
+
+def test_index_tokens_normalizes_full_width_text():
+    assert index_tokens("ＡＢＣ，客服") == "abc 客服 服"
+
+
+def test_build_match_query_phrases():
+    assert build_match_query("顧客服務") == '"顧客 客服 服務"'
+    assert build_match_query("客服 refund") == '"客服" AND "refund"'
+
+
+def test_build_match_query_single_cjk_character_is_prefix():
+    assert build_match_query("好") == '"好"*'
+
+
+def test_build_match_query_without_terms():
+    assert build_match_query("，。！") is None
+    assert build_match_query("") is None
+
+
+@pytest.fixture
+def search_index(tmp_path):
+    index = TranscriptSearchIndex(tmp_path / "search.sqlite3")
+    index._index("r1", "c1", [(FIELDS[0], "我是顧客。戶服務很好")])
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("query", ["好", "很好", "服務很好", "顧客", "我", "客"])
+def test_search_finds_characters_anywhere_in_a_run(search_index, query):
+    rows = search_index._search(build_match_query(query), list(FIELDS), 10)
+    assert [row[0] for row in rows] == ["r1"]
+
+
+@pytest.mark.parametrize("query", ["壞", "好很", "客戶服務"])
+def test_search_does_not_match_absent_phrases(search_index, query):
+    assert search_index._search(build_match_query(query), list(FIELDS), 10) == []
@@ -3,7 +3,9 @@ AudioAssuranceSystem - 音訊處理工具模組
 提供與音訊檔案處理相關的共用函式。
 """
 
+import io
 import logging
+import wave
 from pathlib import Path
 from typing import Union
 
@@ -61,3 +63,23 @@ def get_audio_duration(file_path: Union[str, Path]) -> float:
     except Exception as e:
         logger.warning("無法獲取音檔 %s 的時長: %s", file_path, e)
         return 0.0
+
+
+def estimate_audio_seconds(audio_data: bytes, compressed_bitrate: int = 32000) -> float:
+    """
+    在不完整解碼的情況下估算音訊長度，用於 API 額度計算。
+
+    Args:
+        audio_data (bytes): 音訊的二進位數據。
+        compressed_bitrate (int): 非 WAV 格式時假設的位元率 (bps)。
+
+    Returns:
+        float: 估算的音訊時長（秒）。WAV 以檔頭計算，其他格式依位元率推估。
+    """
+    if audio_data[:4] == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(audio_data), "rb") as wav_file:
+                return wav_file.getnframes() / float(wav_file.getframerate())
+        except (wave.Error, EOFError):
+            pass
+    return len(audio_data) * 8 / float(compressed_bitrate)
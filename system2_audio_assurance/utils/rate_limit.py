@@ -0,0 +1,359 @@
+"""
+AudioAssuranceSystem - 流量控制工具模組
+提供呼叫外部 API 時共用的令牌桶、具優先權的 AIMD 自適應併發限制與退避計算。
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+class RequestPriority(IntEnum):
+    """請求優先等級，數值越小越優先"""
+
+    INTERACTIVE = 0  # 即時轉錄等需要低延遲的請求
+    BATCH = 1  # 通話結束後的整檔分析等背景工作
+
+
+class WaitStats:
+    """記錄單一優先等級的排隊等待時間"""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slo_violations = 0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float, slo: Optional[float] = None):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self._recent.append(seconds)
+        if slo is not None and seconds >= slo:
+            self.slo_violations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "count": self.count,
+            "avg_wait_seconds": round(self.total_seconds / self.count, 3)
+            if self.count
+            else 0.0,
+            "p95_wait_seconds": round(p95, 3),
+            "max_wait_seconds": round(self.max_seconds, 3),
+            "slo_violations": self.slo_violations,
+        }
+
+
+class TokenBucket:
+    """
+    以「每分鐘額度」表示的令牌桶。
+
+    rate_per_minute <= 0 代表不限制。令牌允許被扣成負數 (例如實際用量高於預估)，
+    之後的請求會等待額度回補後才放行。額度不足時依優先等級排隊 (同等級先到先得)，
+    等待期間不持有任何鎖，後到的 INTERACTIVE 請求會排在所有 BATCH 請求前面。
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = max(0.0, rate_per_minute) / 60.0
+        self.capacity = capacity if capacity is not None else max(0.0, rate_per_minute)
+        self.tokens = self.capacity
+        self.overdraft_grants = 0
+        self._updated_at = time.monotonic()
+        self._waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate_per_second <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_second)
+
+    def _prune_waiters(self):
+        while self._waiters and self._waiters[0][3].done():
+            heapq.heappop(self._waiters)
+
+    async def acquire(
+        self,
+        amount: float = 1.0,
+        priority: RequestPriority = RequestPriority.BATCH,
+        deadline: Optional[float] = None,
+    ):
+        """
+        取得指定數量的令牌，不足時依優先等級等待。
+
+        deadline 為 time.monotonic() 時間，到期仍未取得時直接透支額度放行 (用於延遲上限)，
+        透支的額度由之後的請求等待回補。
+        """
+        if self.unlimited or amount <= 0:
+            return
+        # 單次需求超過桶容量時以容量計，避免永遠等不到
+        amount = min(amount, self.capacity)
+        self._prune_waiters()
+        self._refill()
+        waiters_ahead = bool(self._waiters) and self._waiters[0][0] <= priority
+        if self.tokens >= amount and not waiters_ahead:
+            self.tokens -= amount
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), amount, future))
+        deadline_timer = None
+        if deadline is not None:
+            deadline_timer = loop.call_later(
+                max(0.0, deadline - time.monotonic()), self._grant_overdraft, future, amount
+            )
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 令牌已經分配給這個等待者，取消時要退還
+                self.tokens = min(self.capacity, self.tokens + amount)
+            raise
+        finally:
+            if deadline_timer:
+                deadline_timer.cancel()
+            # 排在最前面的等待者可能已離開，重新安排喚醒時間
+            self._wake()
+
+    def _grant_overdraft(self, future: asyncio.Future, amount: float):
+        """等待超過期限：不等額度回補，直接扣成負數放行。"""
+        if future.done():
+            return
+        self._refill()
+        self.tokens -= amount
+        self.overdraft_grants += 1
+        future.set_result(None)
+
+    def _wake(self):
+        """依優先順序放行額度足夠的等待者，並排定下一位等待者的喚醒時間。"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._refill()
+        while True:
+            self._prune_waiters()
+            if not self._waiters:
+                return
+            _, _, amount, future = self._waiters[0]
+            if self.tokens < amount:
+                break
+            heapq.heappop(self._waiters)
+            self.tokens -= amount
+            future.set_result(None)
+        delay = (amount - self.tokens) / self.rate_per_second
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """不等待：額度足夠時扣除並回傳 True，否則回傳 False。"""
+        if self.unlimited:
+            return True
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def adjust(self, delta: float):
+        """依實際用量修正額度，正數為退還、負數為補扣。"""
+        if self.unlimited:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+        if self._waiters:
+            self._wake()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    具優先權的 AIMD (加法增、乘法減) 自適應併發限制器。
+
+    每次成功讓上限緩慢增加 (約每個併發窗口 +1)，遇到 429/5xx 等過載訊號時
+    將上限乘以 decrease_factor；冷卻時間內的連續過載只會觸發一次減半。
+
+    等待中的請求依優先等級放行，INTERACTIVE 永遠排在 BATCH 前面；
+    另保留 reserved_interactive 個名額只給 INTERACTIVE 使用。若設定 interactive_slo，
+    INTERACTIVE 請求等待超過該秒數時會直接取得超額名額，以確保延遲上限。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0,
+        reserved_interactive: int = 0,
+        interactive_slo: Optional[float] = None,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.reserved_interactive = max(0, reserved_interactive)
+        self.interactive_slo = interactive_slo
+        self.in_flight = 0
+        self.overflow_grants = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        self.wait_stats: Dict[RequestPriority, WaitStats] = {
+            priority: WaitStats() for priority in RequestPriority
+        }
+
+    def _has_capacity(self, priority: RequestPriority) -> bool:
+        limit = int(self.limit)
+        if priority != RequestPriority.INTERACTIVE:
+            # 低優先請求至少保有一個名額，避免上限縮小時完全停擺
+            limit = max(1, limit - self.reserved_interactive)
+        return self.in_flight < limit
+
+    def _prune_waiters(self):
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+
+    def _has_waiters_ahead(self, priority: RequestPriority) -> bool:
+        self._prune_waiters()
+        return bool(self._waiters) and self._waiters[0][0] <= priority
+
+    def slo_deadline(
+        self, priority: RequestPriority, started: float
+    ) -> Optional[float]:
+        """回傳該請求的延遲期限 (time.monotonic() 時間)，僅 INTERACTIVE 且設定 SLO 時才有。"""
+        if priority == RequestPriority.INTERACTIVE and self.interactive_slo:
+            return started + self.interactive_slo
+        return None
+
+    async def acquire(
+        self,
+        priority: RequestPriority = RequestPriority.BATCH,
+        started: Optional[float] = None,
+    ):
+        """
+        取得一個併發名額，額滿時依優先等級等待。
+
+        started 為請求開始排隊的時間 (例如之前已在令牌桶等待)，等待時間統計與 SLO 都由此起算。
+        """
+        if started is None:
+            started = time.monotonic()
+        if self._has_capacity(priority) and not self._has_waiters_ahead(priority):
+            self.in_flight += 1
+            self._record_wait(priority, time.monotonic() - started)
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        slo_timer = None
+        deadline = self.slo_deadline(priority, started)
+        if deadline is not None:
+            slo_timer = loop.call_later(
+                max(0.0, deadline - time.monotonic()), self._grant_overflow, future
+            )
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 名額已經分配給這個等待者，取消時要歸還
+                self.release()
+            raise
+        finally:
+            if slo_timer:
+                slo_timer.cancel()
+        self._record_wait(priority, time.monotonic() - started)
+
+    def _record_wait(self, priority: RequestPriority, seconds: float):
+        slo = self.interactive_slo if priority == RequestPriority.INTERACTIVE else None
+        self.wait_stats[priority].record(seconds, slo)
+
+    def _grant_overflow(self, future: asyncio.Future):
+        """INTERACTIVE 等待超過 SLO：不受上限約束直接放行。"""
+        if future.done():
+            return
+        self.in_flight += 1
+        self.overflow_grants += 1
+        future.set_result(None)
+
+    def release(self):
+        """歸還一個併發名額。"""
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while True:
+            self._prune_waiters()
+            if not self._waiters:
+                return
+            priority, _, future = self._waiters[0]
+            if not self._has_capacity(RequestPriority(priority)):
+                return
+            heapq.heappop(self._waiters)
+            self.in_flight += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: RequestPriority = RequestPriority.BATCH,
+        started: Optional[float] = None,
+    ):
+        await self.acquire(priority, started)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self):
+        """請求成功：加法增加上限。"""
+        self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+        self._wake_waiters()
+
+    def on_overload(self):
+        """收到過載訊號：乘法減少上限。"""
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._prune_waiters()
+        waiting = {priority.name.lower(): 0 for priority in RequestPriority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[RequestPriority(priority).name.lower()] += 1
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": waiting,
+            "overflow_grants": self.overflow_grants,
+            "queue_wait": {
+                priority.name.lower(): stats.snapshot()
+                for priority, stats in self.wait_stats.items()
+            },
+        }
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """指數退避加上完整抖動 (full jitter)：在 [0, min(cap, base * 2^attempt)] 間隨機取值。"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,344 @@
+"""
+AudioAssuranceSystem - 轉錄稿對齊工具模組
+將兩份轉錄稿以字元序列對齊 (Myers 差異演算法)，
+供長文分段比對切出對應窗口，或只取出差異區段以精簡 LLM 提示詞。
+"""
+
+import bisect
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+# 對齊操作: (tag, a_start, a_end, b_start, b_end)，格式同 difflib 的 opcodes
+Opcode = Tuple[str, int, int, int, int]
+
+# 差異中出現這些字時語意可能改變 (數字、否定或反義)，即使只差一個字也不可快速判定
+SENSITIVE_CHARS = frozenset(
+    "0123456789零〇一二兩两三四五六七八九十百千萬万億亿"
+    "不沒没無无非未別别勿莫否失"
+)
+
+
+@dataclass
+class AlignedWindow:
+    """一組互相對應的比對窗口 (以字元索引表示 [start, end))"""
+
+    index: int
+    reference_start: int
+    reference_end: int
+    candidate_start: int
+    candidate_end: int
+    reference_text: str
+    candidate_text: str
+
+    @property
+    def weight(self) -> int:
+        """彙整分數時的權重：以基準窗口長度計。"""
+        return max(1, self.reference_end - self.reference_start)
+
+
+@dataclass
+class DiffRegion:
+    """一處差異區段與其前後文"""
+
+    reference_start: int
+    reference_end: int
+    reference_text: str
+    candidate_text: str
+    context_before: str
+    context_after: str
+
+
+@dataclass
+class DiffSummary:
+    """兩段文字的差異統計與差異區段"""
+
+    reference_length: int
+    candidate_length: int
+    matched_chars: int
+    regions: List[DiffRegion]
+
+    @property
+    def match_ratio(self) -> float:
+        """逐字相同的字數佔基準文字的比例。"""
+        return self.matched_chars / self.reference_length if self.reference_length else 1.0
+
+
+def _myers_path(a: str, b: str, max_edits: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Myers O(ND) 差異演算法，回傳從 (0, 0) 到 (len(a), len(b)) 的編輯路徑。
+
+    每一步為斜向 (相同)、x+1 (刪除) 或 y+1 (新增)；編輯次數超過 max_edits 時回傳 None。
+    """
+    n, m = len(a), len(b)
+    max_d = min(n + m, max_edits)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    # trace[d] 保存第 d 輪開始前 k ∈ [-d-1, d+1] 的最遠 x，供回溯使用
+    trace: List[List[int]] = []
+    for d in range(max_d + 1):
+        trace.append(v[offset - d - 1 : offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[List[int]], n: int, m: int) -> List[Tuple[int, int]]:
+    x, y = n, m
+    path = [(x, y)]
+    for d in range(len(trace) - 1, -1, -1):
+        snapshot = trace[d]
+        k = x - y
+
+        def farthest(diagonal: int) -> int:
+            return snapshot[diagonal + d + 1]
+
+        if k == -d or (k != d and farthest(k - 1) < farthest(k + 1)):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = farthest(prev_k)
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x, y = x - 1, y - 1
+            path.append((x, y))
+        if d > 0:
+            x, y = prev_x, prev_y
+            path.append((x, y))
+    path.reverse()
+    return path
+
+
+def _path_to_opcodes(
+    path: List[Tuple[int, int]], a_offset: int, b_offset: int
+) -> List[Opcode]:
+    opcodes: List[Opcode] = []
+    pending_start: Optional[Tuple[int, int]] = None
+    equal_start: Optional[Tuple[int, int]] = None
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        diagonal = x1 - x0 == 1 and y1 - y0 == 1
+        if diagonal:
+            if pending_start is not None:
+                opcodes.append(_edit_opcode(pending_start, (x0, y0)))
+                pending_start = None
+            if equal_start is None:
+                equal_start = (x0, y0)
+        else:
+            if equal_start is not None:
+                opcodes.append(("equal", equal_start[0], x0, equal_start[1], y0))
+                equal_start = None
+            if pending_start is None:
+                pending_start = (x0, y0)
+    x_end, y_end = path[-1]
+    if equal_start is not None:
+        opcodes.append(("equal", equal_start[0], x_end, equal_start[1], y_end))
+    if pending_start is not None:
+        opcodes.append(_edit_opcode(pending_start, (x_end, y_end)))
+    return [
+        (tag, a0 + a_offset, a1 + a_offset, b0 + b_offset, b1 + b_offset)
+        for tag, a0, a1, b0, b1 in opcodes
+    ]
+
+
+def _edit_opcode(start: Tuple[int, int], end: Tuple[int, int]) -> Opcode:
+    (x0, y0), (x1, y1) = start, end
+    if x1 > x0 and y1 > y0:
+        tag = "replace"
+    elif x1 > x0:
+        tag = "delete"
+    else:
+        tag = "insert"
+    return tag, x0, x1, y0, y1
+
+
+def align_opcodes(
+    reference: str, candidate: str, max_edits: int = 2000
+) -> List[Opcode]:
+    """
+    以字元為單位對齊兩段文字，回傳對齊操作清單。
+
+    先去除共同的開頭與結尾，再以 Myers 演算法計算最短編輯路徑；
+    兩段文字差異過大 (編輯次數超過 max_edits) 時改用 difflib 以限制時間與記憶體。
+    """
+    prefix = 0
+    limit = min(len(reference), len(candidate))
+    while prefix < limit and reference[prefix] == candidate[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and reference[-1 - suffix] == candidate[-1 - suffix]
+    ):
+        suffix += 1
+    a = reference[prefix : len(reference) - suffix]
+    b = candidate[prefix : len(candidate) - suffix]
+
+    path = _myers_path(a, b, max_edits)
+    if path is None:
+        # 關閉 autojunk：中文常用字出現頻率高，被視為雜訊會讓對齊失準
+        middle = [
+            (tag, a0 + prefix, a1 + prefix, b0 + prefix, b1 + prefix)
+            for tag, a0, a1, b0, b1 in SequenceMatcher(
+                None, a, b, autojunk=False
+            ).get_opcodes()
+        ]
+    else:
+        middle = _path_to_opcodes(path, prefix, prefix) if len(path) > 1 else []
+
+    opcodes: List[Opcode] = []
+    if prefix:
+        opcodes.append(("equal", 0, prefix, 0, prefix))
+    opcodes.extend(middle)
+    if suffix:
+        opcodes.append(
+            (
+                "equal",
+                len(reference) - suffix,
+                len(reference),
+                len(candidate) - suffix,
+                len(candidate),
+            )
+        )
+    return opcodes
+
+
+def diff_regions(
+    reference: str, candidate: str, context_chars: int = 20
+) -> DiffSummary:
+    """
+    找出兩段文字的差異區段，各附前後 context_chars 字的前後文 (取自基準文字)。
+
+    相鄰差異之間的相同內容不超過 2 * context_chars 時合併為同一區段。
+    """
+    opcodes = align_opcodes(reference, candidate)
+    matched = sum(a1 - a0 for tag, a0, a1, _, _ in opcodes if tag == "equal")
+
+    merged: List[List[int]] = []
+    for tag, a0, a1, b0, b1 in opcodes:
+        if tag == "equal":
+            continue
+        if merged and a0 - merged[-1][1] <= 2 * context_chars:
+            merged[-1][1], merged[-1][3] = a1, b1
+        else:
+            merged.append([a0, a1, b0, b1])
+
+    regions = [
+        DiffRegion(
+            reference_start=a0,
+            reference_end=a1,
+            reference_text=reference[a0:a1],
+            candidate_text=candidate[b0:b1],
+            context_before=reference[max(0, a0 - context_chars) : a0],
+            context_after=reference[a1 : a1 + context_chars],
+        )
+        for a0, a1, b0, b1 in merged
+    ]
+    return DiffSummary(
+        reference_length=len(reference),
+        candidate_length=len(candidate),
+        matched_chars=matched,
+        regions=regions,
+    )
+
+
+def fast_path_blocker(
+    reference: str, candidate: str, min_length_ratio: float, max_diff_chars: int
+) -> Optional[str]:
+    """
+    檢查相似度很高的兩段文字是否仍有不可忽略的差異，回傳原因；沒有時回傳 None。
+
+    字元相似度對少量遺漏或關鍵字替換不敏感，因此另外檢查：長度比例、
+    最長的連續差異，以及差異中是否有數字或否定詞 (例如「有效」變「失效」、「三個」變「十個」)。
+    """
+    longer = max(len(reference), len(candidate))
+    if longer and min(len(reference), len(candidate)) / longer < min_length_ratio:
+        return f"長度差異過大 ({len(reference)} / {len(candidate)} 字)"
+    for tag, a0, a1, b0, b1 in align_opcodes(reference, candidate):
+        if tag == "equal":
+            continue
+        span = max(a1 - a0, b1 - b0)
+        if span > max_diff_chars:
+            return f"連續 {span} 字不同"
+        changed = reference[a0:a1] + candidate[b0:b1]
+        if any(char in SENSITIVE_CHARS for char in changed):
+            return f"數字或否定詞改變 ({reference[a0:a1]!r} → {candidate[b0:b1]!r})"
+    return None
+
+
+def map_position(opcodes: List[Opcode], position: int) -> int:
+    """
+    將基準文字中的位置換算成對應文字中的位置。
+
+    相同或取代的區段按比例換算；位置落在被刪除的區段時，對應到刪除點。
+    """
+    if not opcodes:
+        return 0
+    starts = [op[1] for op in opcodes]
+    index = max(0, bisect.bisect_right(starts, position) - 1)
+    tag, a_start, a_end, b_start, b_end = opcodes[index]
+    if position >= a_end or tag == "delete":
+        return b_end if position >= a_end else b_start
+    ratio = (position - a_start) / max(1, a_end - a_start)
+    return b_start + round(ratio * (b_end - b_start))
+
+
+def split_points(text: str, window_chars: int) -> List[int]:
+    """
+    計算切窗位置，盡量切在空白處 (窗口後 20% 範圍內)，找不到則直接切斷。
+
+    Returns:
+        List[int]: 各窗口的起點，第一個一定是 0。
+    """
+    points = [0]
+    position = 0
+    while len(text) - position > window_chars:
+        target = position + window_chars
+        cut = text.rfind(" ", target - window_chars // 5, target)
+        position = cut + 1 if cut > position else target
+        points.append(position)
+    return points
+
+
+def align_windows(
+    reference: str, candidate: str, window_chars: int, margin_chars: int = 0
+) -> List[AlignedWindow]:
+    """
+    將基準文字切成約 window_chars 長的窗口，並找出對應文字中相對應的範圍。
+
+    對應窗口兩側各多取 margin_chars 個字元，避免切點附近的內容因對齊誤差被誤判為遺漏；
+    第一個與最後一個窗口分別延伸到對應文字的開頭與結尾，確保所有內容都會被比對到。
+    """
+    opcodes = align_opcodes(reference, candidate)
+    starts = split_points(reference, window_chars)
+    bounds = list(zip(starts, starts[1:] + [len(reference)]))
+
+    windows: List[AlignedWindow] = []
+    for index, (ref_start, ref_end) in enumerate(bounds):
+        cand_start = 0 if index == 0 else map_position(opcodes, ref_start)
+        cand_end = (
+            len(candidate) if index == len(bounds) - 1 else map_position(opcodes, ref_end)
+        )
+        cand_start = max(0, cand_start - margin_chars)
+        cand_end = min(len(candidate), max(cand_start, cand_end + margin_chars))
+        windows.append(
+            AlignedWindow(
+                index=index,
+                reference_start=ref_start,
+                reference_end=ref_end,
+                candidate_start=cand_start,
+                candidate_end=cand_end,
+                reference_text=reference[ref_start:ref_end].strip(),
+                candidate_text=candidate[cand_start:cand_end].strip(),
+            )
+        )
+    return windows
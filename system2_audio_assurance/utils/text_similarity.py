@@ -0,0 +1,48 @@
+"""
+AudioAssuranceSystem - 文字相似度工具模組
+提供不需呼叫 LLM 的本地轉錄稿相似度計算，可辨識中日韓 (CJK) 文字。
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import List
+
+# 英數字串視為一個詞；其他非空白字元 (包含每個 CJK 字) 各自視為一個單位
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|\S")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    將文字切成比對單位。
+
+    先以 NFKC 統一全形/半形並轉小寫，中文等不以空白分詞的文字逐字切分，
+    英數字則以整個詞為單位，因此 CJK 字之間的空白差異不影響結果。
+    """
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    return _TOKEN_PATTERN.findall(normalized)
+
+
+def char_ngrams(tokens: List[str], n: int = 2) -> Counter:
+    """計算 n-gram 出現次數，長度不足 n 時退回逐字統計。"""
+    if len(tokens) < n:
+        return Counter(tokens)
+    return Counter(tuple(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+
+
+def ngram_similarity(text_a: str, text_b: str, n: int = 2) -> float:
+    """
+    以 n-gram 的 Dice 係數計算兩段文字的相似度。
+
+    Returns:
+        float: 0.0 (完全不同) 到 1.0 (完全相同)；兩段皆為空字串時視為相同。
+    """
+    tokens_a, tokens_b = tokenize(text_a), tokenize(text_b)
+    if tokens_a == tokens_b:
+        return 1.0
+    grams_a, grams_b = char_ngrams(tokens_a, n), char_ngrams(tokens_b, n)
+    total = sum(grams_a.values()) + sum(grams_b.values())
+    if total == 0:
+        return 1.0
+    overlap = sum((grams_a & grams_b).values())
+    return 2.0 * overlap / total
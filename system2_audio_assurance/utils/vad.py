@@ -0,0 +1,306 @@
+"""
+AudioAssuranceSystem - 語音活動偵測 (VAD) 工具模組
+以 numpy 向量化計算音框能量，找出並壓縮長段靜音，同時保留時間軸對照表。
+"""
+
+import bisect
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# int16 PCM 的滿刻度
+INT16_FULL_SCALE = 32768.0
+
+
+def frame_rms_dbfs(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """
+    計算每個音框的 RMS 音量 (dBFS)。
+
+    Args:
+        samples (np.ndarray): 單聲道 int16 PCM 樣本。
+        frame_size (int): 每個音框的樣本數，不足一個音框的尾端會被忽略。
+
+    Returns:
+        np.ndarray: 每個音框的 dBFS 值，靜音為極小的負值。
+    """
+    frame_count = len(samples) // frame_size
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[: frame_count * frame_size].reshape(frame_count, frame_size)
+    normalized = frames.astype(np.float32) / INT16_FULL_SCALE
+    rms = np.sqrt(np.mean(normalized * normalized, axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def find_silent_spans(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold_dbfs: float,
+    min_silence_seconds: float,
+    frame_ms: int = 30,
+) -> List[Tuple[int, int]]:
+    """
+    找出長度超過門檻的靜音區段。
+
+    Returns:
+        List[Tuple[int, int]]: 以樣本索引表示的 [start, end) 靜音區段。
+    """
+    frame_size = max(1, sample_rate * frame_ms // 1000)
+    silent = frame_rms_dbfs(samples, frame_size) < threshold_dbfs
+    if not silent.any():
+        return []
+
+    # 以差分找出連續靜音音框的起訖位置
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    min_frames = int(np.ceil(min_silence_seconds * 1000 / frame_ms))
+    long_enough = (ends - starts) >= min_frames
+    return [
+        (int(start) * frame_size, int(end) * frame_size)
+        for start, end in zip(starts[long_enough], ends[long_enough])
+    ]
+
+
+@dataclass
+class TimeOffsetMap:
+    """
+    壓縮後時間軸與原始錄音時間軸的對照表。
+
+    每個保留下來的區段記錄其在壓縮後音訊中的起點，以及對應的原始起點 (秒)。
+    """
+
+    compacted_starts: List[float] = field(default_factory=lambda: [0.0])
+    original_starts: List[float] = field(default_factory=lambda: [0.0])
+    removed_seconds: float = 0.0
+
+    def to_original(self, seconds: float, is_end: bool = False) -> float:
+        """
+        將壓縮後音訊中的時間點換算回原始錄音的時間點。
+
+        片段的結束時間若剛好落在接縫上，is_end=True 會對應到前一個保留區段的結尾，
+        而不是被移除靜音之後的下一段開頭。
+        """
+        search = bisect.bisect_left if is_end else bisect.bisect_right
+        index = max(0, search(self.compacted_starts, seconds) - 1)
+        return self.original_starts[index] + (seconds - self.compacted_starts[index])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "compacted_starts": self.compacted_starts,
+            "original_starts": self.original_starts,
+            "removed_seconds": self.removed_seconds,
+        }
+
+
+def compact_silence(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold_dbfs: float = -45.0,
+    min_silence_seconds: float = 1.0,
+    keep_silence_seconds: float = 0.2,
+    frame_ms: int = 30,
+) -> Tuple[np.ndarray, TimeOffsetMap]:
+    """
+    移除長段靜音，每段靜音兩側各保留 keep_silence_seconds 以維持語句邊界。
+
+    Returns:
+        Tuple[np.ndarray, TimeOffsetMap]: 壓縮後的樣本與時間軸對照表。
+    """
+    spans = find_silent_spans(
+        samples, sample_rate, threshold_dbfs, min_silence_seconds, frame_ms
+    )
+    keep = int(keep_silence_seconds * sample_rate)
+    removed = [(start + keep, end - keep) for start, end in spans if end - start > 2 * keep]
+    if not removed:
+        return samples, TimeOffsetMap()
+
+    kept_segments: List[Tuple[int, int]] = []
+    cursor = 0
+    for start, end in removed:
+        kept_segments.append((cursor, start))
+        cursor = end
+    kept_segments.append((cursor, len(samples)))
+
+    offset_map = TimeOffsetMap(compacted_starts=[], original_starts=[])
+    compacted_position = 0
+    for start, end in kept_segments:
+        offset_map.compacted_starts.append(compacted_position / sample_rate)
+        offset_map.original_starts.append(start / sample_rate)
+        compacted_position += end - start
+    offset_map.removed_seconds = (len(samples) - compacted_position) / sample_rate
+
+    compacted = np.concatenate([samples[start:end] for start, end in kept_segments])
+    return compacted, offset_map
+
+
+def frame_zero_crossing_rate(samples: np.ndarray, frame_size: int) -> np.ndarray:
+    """
+    計算每個音框的過零率 (相鄰樣本正負號改變的比例)。
+
+    有聲語音的過零率低，嘶聲、風切等寬頻雜訊的過零率高。
+    """
+    frame_count = len(samples) // frame_size
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[: frame_count * frame_size].reshape(frame_count, frame_size)
+    signs = np.signbit(frames)
+    crossings = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1)
+    return crossings.astype(np.float32) / max(frame_size - 1, 1)
+
+
+@dataclass
+class VoiceSegment:
+    """串流 VAD 切出的區段，以串流開始後的樣本索引表示 [start, end)"""
+
+    start: int
+    end: int
+    has_speech: bool
+
+
+class StreamingVAD:
+    """
+    逐段餵入 PCM 的語音活動偵測器，在語句間的停頓切出區段。
+
+    每個音框以能量與過零率判斷是否為語音 (向量化計算)：能量需高於門檻，
+    且過零率不高 (排除嘶聲類雜訊)，能量遠高於門檻時不看過零率。
+    門檻會隨非語音音框的平均能量 (背景雜訊) 上調。
+    語音累積達 min_speech_ms 後出現 min_silence_ms 的停頓即切段，停頓兩側各保留一半；
+    區段長度達到 max_segment_seconds 時強制切段，限制字幕延遲。
+    長段靜音在下一句開始前切成不含語音的區段，呼叫端可直接捨棄。
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        threshold_dbfs: float = -40.0,
+        min_silence_ms: int = 500,
+        min_speech_ms: int = 200,
+        max_segment_seconds: float = 8.0,
+        frame_ms: int = 20,
+        max_zero_crossing_rate: float = 0.35,
+        noise_margin_db: float = 10.0,
+        loud_margin_db: float = 15.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = max(1, sample_rate * frame_ms // 1000)
+        self.threshold_dbfs = threshold_dbfs
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.noise_margin_db = noise_margin_db
+        self.loud_margin_db = loud_margin_db
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = max(
+            self.min_silence_frames, int(max_segment_seconds * 1000 / frame_ms)
+        )
+        self.pad_frames = self.min_silence_frames // 2
+        self.noise_floor_dbfs: Optional[float] = None
+
+        self._remainder = np.empty(0, dtype=np.int16)
+        # 已處理的音框數、目前區段的起點 (音框索引)、區段內的語音音框數與結尾連續的非語音音框數
+        self._frame_index = 0
+        self._start_frame = 0
+        self._speech_frames = 0
+        self._silence_run = 0
+
+    @property
+    def samples_processed(self) -> int:
+        return self._frame_index * self.frame_size
+
+    @property
+    def segment_start(self) -> int:
+        """進行中區段的起點 (樣本索引)。"""
+        return self._start_frame * self.frame_size
+
+    @property
+    def in_speech(self) -> bool:
+        """進行中的區段是否已累積足夠的語音。"""
+        return self._speech_frames >= self.min_speech_frames
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        energy = frame_rms_dbfs(frames, self.frame_size)
+        zcr = frame_zero_crossing_rate(frames, self.frame_size)
+        threshold = self.threshold_dbfs
+        if self.noise_floor_dbfs is not None:
+            threshold = max(threshold, self.noise_floor_dbfs + self.noise_margin_db)
+        is_speech = (energy >= threshold) & (
+            (zcr <= self.max_zero_crossing_rate) | (energy >= threshold + self.loud_margin_db)
+        )
+        background = energy[~is_speech]
+        if background.size:
+            level = float(np.mean(np.maximum(background, -90.0)))
+            self.noise_floor_dbfs = (
+                level
+                if self.noise_floor_dbfs is None
+                else 0.9 * self.noise_floor_dbfs + 0.1 * level
+            )
+        return is_speech
+
+    def _emit(self, cut_frame: int, has_speech: bool) -> Optional[VoiceSegment]:
+        cut_frame = min(max(cut_frame, self._start_frame), self._frame_index + 1)
+        if cut_frame <= self._start_frame:
+            return None
+        segment = VoiceSegment(
+            start=self._start_frame * self.frame_size,
+            end=cut_frame * self.frame_size,
+            has_speech=has_speech,
+        )
+        self._start_frame = cut_frame
+        self._speech_frames = 0
+        self._silence_run = min(self._silence_run, self._frame_index + 1 - cut_frame)
+        return segment
+
+    def process(self, samples: np.ndarray) -> List[VoiceSegment]:
+        """餵入新的 PCM 樣本，回傳這次完成的區段 (可能為空)。"""
+        samples = np.concatenate((self._remainder, samples.astype(np.int16, copy=False)))
+        frame_count = len(samples) // self.frame_size
+        self._remainder = samples[frame_count * self.frame_size :]
+        if frame_count == 0:
+            return []
+
+        segments: List[VoiceSegment] = []
+        for is_speech in self._classify(samples[: frame_count * self.frame_size]):
+            segment = None
+            if is_speech:
+                if self._speech_frames == 0 and self._silence_run >= self.min_silence_frames:
+                    # 長段靜音後開始說話：前段靜音切成不含語音的區段，只保留一小段前導
+                    segment = self._emit(self._frame_index - self.pad_frames, False)
+                self._speech_frames += 1
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+                if (
+                    self._silence_run >= self.min_silence_frames
+                    and self._speech_frames < self.min_speech_frames
+                ):
+                    # 過短的聲響視為雜訊
+                    self._speech_frames = 0
+
+            if segment is None:
+                frame_end = self._frame_index + 1
+                if (
+                    self._speech_frames >= self.min_speech_frames
+                    and self._silence_run >= self.min_silence_frames
+                ):
+                    segment = self._emit(frame_end - self._silence_run + self.pad_frames, True)
+                elif frame_end - self._start_frame >= self.max_segment_frames:
+                    segment = self._emit(
+                        frame_end, self._speech_frames >= self.min_speech_frames
+                    )
+            if segment is not None:
+                segments.append(segment)
+            self._frame_index += 1
+        return segments
+
+    def flush(self) -> Optional[VoiceSegment]:
+        """串流結束時取出尚未切段的剩餘區段。"""
+        end = self.samples_processed + len(self._remainder)
+        start = self._start_frame * self.frame_size
+        has_speech = self._speech_frames >= self.min_speech_frames
+        self._remainder = np.empty(0, dtype=np.int16)
+        self._start_frame = self._frame_index
+        self._speech_frames = self._silence_run = 0
+        if end <= start:
+            return None
+        return VoiceSegment(start=start, end=end, has_speech=has_speech)
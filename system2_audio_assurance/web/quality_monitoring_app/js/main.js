@@ -52,6 +52,7 @@ document.addEventListener("DOMContentLoaded", () => {
     detailAccuracyScore: document.getElementById("detail-accuracy-score"),
     detailSummary: document.getElementById("detail-summary"),
     detailReasoning: document.getElementById("detail-reasoning"),
+    detailAnalysisMethod: document.getElementById("detail-analysis-method"),
     detailKeyDifferences: document.getElementById("detail-key-differences"),
     detailSuggestions: document.getElementById("detail-suggestions"),
     recordingAudioPlayer: document.getElementById("recording-audio-player"),
@@ -77,7 +78,7 @@ document.addEventListener("DOMContentLoaded", () => {
   // === 狀態管理 ===
   let progressSessionId = null;
   let currentProgressStatus = "waiting_for_call";
-  let realtimeState = { isFirstMessage: true, currentSessionId: null };
+  let realtimeState = { isFirstMessage: true, currentSessionId: null, captions: new Map() };
   let realtimeSocket = null;
 
   // === 工具函數 ===
@@ -422,24 +423,53 @@ document.addEventListener("DOMContentLoaded", () => {
   function handleTranscriptPayload(payload) {
     if (!elements.realtimeLog) return;
     const text = payload?.text || payload?.transcript || "";
-    if (!text) return;
+    const seq = Number.isInteger(payload?.seq) ? payload.seq : null;
+    const isPartial = payload?.type === "partial";
+    // 沒有文字的正式結果只用來移除同序號的暫定字幕
+    if (!text && seq === null) return;
 
+    // 多通電話同時進行時，只顯示目前追蹤中的通話，其他房間的轉錄結果略過
     const sessionId = payload?.session_id;
-    if (sessionId && realtimeState.currentSessionId && sessionId !== realtimeState.currentSessionId) {
-      elements.realtimeLog.innerHTML = "";
-      realtimeState.isFirstMessage = true;
-    }
+    if (sessionId && realtimeState.currentSessionId && sessionId !== realtimeState.currentSessionId) return;
 
     if (sessionId) realtimeState.currentSessionId = sessionId;
     if (realtimeState.isFirstMessage) {
+      if (!text) return;
       elements.realtimeLog.innerHTML = "";
+      realtimeState.captions = new Map();
       realtimeState.isFirstMessage = false;
     }
 
+    // 相同序號的字幕原地更新：暫定字幕 (partial) 之後由正式結果取代
+    const existing = seq !== null ? realtimeState.captions.get(seq) : null;
+    if (existing) {
+      if (isPartial && !existing.classList.contains("partial")) return;
+      if (!text) {
+        existing.remove();
+        realtimeState.captions.delete(seq);
+        return;
+      }
+      existing.textContent = text;
+      existing.classList.toggle("partial", isPartial);
+      return;
+    }
+    if (!text) return;
+
     const p = document.createElement("p");
     p.textContent = text;
+    p.classList.toggle("partial", isPartial);
     p.style.cssText = "opacity: 0; transform: translateX(-20px); transition: all 0.3s ease";
-    elements.realtimeLog.appendChild(p);
+
+    // 依序號插入，較晚送達的較早片段仍顯示在正確位置
+    let next = null;
+    if (seq !== null) {
+      realtimeState.captions.set(seq, p);
+      for (const [otherSeq, element] of realtimeState.captions) {
+        if (otherSeq > seq && (!next || otherSeq < Number(next.dataset.seq))) next = element;
+      }
+      p.dataset.seq = String(seq);
+    }
+    elements.realtimeLog.insertBefore(p, next);
 
     setTimeout(() => {
       p.style.cssText = "opacity: 1; transform: translateX(0); transition: all 0.3s ease";
@@ -448,6 +478,28 @@ document.addEventListener("DOMContentLoaded", () => {
     elements.realtimeLog.scrollTop = elements.realtimeLog.scrollHeight;
   }
 
+  // 中途開啟儀表板時，伺服器先補送目前通話已產生的字幕，再接續即時推送
+  function handleHistoryPayload(payload) {
+    const sessionId = payload?.session_id;
+    if (!sessionId || !Array.isArray(payload.segments)) return;
+    if (realtimeState.currentSessionId && sessionId !== realtimeState.currentSessionId) return;
+
+    const fields = payload.fields || ["seq", "start", "end", "text"];
+    const seqIndex = fields.indexOf("seq");
+    const textIndex = fields.indexOf("text");
+    payload.segments.forEach(segment => {
+      handleTranscriptPayload({
+        type: "transcript",
+        session_id: sessionId,
+        seq: segment[seqIndex],
+        text: segment[textIndex]
+      });
+    });
+    if (payload.partial) {
+      handleTranscriptPayload({ type: "partial", session_id: sessionId, ...payload.partial });
+    }
+  }
+
   function handleStatusPayload(payload) {
     if (!payload?.status) return;
 
@@ -476,7 +528,7 @@ document.addEventListener("DOMContentLoaded", () => {
       elements.realtimeLog.innerHTML = "<p><i>目前等待通話開始...</i></p>";
     }
     resetProgressVisuals();
-    realtimeState = { isFirstMessage: true, currentSessionId: null };
+    realtimeState = { isFirstMessage: true, currentSessionId: null, captions: new Map() };
 
     const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
     const wsUrl = `${protocol}//${window.location.host}/ws/current-transcription`;
@@ -502,7 +554,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
       if (!payload || typeof payload !== "object") return;
 
-      if (payload.type === "transcript") handleTranscriptPayload(payload);
+      if (payload.type === "transcript" || payload.type === "partial") handleTranscriptPayload(payload);
+      else if (payload.type === "history") handleHistoryPayload(payload);
       else if (payload.type === "status") handleStatusPayload(payload);
     };
 
@@ -515,7 +568,7 @@ document.addEventListener("DOMContentLoaded", () => {
         elements.realtimeLog.innerHTML = "<p><i>連線中斷，請稍候或重新整理頁面以重新啟動監控。</i></p>";
       }
 
-      realtimeState = { isFirstMessage: true, currentSessionId: null };
+      realtimeState = { isFirstMessage: true, currentSessionId: null, captions: new Map() };
       realtimeSocket = null;
 
       if (elements.progressContainer) {
@@ -588,7 +641,7 @@ document.addEventListener("DOMContentLoaded", () => {
       .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
       .forEach((report, index) => {
         const tr = document.createElement("tr");
-        const scoreValue = report?.llm_analysis?.accuracy_score;
+        const scoreValue = report.accuracy_score;
         const hasScore = typeof scoreValue === "number" && !Number.isNaN(scoreValue);
         const score = hasScore ? scoreValue.toFixed(1) : "--";
         const scoreClass = hasScore ? utils.getScoreClass(scoreValue) : "";
@@ -616,6 +669,18 @@ document.addEventListener("DOMContentLoaded", () => {
       });
   }
 
+  const ANALYSIS_METHOD_LABELS = {
+    llm: "LLM 完整比對",
+    diff: "LLM 差異比對",
+    segmented: "LLM 分段比對",
+    fast_path: "本地相似度快速判定",
+  };
+
+  function formatAnalysisMethod(llmAnalysis) {
+    const label = ANALYSIS_METHOD_LABELS[llmAnalysis.analysis_method] || "LLM 比對";
+    return llmAnalysis.from_cache ? `${label}（快取結果）` : label;
+  }
+
   function populateDetailView(report) {
     if (!report) return;
 
@@ -634,6 +699,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
       elements.detailSummary.textContent = report.llm_analysis.summary || "";
       elements.detailReasoning.textContent = report.llm_analysis.reasoning || "";
+      elements.detailAnalysisMethod.textContent = formatAnalysisMethod(report.llm_analysis);
       renderListItems(elements.detailKeyDifferences, report.llm_analysis.key_differences);
       renderListItems(elements.detailSuggestions, report.llm_analysis.suggestions);
     } else {
@@ -641,6 +707,7 @@ document.addEventListener("DOMContentLoaded", () => {
       elements.detailAccuracyScore.className = "score-badge score-medium";
       elements.detailSummary.textContent = "尚未取得分析摘要";
       elements.detailReasoning.textContent = "";
+      elements.detailAnalysisMethod.textContent = "--";
       renderListItems(elements.detailKeyDifferences, []);
       renderListItems(elements.detailSuggestions, []);
     }
@@ -660,9 +727,123 @@ document.addEventListener("DOMContentLoaded", () => {
     utils.showNotification("報告詳情載入完成", "success");
   }
 
+  // === 報告摘要同步 ===
+  // 第一次以游標分頁載入全部摘要，之後以 since=sync_token 只取變動的報告；
+  // 帶上 ETag，資料沒變時伺服器回 304，不必重新下載與重繪。
+  const SUMMARY_PAGE_SIZE = 200;
+  const reportSummaries = new Map();
+  let reportSyncToken = null;
+  let reportSyncEtag = null;
+  let reportsSyncInFlight = false;
+
+  async function fetchSummaryPage(params, etag = null) {
+    const query = new URLSearchParams(params).toString();
+    const headers = etag ? { "If-None-Match": etag } : {};
+    const response = await fetch(`${API_BASE_URL}/reports/summary?${query}`, { headers });
+    if (response.status === 304) return { notModified: true };
+    if (!response.ok) throw new Error("載入歷史報告失敗");
+    return { page: await response.json(), etag: response.headers.get("ETag") };
+  }
+
+  async function loadAllSummaries() {
+    const summaries = new Map();
+    let cursor = null;
+    let syncToken = null;
+    do {
+      const params = { limit: SUMMARY_PAGE_SIZE };
+      if (cursor) params.cursor = cursor;
+      const { page } = await fetchSummaryPage(params);
+      // 以第一頁的 sync_token 為準，分頁期間的變動會在下一次增量同步補上
+      if (syncToken === null) syncToken = page.sync_token;
+      page.items.forEach(item => summaries.set(item.report_id, item));
+      cursor = page.next_cursor;
+    } while (cursor);
+
+    reportSummaries.clear();
+    summaries.forEach((item, id) => reportSummaries.set(id, item));
+    reportSyncToken = syncToken;
+    reportSyncEtag = null;
+  }
+
+  async function syncSummaries() {
+    const { notModified, page, etag } = await fetchSummaryPage(
+      { since: reportSyncToken }, reportSyncEtag
+    );
+    if (notModified) return false;
+    if (page.resync_required) {
+      // 太久沒有同步，伺服器已清除這段期間的刪除紀錄
+      await loadAllSummaries();
+      return true;
+    }
+    page.items.forEach(item => reportSummaries.set(item.report_id, item));
+    page.deleted.forEach(id => reportSummaries.delete(id));
+    reportSyncToken = page.sync_token;
+    reportSyncEtag = etag;
+    return true;
+  }
+
+  // === 報告事件推播 ===
+  // 訂閱 /ws/reports 逐筆更新列表；連線中斷時改以輪詢補齊並定時重連。
+  const REPORT_POLL_INTERVAL_MS = 30000;
+  const REPORT_EVENTS_RECONNECT_MS = 5000;
+  let reportEventsSocket = null;
+  let reportRenderScheduled = false;
+
+  function scheduleReportsRender() {
+    if (reportRenderScheduled) return;
+    reportRenderScheduled = true;
+    requestAnimationFrame(() => {
+      reportRenderScheduled = false;
+      renderReportsList(Array.from(reportSummaries.values()));
+    });
+  }
+
+  function handleReportEvent(payload) {
+    if (payload.event === "deleted") {
+      (payload.report_ids || []).forEach(id => reportSummaries.delete(id));
+    } else if (payload.report?.report_id) {
+      reportSummaries.set(payload.report.report_id, payload.report);
+    } else {
+      return;
+    }
+    scheduleReportsRender();
+  }
+
+  function connectReportEvents() {
+    if (reportEventsSocket) return;
+
+    const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+    reportEventsSocket = new WebSocket(`${protocol}//${window.location.host}/ws/reports`);
+
+    reportEventsSocket.onopen = () => {
+      // 補齊連線建立前 (或斷線期間) 的變動
+      fetchAllReports();
+    };
+
+    reportEventsSocket.onmessage = (event) => {
+      let payload;
+      try {
+        payload = JSON.parse(event.data);
+      } catch {
+        return;
+      }
+      if (payload?.type === "report") handleReportEvent(payload);
+    };
+
+    reportEventsSocket.onclose = () => {
+      reportEventsSocket = null;
+      setTimeout(connectReportEvents, REPORT_EVENTS_RECONNECT_MS);
+    };
+  }
+
+  function pollReportsFallback() {
+    if (reportEventsSocket?.readyState === WebSocket.OPEN) return;
+    fetchAllReports();
+  }
+
   // === API 調用 ===
   async function fetchAllReports(options = {}) {
-    const { showLoading = false } = options;
+    const { showLoading = false, fullReload = false } = options;
     let restoreLabel = null;
     let showFailureState = false;
 
@@ -675,11 +856,17 @@ document.addEventListener("DOMContentLoaded", () => {
       elements.refreshReportsBtn.textContent = "同步中…";
     }
 
+    // 已有同步進行中時 (例如初始載入與推播連線建立同時觸發)，不重複發送請求
+    if (reportsSyncInFlight && !showLoading) return;
+    reportsSyncInFlight = true;
+
     try {
-      const response = await fetch(`${API_BASE_URL}/reports`);
-      if (!response.ok) throw new Error("載入歷史報告失敗");
-      const reports = await response.json();
-      renderReportsList(reports);
+      if (fullReload || reportSyncToken === null) {
+        await loadAllSummaries();
+      } else if (!(await syncSummaries())) {
+        return;
+      }
+      renderReportsList(Array.from(reportSummaries.values()));
     } catch (error) {
       console.error(error);
       if (elements.noReportsMessage) {
@@ -691,6 +878,7 @@ document.addEventListener("DOMContentLoaded", () => {
         showFailureState = true;
       }
     } finally {
+      reportsSyncInFlight = false;
       if (showLoading && elements.refreshReportsBtn) {
         const defaultLabel = restoreLabel || elements.refreshReportsBtn.dataset.defaultLabel || "重新整理";
         const finish = () => {
@@ -760,7 +948,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
   if (elements.refreshReportsBtn) {
     elements.refreshReportsBtn.addEventListener("click", () => {
-      fetchAllReports({ showLoading: true });
+      fetchAllReports({ showLoading: true, fullReload: true });
     });
   }
 
@@ -837,7 +1025,8 @@ document.addEventListener("DOMContentLoaded", () => {
   resetProgressVisuals();
   connectRealtimeMonitoring();
   fetchAllReports();
-  setInterval(fetchAllReports, 30000);
+  connectReportEvents();
+  setInterval(pollReportsFallback, REPORT_POLL_INTERVAL_MS);
 
   // 處理畫布大小調整
   if (elements.progressCanvas) {